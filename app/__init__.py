@@ -6,6 +6,11 @@ from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 logger = logging.getLogger(__name__)
 
+# Version of the schema built by db.create_all() + _run_migrations(), stored
+# in the schema_version table. Workers skip both while the stored version
+# matches, so bump it with every new model, column or migration step.
+SCHEMA_VERSION = 7
+
 
 def create_app(config_name=None):
     if config_name is None:
@@ -23,7 +28,7 @@ def create_app(config_name=None):
 
     # Test PostgreSQL before db.init_app() so we only initialize once
     os.makedirs(app.instance_path, exist_ok=True)
-    _ensure_reachable_db(app)
+    stored_version = _ensure_reachable_db(app)
 
     db.init_app(app)  # called exactly once, with the final URI
 
@@ -39,61 +44,154 @@ def create_app(config_name=None):
     app.register_blueprint(download_bp)
     app.register_blueprint(api_bp)
 
+    from app.retention import retention_command
+    from app.partitioning import partition_report_rows_command
+    app.cli.add_command(retention_command)
+    app.cli.add_command(partition_report_rows_command)
+
+    from app import upload_sessions
+    app.cli.add_command(upload_sessions.upload_janitor_command)
+    upload_sessions.init_app(app)
+
+    if app.config.get('METRICS_ENABLED'):
+        from app import monitoring
+        from app.routes.metrics import metrics_bp
+        monitoring.init_app(app)
+        app.register_blueprint(metrics_bp)
+
     with app.app_context():
         from app import models  # noqa: F401
-        db.create_all()
-        logger.info("DB init OK — %s", app.config.get('SQLALCHEMY_DATABASE_URI', '')[:60])
-        try:
-            _run_migrations()
-        except Exception as e:
-            logger.warning("Migration warning (non-fatal): %s", e)
+        if stored_version is None:
+            with db.engine.connect() as conn:
+                stored_version = _read_schema_version(conn)
+
+        if stored_version == SCHEMA_VERSION:
+            logger.info("DB schema v%s up to date — %s", SCHEMA_VERSION,
+                        app.config.get('SQLALCHEMY_DATABASE_URI', '')[:60])
+        else:
+            db.create_all()
+            logger.info("DB init OK — %s", app.config.get('SQLALCHEMY_DATABASE_URI', '')[:60])
+            try:
+                _run_migrations()
+                _store_schema_version()
+            except Exception as e:
+                logger.warning("Migration warning (non-fatal): %s", e)
 
     return app
 
 
 def _ensure_reachable_db(app):
-    """If the configured DB is unreachable, switch to SQLite before init."""
+    """If the configured DB is unreachable, switch to SQLite before init.
+
+    The probe connection also reads the stored schema version, returned so
+    startup needs no second round trip; None when not probed or not stored.
+    """
     uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
     if not uri or uri.startswith('sqlite'):
-        return  # already SQLite or empty — nothing to test
+        return None  # already SQLite or empty — nothing to test
 
     try:
         import sqlalchemy as sa
-        engine = sa.create_engine(uri, pool_pre_ping=True)
-        with engine.connect():
-            pass
-        engine.dispose()
+        from sqlalchemy.pool import NullPool
+        connect_args = {'connect_timeout': 5} if uri.startswith('postgresql') else {}
+        engine = sa.create_engine(uri, poolclass=NullPool, connect_args=connect_args)
+        try:
+            with engine.connect() as conn:
+                stored_version = _read_schema_version(conn)
+        finally:
+            engine.dispose()
         logger.info("PostgreSQL reachable — using configured DB")
+        return stored_version
     except Exception as e:
         sqlite_uri = 'sqlite:///' + os.path.join(app.instance_path, 'reportes.db')
         logger.error("PostgreSQL unreachable: %s — falling back to SQLite", e)
         logger.warning("SQLite fallback active — data will NOT persist across restarts")
         app.config['SQLALCHEMY_DATABASE_URI'] = sqlite_uri
+        return None
+
+
+def _read_schema_version(conn):
+    """Stored schema version, or None when the schema_version table does not exist yet."""
+    from sqlalchemy import inspect, text
+    if not inspect(conn).has_table('schema_version'):
+        return None
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+
+
+def _store_schema_version():
+    from sqlalchemy import text
+    with db.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+        conn.execute(text("DELETE FROM schema_version"))
+        conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"),
+                     {'version': SCHEMA_VERSION})
 
 
 def _run_migrations():
     """Add new columns to existing tables without losing data."""
     from sqlalchemy import inspect, text
     inspector = inspect(db.engine)
+    tables = inspector.get_table_names()
+    pending = []
 
     # Only run if the table already exists
-    if 'report_rows' not in inspector.get_table_names():
-        return
+    if 'report_rows' in tables:
+        existing = [col['name'] for col in inspector.get_columns('report_rows')]
 
-    existing = [col['name'] for col in inspector.get_columns('report_rows')]
-    pending = []
+        if 'establecimiento' not in existing:
+            pending.append("ALTER TABLE report_rows ADD COLUMN establecimiento VARCHAR(200) DEFAULT ''")
+
+        if 'registros' not in existing:
+            pending.append("ALTER TABLE report_rows ADD COLUMN registros INTEGER DEFAULT 0")
+
+        if 'ciudad' not in existing:
+            pending.append("ALTER TABLE report_rows ADD COLUMN ciudad VARCHAR(200) DEFAULT ''")
 
-    if 'establecimiento' not in existing:
-        pending.append("ALTER TABLE report_rows ADD COLUMN establecimiento VARCHAR(200) DEFAULT ''")
+    if 'processing_runs' in tables:
+        existing = [col['name'] for col in inspector.get_columns('processing_runs')]
 
-    if 'registros' not in existing:
-        pending.append("ALTER TABLE report_rows ADD COLUMN registros INTEGER DEFAULT 0")
+        if 'summary_json' not in existing:
+            pending.append("ALTER TABLE processing_runs ADD COLUMN summary_json TEXT DEFAULT ''")
 
-    if 'ciudad' not in existing:
-        pending.append("ALTER TABLE report_rows ADD COLUMN ciudad VARCHAR(200) DEFAULT ''")
+        if 'profile_json' not in existing:
+            pending.append("ALTER TABLE processing_runs ADD COLUMN profile_json TEXT DEFAULT ''")
+
+        if 'base_run_id' not in existing:
+            pending.append("ALTER TABLE processing_runs ADD COLUMN base_run_id INTEGER REFERENCES processing_runs (id)")
+
+    if 'uploaded_files' in tables:
+        existing = [col['name'] for col in inspector.get_columns('uploaded_files')]
+
+        if 'sha256' not in existing:
+            pending.append("ALTER TABLE uploaded_files ADD COLUMN sha256 VARCHAR(64) DEFAULT ''")
+            pending.append("CREATE INDEX IF NOT EXISTS ix_uploaded_files_sha256 ON uploaded_files (sha256)")
+
+    # Lookup indexes for the campaign list: latest run per campaign and name/brand search.
+    # On PostgreSQL the *_pattern_ops opclass lets LIKE 'prefix%' use the index.
+    pattern_ops = ' text_pattern_ops' if db.engine.dialect.name == 'postgresql' else ''
+    pending.append("CREATE INDEX IF NOT EXISTS ix_processing_runs_campaign_created "
+                   "ON processing_runs (campaign_id, created_at)")
+    # Per-run lookups of rows, alerts and files (reads, and batched deletes in retention.py)
+    for table in ('report_rows', 'alerts', 'uploaded_files'):
+        pending.append(f"CREATE INDEX IF NOT EXISTS ix_{table}_run_id ON {table} (run_id)")
+    for column in ('name', 'brand', 'brand_display'):
+        pending.append(f"CREATE INDEX IF NOT EXISTS ix_campaigns_{column}_lower "
+                       f"ON campaigns ((lower({column})){pattern_ops})")
+
+    # Rows a delta run replaces in its base runs, looked up by group when
+    # aggregating the run (processing/diff.py)
+    pending.append("CREATE INDEX IF NOT EXISTS ix_report_rows_run_plataforma_dia "
+                   "ON report_rows (run_id, plataforma, dia)")
+    # Cross-run trend series of a campaign (/api/campaign/<slug>/trend)
+    pending.append("CREATE INDEX IF NOT EXISTS ix_history_metrics_campaign_created "
+                   "ON history_metrics (campaign_id, created_at)")
 
     if pending:
         with db.engine.connect() as conn:
             for sql in pending:
                 conn.execute(text(sql))
             conn.commit()
+
+    # History snapshots saved before history_metrics existed
+    from app.processing.history_metrics import backfill_history_metrics
+    backfill_history_metrics()
@@ -5,6 +5,51 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max upload
+    # Limit on the decompressed size of the .zip and .csv.gz files of one upload
+    MAX_UNCOMPRESSED_MB = int(os.environ.get('MAX_UNCOMPRESSED_MB', 500))
+    # Chunked uploads (/upload/chunked/...) send files in pieces of UPLOAD_CHUNK_MB,
+    # each its own request under MAX_CONTENT_LENGTH; the files of one chunked
+    # upload may add up to MAX_UNCOMPRESSED_MB
+    UPLOAD_CHUNK_MB = int(os.environ.get('UPLOAD_CHUNK_MB', 5))
+    # Upload sessions unused for UPLOAD_SESSION_MAX_AGE_HOURS are removed by a
+    # background janitor of each serving worker every UPLOAD_JANITOR_INTERVAL_MINUTES
+    # (0: only through `flask upload-janitor`, e.g. from cron); see app/upload_sessions.py
+    UPLOAD_SESSION_MAX_AGE_HOURS = int(os.environ.get('UPLOAD_SESSION_MAX_AGE_HOURS', 24))
+    UPLOAD_JANITOR_INTERVAL_MINUTES = int(os.environ.get('UPLOAD_JANITOR_INTERVAL_MINUTES', 30))
+    # CSV exports at least this large are processed in chunks to bound memory
+    STREAMING_MIN_FILE_MB = int(os.environ.get('STREAMING_MIN_FILE_MB', 10))
+    STREAMING_CHUNK_ROWS = int(os.environ.get('STREAMING_CHUNK_ROWS', 50000))
+    # Trace peak memory per stage in run profiles; tracemalloc makes processing
+    # several times slower, so enable it only while investigating a slow run
+    PROFILE_MEMORY = os.environ.get('PROFILE_MEMORY', '0') == '1'
+    # /metrics endpoint, off by default; with METRICS_TOKEN scrapes must send
+    # "Authorization: Bearer <token>". Worker metric files default to
+    # <instance>/metrics and must be on a directory shared by all gunicorn workers
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    METRICS_DIR = os.environ.get('METRICS_DIR', '')
+    # Processed-file cache: re-uploaded exports (same SHA-256) are not parsed
+    # again. Defaults to <instance>/parse_cache; the upload janitor removes entries
+    # unused for PARSE_CACHE_MAX_AGE_HOURS, then the least recently used ones
+    # while the cache is over PARSE_CACHE_MAX_MB (0: no size limit)
+    PARSE_CACHE_ENABLED = os.environ.get('PARSE_CACHE_ENABLED', '1') == '1'
+    PARSE_CACHE_DIR = os.environ.get('PARSE_CACHE_DIR', '')
+    PARSE_CACHE_MAX_AGE_HOURS = int(os.environ.get('PARSE_CACHE_MAX_AGE_HOURS', 24 * 7))
+    PARSE_CACHE_MAX_MB = int(os.environ.get('PARSE_CACHE_MAX_MB', 2048))
+    # Incremental updates store only row groups that changed since the previous
+    # run; after DELTA_MAX_CHAIN delta runs in a row the next update is stored whole
+    DELTA_MAX_CHAIN = int(os.environ.get('DELTA_MAX_CHAIN', 7))
+    # `flask retention` archives runs beyond the last RETENTION_KEEP_LAST completed
+    # runs per campaign that are older than RETENTION_KEEP_DAYS (see app/retention.py)
+    RETENTION_KEEP_LAST = int(os.environ.get('RETENTION_KEEP_LAST', 10))
+    RETENTION_KEEP_DAYS = int(os.environ.get('RETENTION_KEEP_DAYS', 30))
+    RETENTION_BATCH_ROWS = int(os.environ.get('RETENTION_BATCH_ROWS', 5000))
+    # PostgreSQL only: report_rows partitioned by run_id ranges of
+    # REPORT_ROWS_PARTITION_RUNS runs (see app/partitioning.py). One partition per
+    # run would leave the planner thousands of tables; keep the value fixed once
+    # partitions exist, as their bounds follow from it
+    REPORT_ROWS_PARTITIONING = os.environ.get('REPORT_ROWS_PARTITIONING', '0') == '1'
+    REPORT_ROWS_PARTITION_RUNS = int(os.environ.get('REPORT_ROWS_PARTITION_RUNS', 200))
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,   # re-verify connections before use
         'pool_recycle': 280,     # recycle connections every ~4.5 min (Render drops idle after 5 min)
@@ -32,7 +77,16 @@ class ProductionConfig(Config):
         Config.init_app(app)
 
 
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    METRICS_ENABLED = False
+    PARSE_CACHE_ENABLED = False
+    UPLOAD_JANITOR_INTERVAL_MINUTES = 0
+
+
 config = {
+    'testing': TestingConfig,
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig,
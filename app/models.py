@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from app import db
 
@@ -26,6 +27,10 @@ class ProcessingRun(db.Model):
     total_files = db.Column(db.Integer, default=0)
     total_rows = db.Column(db.Integer, default=0)
     platforms = db.Column(db.Text, default='')  # comma-separated
+    summary_json = db.Column(db.Text, default='')  # dashboard first-paint payload
+    profile_json = db.Column(db.Text, default='')  # per-stage timing/memory (see processing/profiling.py)
+    # Delta runs store only new or changed row groups and inherit the rest from this run
+    base_run_id = db.Column(db.Integer, db.ForeignKey('processing_runs.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     rows = db.relationship('ReportRow', backref='run', lazy='dynamic')
@@ -33,10 +38,44 @@ class ProcessingRun(db.Model):
     files = db.relationship('UploadedFile', backref='run', lazy='dynamic')
     history = db.relationship('RunHistory', backref='run', uselist=False)
 
+    def chain_ids(self):
+        """Ids of this run and of the base runs it inherits rows from, newest first."""
+        chain = [self.id]
+        run = self
+        while run.base_run_id:
+            run = db.session.get(ProcessingRun, run.base_run_id)
+            chain.append(run.id)
+        return chain
+
+    def visible_rows_filter(self, row=None):
+        """SQL filter on report_rows (or its alias row) for the rows of this run.
+
+        Includes the rows a delta run inherits from its base runs: rows
+        stored by a run replace every inherited row of the same (PLATAFORMA,
+        CAMPANA, AD GROUP, DIA) group (see processing/delta.py). Base runs
+        are older, so a replacing row has a larger run_id.
+        """
+        row = row if row is not None else ReportRow
+        chain = self.chain_ids()
+        if len(chain) == 1:
+            return row.run_id == self.id
+        newer = db.aliased(ReportRow)
+        return db.and_(row.run_id.in_(chain), ~db.exists().where(db.and_(
+            newer.run_id.in_(chain), newer.run_id > row.run_id,
+            *[getattr(newer, field) == getattr(row, field) for field in ReportRow.GROUP_FIELDS])))
+
+    def report_rows(self):
+        """All rows of the run, including those a delta run inherits (see visible_rows_filter)."""
+        return ReportRow.query.filter(self.visible_rows_filter())\
+            .order_by(ReportRow.run_id.desc(), ReportRow.id).all()
+
 
 class ReportRow(db.Model):
     __tablename__ = 'report_rows'
 
+    # Group a delta run stores or inherits as a whole (see processing/delta.py)
+    GROUP_FIELDS = ('plataforma', 'campana', 'ad_group', 'dia')
+
     id = db.Column(db.Integer, primary_key=True)
     run_id = db.Column(db.Integer, db.ForeignKey('processing_runs.id'), nullable=False)
     marca = db.Column(db.String(100), default='')
@@ -111,6 +150,26 @@ class RunHistory(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class HistoryMetric(db.Model):
+    """One per-platform metric total of a run, normalized from RunHistory.totals_json.
+
+    Written by save_history next to the RunHistory snapshot, so cross-run
+    series (/api/campaign/<slug>/trend) are read with one indexed query
+    instead of decoding every snapshot.
+    """
+    __tablename__ = 'history_metrics'
+
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=False)
+    run_id = db.Column(db.Integer, db.ForeignKey('processing_runs.id'), nullable=False)
+    plataforma = db.Column(db.String(50), nullable=False)
+    metric = db.Column(db.String(50), nullable=False)  # GASTO, IMPRESIONES, VIEWS
+    value = db.Column(db.Float, default=0)
+    fecha_min = db.Column(db.String(10), default='')  # YYYY-MM-DD date range of the platform's rows
+    fecha_max = db.Column(db.String(10), default='')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # of the RunHistory snapshot
+
+
 class UploadedFile(db.Model):
     __tablename__ = 'uploaded_files'
 
@@ -118,8 +177,31 @@ class UploadedFile(db.Model):
     run_id = db.Column(db.Integer, db.ForeignKey('processing_runs.id'), nullable=False)
     filename = db.Column(db.String(300), nullable=False)
     file_size = db.Column(db.Integer, default=0)
+    sha256 = db.Column(db.String(64), default='', index=True)  # content hash, key of the processed-file cache
     platform_detected = db.Column(db.String(50), default='')
     rows_processed = db.Column(db.Integer, default=0)
     status = db.Column(db.String(20), default='pending')  # pending, processed, error
     error_message = db.Column(db.Text, default='')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class UploadSession(db.Model):
+    """Manifest of an upload session directory (instance/uploads/<id>).
+
+    Requests read the session's files, hashes and detected campaigns from
+    here instead of listing the directory; expired sessions are removed by
+    the janitor (see app/upload_sessions.py).
+    """
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(36), primary_key=True)  # uuid4, also the directory name
+    files_json = db.Column(db.Text, default='[]')  # [{name, size, sha256}] in upload order
+    campaigns_json = db.Column(db.Text, default='')  # campaign scan, '' until scanned
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def files(self):
+        return json.loads(self.files_json or '[]')
+
+    def file_hashes(self):
+        return {f['name']: f['sha256'] for f in self.files() if f.get('sha256')}
@@ -0,0 +1,303 @@
+"""Request, database and processing metrics in the Prometheus text format.
+
+Every process (gunicorn worker) keeps its metrics in memory and writes them
+to <METRICS_DIR>/worker-<pid>.json after requests, at most once per
+FLUSH_SECONDS. /metrics adds up the files of all workers, so any worker
+answers for the whole server. Files of workers that are gone are removed
+when a worker starts and on collection, which Prometheus sees as a counter
+reset.
+
+Metrics are off unless METRICS_ENABLED is set; with METRICS_TOKEN, /metrics
+requires the header "Authorization: Bearer <token>".
+"""
+
+import json
+import os
+import threading
+import time
+from flask import g, request
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SQL_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+RATE_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+FLUSH_SECONDS = 1.0
+
+_lock = threading.Lock()
+_state = {}             # (name, label values) -> value, or [bucket counts, sum, count]
+_metrics = {}           # name -> Metric
+_settings = {'dir': None, 'last_flush': 0.0}
+
+
+class Metric:
+    """A counter or histogram with a fixed set of label names."""
+
+    def __init__(self, kind, name, help_text, labels=(), buckets=None):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) if buckets else None
+        _metrics[name] = self
+
+    def _key(self, labels):
+        return self.name, tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            _state[key] = _state.get(key, 0) + amount
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            entry = _state.get(key)
+            if entry is None:
+                entry = _state[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+
+def counter(name, help_text, labels=()):
+    return Metric('counter', name, help_text, labels)
+
+
+def histogram(name, help_text, labels=(), buckets=HTTP_BUCKETS):
+    return Metric('histogram', name, help_text, labels, buckets)
+
+
+HTTP_REQUEST_SECONDS = histogram(
+    'reportes_http_request_duration_seconds', 'HTTP request latency by blueprint and route.',
+    labels=('blueprint', 'route', 'method', 'status'))
+SQL_QUERIES = counter(
+    'reportes_sql_queries_total', 'SQL statements executed, by statement type.',
+    labels=('statement',))
+SQL_QUERY_SECONDS = histogram(
+    'reportes_sql_query_duration_seconds', 'SQL statement duration, by statement type.',
+    labels=('statement',), buckets=SQL_BUCKETS)
+ROWS_PROCESSED = counter(
+    'reportes_rows_processed_total', 'Report rows produced by processing runs.')
+PROCESSING_SECONDS = histogram(
+    'reportes_processing_duration_seconds', 'Duration of processing one upload.',
+    labels=('mode',))
+PROCESSING_ROWS_PER_SECOND = histogram(
+    'reportes_processing_rows_per_second', 'Throughput of processing one upload.',
+    labels=('mode',), buckets=RATE_BUCKETS)
+UPLOAD_BYTES = counter(
+    'reportes_upload_bytes_total', 'Bytes of uploaded report files.')
+UPLOAD_FILES = counter(
+    'reportes_upload_files_total', 'Uploaded report files, by extension.',
+    labels=('extension',))
+EXPORT_SECONDS = histogram(
+    'reportes_export_duration_seconds', 'Time to generate a download, by export type.',
+    labels=('export',))
+
+
+def observe_processing(mode, seconds, rows):
+    """Record one processing call (mode: 'campaign' or 'all') that produced rows."""
+    ROWS_PROCESSED.inc(rows)
+    PROCESSING_SECONDS.observe(seconds, mode=mode)
+    if seconds > 0:
+        PROCESSING_ROWS_PER_SECOND.observe(rows / seconds, mode=mode)
+
+
+# ── Worker files ─────────────────────────────────────────────
+
+def _worker_path(pid):
+    return os.path.join(_settings['dir'], f'worker-{pid}.json')
+
+
+def _snapshot():
+    with _lock:
+        return [[name, list(labels), value] for (name, labels), value in _state.items()]
+
+
+def flush(force=False):
+    """Write this process's metrics to its worker file (throttled unless force)."""
+    if _settings['dir'] is None:
+        return
+    now = time.monotonic()
+    if not force and now - _settings['last_flush'] < FLUSH_SECONDS:
+        return
+    _settings['last_flush'] = now
+    path = _worker_path(os.getpid())
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(_snapshot(), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _merge(total, entries):
+    for name, labels, value in entries:
+        key = (name, tuple(labels))
+        if name not in _metrics:
+            continue
+        if isinstance(value, list):
+            current = total.setdefault(key, [[0] * len(value[0]), 0.0, 0])
+            current[0] = [a + b for a, b in zip(current[0], value[0])]
+            current[1] += value[1]
+            current[2] += value[2]
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def _remove_dead_workers(directory, keep_own=True):
+    """Delete the worker files of processes that are gone. Returns the live worker files."""
+    own = f'worker-{os.getpid()}.json'
+    live = []
+    names = os.listdir(directory) if directory and os.path.isdir(directory) else []
+    for filename in names:
+        if not (filename.startswith('worker-') and filename.endswith('.json')):
+            continue
+        path = os.path.join(directory, filename)
+        pid = filename[len('worker-'):-len('.json')]
+        if not pid.isdigit():
+            continue
+        # A file under our own pid at startup was left by an earlier process
+        if (filename == own and not keep_own) or (filename != own and not _pid_alive(int(pid))):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        if filename != own:
+            live.append(path)
+    return live
+
+
+def collect():
+    """Metrics of all workers added up, as {(name, label values): value}."""
+    flush(force=True)
+    total = {}
+    for path in _remove_dead_workers(_settings['dir']):
+        try:
+            with open(path) as f:
+                _merge(total, json.load(f))
+        except (OSError, ValueError):
+            continue
+    _merge(total, _snapshot())
+    return total
+
+
+# ── Text exposition ──────────────────────────────────────────
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    total = collect()
+    lines = []
+    for metric in _metrics.values():
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        series = sorted((labels, value) for (name, labels), value in total.items()
+                        if name == metric.name)
+        for labels, value in series:
+            if metric.kind == 'counter':
+                lines.append(f'{metric.name}{_labels_text(metric.labels, labels)} {_number(value)}')
+                continue
+            counts, total_sum, count = value
+            for bound, bucket_count in zip(metric.buckets, counts):
+                le = _labels_text(metric.labels, labels, [('le', _number(bound))])
+                lines.append(f'{metric.name}_bucket{le} {bucket_count}')
+            le = _labels_text(metric.labels, labels, [('le', '+Inf')])
+            lines.append(f'{metric.name}_bucket{le} {count}')
+            lines.append(f'{metric.name}_sum{_labels_text(metric.labels, labels)} {_number(total_sum)}')
+            lines.append(f'{metric.name}_count{_labels_text(metric.labels, labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+# ── Hooks ────────────────────────────────────────────────────
+
+SQL_STATEMENTS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'ALTER', 'DROP'}
+
+
+def _statement_type(statement):
+    words = statement.lstrip().split(None, 1)
+    keyword = words[0].upper() if words else ''
+    return keyword if keyword in SQL_STATEMENTS else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    kind = _statement_type(statement)
+    SQL_QUERIES.inc(statement=kind)
+    SQL_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), statement=kind)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    starts = conn.info.get('metrics_query_start') if conn is not None else None
+    if starts:
+        starts.pop()
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None and request.endpoint != 'metrics.metrics':
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                     blueprint=request.blueprint or 'app', route=rule,
+                                     method=request.method, status=response.status_code)
+    flush()
+    return response
+
+
+def init_app(app):
+    """Register request timing and SQL hooks; worker files go to METRICS_DIR."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+    os.makedirs(directory, exist_ok=True)
+    _settings['dir'] = directory
+    _remove_dead_workers(directory, keep_own=False)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
@@ -0,0 +1,147 @@
+"""Optional partitioned layout of report_rows on PostgreSQL.
+
+With REPORT_ROWS_PARTITIONING=1, report_rows is a table partitioned by
+RANGE (run_id), REPORT_ROWS_PARTITION_RUNS consecutive runs per partition
+(report_rows_p<first run id>). Per-run reads then only scan the partition
+of the run, and retention drops a partition once every run in its range is
+archived (rows of archived runs in a range still in use are deleted as on
+a plain table).
+
+    flask --app run partition-report-rows
+
+converts an existing plain table once: it is renamed to report_rows_legacy
+and attached as the partition holding every run created so far. Partitions
+for new runs are created by the processing path (ensure_run_partition)
+before any row is inserted. On SQLite, or while the setting is off, the
+plain table is used and every function here does nothing.
+"""
+
+import logging
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+LEGACY_TABLE = 'report_rows_legacy'
+
+
+def _enabled():
+    from app import db
+    return current_app.config['REPORT_ROWS_PARTITIONING'] and db.engine.dialect.name == 'postgresql'
+
+
+def _is_partitioned(conn):
+    from sqlalchemy import text
+    return conn.execute(text(
+        "SELECT c.relkind = 'p' FROM pg_class c "
+        "WHERE c.oid = to_regclass('report_rows')")).scalar() is True
+
+
+def partition_bounds(run_id, width=None):
+    """[start, end) run id range of the partition holding run_id."""
+    width = width or current_app.config['REPORT_ROWS_PARTITION_RUNS']
+    start = ((run_id - 1) // width) * width + 1
+    return start, start + width
+
+
+def partition_name(start):
+    return f'report_rows_p{start}'
+
+
+def ensure_run_partition(run_id):
+    """Create the partition that will hold the rows of run_id, if it does not exist.
+
+    Runs in its own short transaction; call it before the session reads or
+    writes report_rows, as creating a partition locks the parent table.
+    """
+    if not _enabled():
+        return
+    from sqlalchemy import text
+    from sqlalchemy.exc import ProgrammingError, IntegrityError
+    from app import db
+
+    start, end = partition_bounds(run_id)
+    try:
+        with db.engine.begin() as conn:
+            if not _is_partitioned(conn):
+                return
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {partition_name(start)} "
+                              f"PARTITION OF report_rows FOR VALUES FROM ({start}) TO ({end})"))
+    except (ProgrammingError, IntegrityError) as e:
+        # Created concurrently by another worker, or the run falls in the legacy partition
+        logger.info("Partition %s not created: %s", partition_name(start), e)
+
+
+def drop_archived_partition(run_id):
+    """Drop the partition of run_id when every run in its range is archived or gone.
+
+    Returns the number of rows dropped, or None when rows must be deleted
+    normally (no partitioning, or live runs left in the range).
+    """
+    if not _enabled():
+        return None
+    from sqlalchemy import text
+    from app import db
+
+    start, end = partition_bounds(run_id)
+    name = partition_name(start)
+    with db.engine.begin() as conn:
+        if not _is_partitioned(conn) or conn.execute(text("SELECT to_regclass(:name)"),
+                                                     {'name': name}).scalar() is None:
+            return None
+        live = conn.execute(text("SELECT COUNT(*) FROM processing_runs "
+                                 "WHERE id >= :start AND id < :end AND status <> 'archived'"),
+                            {'start': start, 'end': end}).scalar()
+        if live:
+            return None
+        rows = conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+        conn.execute(text(f"DROP TABLE {name}"))
+    logger.info("Partition %s dropped (%s rows)", name, rows)
+    return rows
+
+
+def convert_to_partitioned():
+    """Turn the plain report_rows table into a partitioned one (see module docstring)."""
+    from sqlalchemy import text
+    from app import db
+
+    with db.engine.begin() as conn:
+        if _is_partitioned(conn):
+            return False
+        # Existing runs stay in the legacy partition, up to the end of the last one's range
+        last_run = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM processing_runs")).scalar()
+        legacy_end = partition_bounds(last_run)[1] if last_run else 1
+        statements = [
+            "LOCK TABLE report_rows IN ACCESS EXCLUSIVE MODE",
+            f"ALTER TABLE report_rows RENAME TO {LEGACY_TABLE}",
+            f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT report_rows_pkey TO {LEGACY_TABLE}_pkey",
+            f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT report_rows_run_id_fkey TO {LEGACY_TABLE}_run_id_fkey",
+            f"ALTER INDEX IF EXISTS ix_report_rows_run_id RENAME TO ix_{LEGACY_TABLE}_run_id",
+            f"ALTER INDEX IF EXISTS ix_report_rows_run_plataforma_dia RENAME TO ix_{LEGACY_TABLE}_run_plataforma_dia",
+            f"CREATE TABLE report_rows (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (run_id)",
+            # The id sequence must outlive the legacy partition
+            "ALTER SEQUENCE report_rows_id_seq OWNED BY report_rows.id",
+            "ALTER TABLE report_rows ADD PRIMARY KEY (id, run_id)",
+            "ALTER TABLE report_rows ADD FOREIGN KEY (run_id) REFERENCES processing_runs (id)",
+            "CREATE INDEX ix_report_rows_run_id ON report_rows (run_id)",
+            "CREATE INDEX ix_report_rows_run_plataforma_dia ON report_rows (run_id, plataforma, dia)",
+            f"ALTER TABLE report_rows ATTACH PARTITION {LEGACY_TABLE} "
+            f"FOR VALUES FROM (MINVALUE) TO ({legacy_end})",
+        ]
+        for sql in statements:
+            conn.execute(text(sql))
+    return True
+
+
+@click.command('partition-report-rows')
+@with_appcontext
+def partition_report_rows_command():
+    """Convert report_rows to the partitioned layout (PostgreSQL)."""
+    if not _enabled():
+        raise click.ClickException('Requiere PostgreSQL y REPORT_ROWS_PARTITIONING=1')
+    if convert_to_partitioned():
+        click.echo(f'report_rows particionada; filas existentes en {LEGACY_TABLE}')
+    else:
+        click.echo('report_rows ya estaba particionada')
@@ -1,65 +1,61 @@
-"""Alert system for data validation."""
+"""Alert system for data validation: the rules checked on every run (see rules.py)."""
 
-import pandas as pd
+from .rules import Rule, contar_reglas, alertas_reglas, alertas_columnas
 
 
 COLUMNAS_CRITICAS = ['GASTO', 'IMPRESIONES', 'DIA']
 COLUMNAS_IMPORTANTES = ['CLICS', 'VIEWS', 'CAMPANA']
 
-COLUMNAS_EXCLUIDAS_POR_PLATAFORMA = {
-    'GOOGLE': ['ALCANCE', 'FRECUENCIA'],
+CAMPOS_IMPORTANTES = {
+    'AUDIENCIA': 'Necesario para segmentacion',
+    'ETAPA': 'Necesario para analisis de funnel',
+    'FORMATO': 'Necesario para analisis de creativos',
+    'COMPRA': 'Necesario para analisis de costos',
+    'COM': 'Necesario para analisis de mensajes'
 }
 
 
-def verificar_campos_vacios(df):
-    """Check for important fields with many empty values. Returns list of alert dicts."""
-    alerts = []
-    campos_importantes = {
-        'AUDIENCIA': 'Necesario para segmentacion',
-        'ETAPA': 'Necesario para analisis de funnel',
-        'FORMATO': 'Necesario para analisis de creativos',
-        'COMPRA': 'Necesario para analisis de costos',
-        'COM': 'Necesario para analisis de mensajes'
-    }
+# Row rules evaluated on every run (see rules.py)
+REGLAS_FILAS = [
+    Rule(nombre=f'vacio_{campo}', columna=campo, predicado='vacio',
+         umbrales=((0.8, 'CRITICO'), (0.5, 'ADVERTENCIA')),
+         mensaje=('Campo {columna} vacio en {cantidad}/{total} filas ({porcentaje:.0f}%). '
+                  'Plataformas afectadas: {plataformas}. ' + descripcion),
+         excluir_plataformas=())
+    for campo, descripcion in CAMPOS_IMPORTANTES.items()
+]
+
+# Header rules checked on every file; a rule lists in excluir_plataformas the
+# platforms whose exports never have its columns
+REGLAS_COLUMNAS = [
+    Rule(nombre='columnas_criticas', columna=tuple(COLUMNAS_CRITICAS), predicado='faltante',
+         umbrales=((1, 'CRITICO'),), mensaje='COLUMNAS CRITICAS FALTANTES: {columnas}',
+         excluir_plataformas=()),
+    Rule(nombre='columnas_importantes', columna=tuple(COLUMNAS_IMPORTANTES), predicado='faltante',
+         umbrales=((1, 'ADVERTENCIA'),), mensaje='Columnas importantes faltantes: {columnas}',
+         excluir_plataformas=()),
+]
 
-    total_filas = len(df)
-    if total_filas == 0:
-        return alerts
 
-    for campo, descripcion in campos_importantes.items():
-        if campo in df.columns:
-            vacios = df[campo].isna() | (df[campo] == '') | (df[campo] == 'Sin definir')
-            cantidad_vacios = vacios.sum()
-            porcentaje_vacio = cantidad_vacios / total_filas
+def contar_campos_vacios(df, conteo=None):
+    """Count the rows matching each of REGLAS_FILAS in a block of rows.
 
-            if porcentaje_vacio >= 0.5:
-                plataformas_afectadas = df[vacios]['PLATAFORMA'].unique().tolist()
-                plataformas_str = ', '.join(str(p) for p in plataformas_afectadas)
+    Pass the previous result as conteo to add up counts across chunks of the same run.
+    """
+    return contar_reglas(df, REGLAS_FILAS, conteo)
 
-                msg = (f"Campo {campo} vacio en {cantidad_vacios}/{total_filas} filas "
-                       f"({porcentaje_vacio*100:.0f}%). Plataformas afectadas: {plataformas_str}. {descripcion}")
 
-                tipo = 'CRITICO' if porcentaje_vacio >= 0.8 else 'ADVERTENCIA'
-                alerts.append({'tipo': tipo, 'archivo': 'VALIDACION DE DATOS', 'mensaje': msg})
+def alertas_campos_vacios(conteo):
+    """Alerts for important fields with many empty values, from contar_campos_vacios counts."""
+    return alertas_reglas(conteo, REGLAS_FILAS, 'VALIDACION DE DATOS')
 
-    return alerts
+
+def verificar_campos_vacios(df):
+    """Check for important fields with many empty values. Returns list of alert dicts."""
+    return alertas_campos_vacios(contar_campos_vacios(df))
 
 
 def verificar_columnas_criticas(columnas_encontradas, filename, platform):
     """Check for missing critical and important columns. Returns list of alert dicts."""
-    alerts = []
-    excluidas = COLUMNAS_EXCLUIDAS_POR_PLATAFORMA.get(platform, [])
-
-    criticas_faltantes = [col for col in COLUMNAS_CRITICAS
-                          if col not in columnas_encontradas and col not in excluidas]
-    if criticas_faltantes:
-        msg = f"COLUMNAS CRITICAS FALTANTES: {', '.join(criticas_faltantes)}"
-        alerts.append({'tipo': 'CRITICO', 'archivo': filename, 'mensaje': msg})
-
-    importantes_faltantes = [col for col in COLUMNAS_IMPORTANTES
-                             if col not in columnas_encontradas and col not in excluidas]
-    if importantes_faltantes:
-        msg = f"Columnas importantes faltantes: {', '.join(importantes_faltantes)}"
-        alerts.append({'tipo': 'ADVERTENCIA', 'archivo': filename, 'mensaje': msg})
-
-    return alerts, len(criticas_faltantes) == 0
+    alerts, tipos = alertas_columnas(REGLAS_COLUMNAS, columnas_encontradas, platform, filename)
+    return alerts, 'CRITICO' not in tipos
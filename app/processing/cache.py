@@ -0,0 +1,191 @@
+"""Processed-file cache keyed by content hash.
+
+Re-uploading the same export (alone or next to new ones) reuses the frames
+it produced last time instead of parsing it again. Entries are keyed by the
+SHA-256 of the file bytes, the campaign filter and ENGINE_VERSION, and hold
+the output frames of the file (one pickle per chunk, so streamed files are
+written and read back a chunk at a time) plus its platform and alerts. A
+run of one campaign reads the whole-file entry when there is one (filtering
+its frames) and otherwise parses only that campaign's rows, stored under
+its own key:
+
+    <cache_dir>/<key>/meta.json
+    <cache_dir>/<key>/chunk-00000.pkl ...
+
+An entry is written to a temporary directory and renamed into place once
+complete, so readers never see a partial one. prune_cache removes entries
+unused for longer than the configured age, then the least recently used
+ones (reads touch the entry) while the cache is over its size limit.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import pandas as pd
+
+# Bump whenever the frames produced for a file change (mapping, nomenclature,
+# metrics, dates or dtypes), so older entries are no longer used.
+ENGINE_VERSION = 1
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def file_sha256(file_storage):
+    """Hex SHA-256 of an open upload, read in blocks; the stream is left at the start."""
+    digest = hashlib.sha256()
+    file_storage.seek(0)
+    for block in iter(lambda: file_storage.read(HASH_BLOCK_BYTES), b''):
+        digest.update(block)
+    file_storage.seek(0)
+    return digest.hexdigest()
+
+
+def cache_key(sha256, campaign_filter=None):
+    scope = hashlib.sha256(campaign_filter.encode('utf-8')).hexdigest()[:16] if campaign_filter else 'all'
+    return f'{sha256}-{scope}-v{ENGINE_VERSION}'
+
+
+def _chunk_path(entry_dir, index):
+    return os.path.join(entry_dir, f'chunk-{index:05d}.pkl')
+
+
+def load_entry(cache_dir, key, filename):
+    """Cached result for key as {platform, alerts, chunk_count, chunks}, or None on a miss.
+
+    chunks is a generator reading one chunk at a time. Alerts are re-addressed
+    to filename, as the same content may have been uploaded under another name.
+    """
+    entry_dir = os.path.join(cache_dir, key)
+    try:
+        with open(os.path.join(entry_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        os.utime(entry_dir)
+    except (OSError, ValueError):
+        return None
+
+    alerts = [dict(alert, archivo=filename) if alert.get('archivo') == meta['filename'] else alert
+              for alert in meta['alerts']]
+
+    def chunks():
+        for index in range(meta['chunk_count']):
+            yield pd.read_pickle(_chunk_path(entry_dir, index))
+
+    return {'platform': meta['platform'], 'alerts': alerts, 'chunk_count': meta['chunk_count'],
+            'chunks': chunks()}
+
+
+def load_frame(entry):
+    """All chunks of a loaded entry as one frame (None if it has no chunks)."""
+    from .engine import FRAME_COLUMNS, compact_dtypes
+
+    frames = list(entry['chunks'])
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0]
+    # Chunks carry their own categories; concat falls back to object columns
+    return compact_dtypes(pd.concat(frames, ignore_index=True), FRAME_COLUMNS)
+
+
+def _new_entry_dir(cache_dir, key):
+    tmp_dir = os.path.join(cache_dir, f'.{key}.{uuid.uuid4().hex}.tmp')
+    os.makedirs(tmp_dir)
+    return tmp_dir
+
+
+def _commit_entry(cache_dir, key, tmp_dir, filename, platform, alerts, chunk_count):
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'filename': filename, 'platform': platform, 'alerts': alerts,
+                   'chunk_count': chunk_count, 'engine_version': ENGINE_VERSION}, f)
+    try:
+        os.rename(tmp_dir, os.path.join(cache_dir, key))
+    except OSError:
+        # Another request stored the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def store_frame(cache_dir, key, filename, df, platform, alerts):
+    """Store the output frame of a file read whole. Failures only cost the cache entry."""
+    tmp_dir = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_dir = _new_entry_dir(cache_dir, key)
+        df.to_pickle(_chunk_path(tmp_dir, 0))
+        _commit_entry(cache_dir, key, tmp_dir, filename, platform, alerts, 1)
+    except Exception:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def store_chunks(cache_dir, key, filename, chunks, platform, alerts):
+    """Wrap the chunk generator of a streamed file so each chunk is stored as it is consumed.
+
+    The entry is only committed when the generator is exhausted; a run that
+    stops early leaves nothing behind.
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_dir = _new_entry_dir(cache_dir, key)
+    except OSError:
+        yield from chunks
+        return
+
+    count = 0
+    stored = True
+    try:
+        for df in chunks:
+            if stored:
+                try:
+                    df.to_pickle(_chunk_path(tmp_dir, count))
+                except Exception:
+                    stored = False
+            count += 1
+            yield df
+        if stored:
+            _commit_entry(cache_dir, key, tmp_dir, filename, platform, alerts, count)
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _entry_bytes(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def prune_cache(cache_dir, max_age_hours, max_bytes=None):
+    """Remove entries (and abandoned temporary directories) unused for max_age_hours.
+
+    With max_bytes, the least recently used entries are then removed until
+    the remaining ones fit. Returns the number of directories removed.
+    """
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            if not os.path.isdir(path):
+                continue
+            mtime = os.path.getmtime(path)
+            if mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+            elif not name.startswith('.'):
+                entries.append((mtime, _entry_bytes(path), path))
+        except OSError:
+            continue
+
+    if max_bytes:
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+    return removed
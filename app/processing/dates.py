@@ -0,0 +1,119 @@
+"""Date normalization: per-file format inference and cached vectorized parsing."""
+
+import numpy as np
+import pandas as pd
+
+# Report date format stored in DIA (ReportRow.dia)
+DIA_FORMAT = '%d/%m/%y'
+
+# Tried in order; month-first before day-first so fully ambiguous files
+# (every day <= 12) parse as pd.to_datetime() without a format did.
+DATE_FORMATS = [
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y/%m/%d',
+    '%m/%d/%Y', '%d/%m/%Y', '%m/%d/%y', '%d/%m/%y',
+    '%d-%m-%Y', '%m-%d-%Y', '%d.%m.%Y',
+    '%b %d, %Y', '%d %b %Y', '%B %d, %Y',
+]
+
+SAMPLE_SIZE = 500
+MAX_CACHED_VALUES = 100000
+
+
+def _as_datetimes(values):
+    return pd.DatetimeIndex(values).normalize()
+
+
+def infer_date_format(values):
+    """Explicit format that parses the most values of a sample of distinct raw dates, or None.
+
+    Ties go to the earlier entry of DATE_FORMATS.
+    """
+    sample = pd.Index(values).dropna()
+    sample = sample[sample.astype(str).str.strip() != ''][:SAMPLE_SIZE]
+    if len(sample) == 0 or not all(isinstance(v, str) for v in sample):
+        return None
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum()
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+class DateParser:
+    """Parses the date column of one file, chunk after chunk.
+
+    The format is inferred once, from the distinct values of the first block
+    seen; each distinct raw value is parsed once and cached. Values the
+    inferred format does not fit (or all of them, when no explicit format
+    fits the sample) fall back to pd.to_datetime() inference; only values
+    inference cannot read either end up NaT.
+    """
+
+    def __init__(self):
+        self.date_format = None
+        self._inferred = False
+        self._cache = {}
+
+    def parse(self, values):
+        """Datetimes (midnight) for a Series of raw dates, NaT where unparseable."""
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return pd.Series(_as_datetimes(values), index=values.index)
+
+        codes, uniques = pd.factorize(values)
+        if not self._inferred:
+            self.date_format = infer_date_format(uniques)
+            self._inferred = True
+
+        missing = [u for u in uniques if u not in self._cache]
+        if missing:
+            if len(self._cache) + len(missing) > MAX_CACHED_VALUES:
+                self._cache.clear()
+            if self.date_format is not None:
+                parsed = pd.to_datetime(pd.Index(missing, dtype=object), format=self.date_format,
+                                        errors='coerce')
+                unfit = parsed.isna()
+                if unfit.any():
+                    # Values in another format than the rest of the file, parsed one by one
+                    fallback = pd.to_datetime(pd.Index(missing, dtype=object)[unfit], format='mixed',
+                                              errors='coerce')
+                    filled = parsed.to_numpy().copy()
+                    filled[unfit] = fallback.to_numpy(dtype='datetime64[ns]')
+                    parsed = pd.DatetimeIndex(filled)
+            else:
+                parsed = pd.to_datetime(pd.Series(missing, dtype=object), errors='coerce')
+            self._cache.update(zip(missing, _as_datetimes(parsed)))
+
+        parsed_uniques = pd.DatetimeIndex([self._cache[u] for u in uniques])
+        result = parsed_uniques.take(codes, allow_fill=True, fill_value=pd.NaT)
+        return pd.Series(result, index=values.index)
+
+
+def format_dia(fechas):
+    """DIA strings ('%d/%m/%y') for a Series of datetimes, formatting each distinct day once."""
+    codes, uniques = pd.factorize(fechas)
+    labels = np.asarray(pd.DatetimeIndex(uniques).strftime(DIA_FORMAT), dtype=object)
+    result = np.where(codes >= 0, labels[codes] if len(labels) else '', np.nan)
+    return pd.Series(result, index=fechas.index, dtype=object)
+
+
+def parse_dia(values):
+    """Datetimes for DIA strings ('%d/%m/%y'), parsing each distinct value once."""
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Index(uniques, dtype=object).astype(str), format=DIA_FORMAT,
+                            errors='coerce')
+    result = pd.DatetimeIndex(parsed).take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(result, index=values.index)
+
+
+def row_dates(df):
+    """Row dates of an output frame.
+
+    Frames from the engine carry them in FECHA; frames rebuilt from report
+    rows only have DIA, which is parsed once per distinct day.
+    """
+    if 'FECHA' in df.columns:
+        return df['FECHA']
+    return parse_dia(df['DIA'])
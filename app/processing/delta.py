@@ -0,0 +1,173 @@
+"""Incremental (delta) runs for campaign updates.
+
+A daily update usually repeats most of the campaign's previous data. A
+delta run compares the uploaded rows with the previous completed run of the
+campaign (its base run) group by group, where a group is every row sharing
+(PLATAFORMA, CAMPANA, AD GROUP, DIA). The upload covers, per platform, the
+days from its first to its last DIA:
+
+    group only in the upload                   new: stored in the delta run
+    group in both, rows differ                 changed: stored, replaces the base rows
+    group in both, same rows                   unchanged: not stored, inherited
+    base group outside the days covered        inherited
+    (or of a platform not in the upload)
+    base group inside the days covered,        removed: the update is stored whole
+    missing from the upload
+
+A removed group cannot be inherited, so an update that drops an ad group or
+a day within its dates is stored as a full run, exactly as without
+incremental mode.
+
+Rows are compared as they are stored in report_rows, through 64-bit hashes
+of each row's values added up per group. ProcessingRun.report_rows resolves
+what a run inherits in SQL (ProcessingRun.visible_rows_filter); chains are
+capped (see find_base_run) so reads stay cheap.
+"""
+
+import pandas as pd
+
+from .dates import parse_dia
+from .engine import FRAME_COLUMNS, OUTPUT_COLUMNS, compact_dtypes
+
+GROUP_FIELDS = ('plataforma', 'campana', 'ad_group', 'dia')
+# ReportRow columns compared, in OUTPUT_COLUMNS order
+VALUE_FIELDS = ('marca', 'plataforma', 'campana', 'ad_group', 'etapa', 'compra', 'com', 'formato',
+                'audiencia', 'establecimiento', 'ciudad', 'gasto', 'alcance', 'frecuencia', 'clics',
+                'views', 'impresiones', 'registros', 'ctr', 'vtr', 'dia')
+FLOAT_FIELDS = ('gasto', 'alcance', 'frecuencia', 'clics', 'views', 'impresiones', 'ctr', 'vtr')
+INT_FIELDS = ('registros',)
+
+
+def value_frame(df):
+    """ReportRow values (VALUE_FIELDS columns) of an output frame, typed as stored.
+
+    Text is str with '' for missing values, metrics float64 and REGISTROS
+    int64, so rows hash the same whether they come from an upload or from
+    report_rows.
+    """
+    values = {}
+    for field, col in zip(VALUE_FIELDS, OUTPUT_COLUMNS):
+        series = df[col] if col in df.columns else pd.Series('', index=df.index)
+        if field in FLOAT_FIELDS:
+            values[field] = pd.to_numeric(series, errors='coerce').fillna(0).astype('float64')
+        elif field in INT_FIELDS:
+            values[field] = pd.to_numeric(series, errors='coerce').fillna(0).astype('int64')
+        else:
+            values[field] = series.astype(object).where(series.notna(), '').astype(str)
+    return pd.DataFrame(values, index=df.index)
+
+
+def group_hashes(values):
+    """64-bit hash of the (PLATAFORMA, CAMPANA, AD GROUP, DIA) group of each row."""
+    return pd.util.hash_pandas_object(values[list(GROUP_FIELDS)], index=False)
+
+
+def _group_signatures(values, groups):
+    """Rows, and sums of the two halves of the row hashes, per group: equal only for equal rows."""
+    rows = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    parts = pd.DataFrame({'group': groups.to_numpy(), 'rows': 1,
+                          'low': (rows & 0xFFFFFFFF).astype('int64'),
+                          'high': (rows >> 32).astype('int64')})
+    return parts.groupby('group').sum()
+
+
+def stored_values(run):
+    """Value frame (see value_frame) of every row of run, resolved as ProcessingRun.report_rows.
+
+    Read in one query as plain columns instead of ORM objects, as delta runs
+    compare whole runs. Rows saved before missing text was stored as '' hold
+    'nan' instead; it is read back as ''.
+    """
+    from sqlalchemy import select
+    from app import db
+    from app.models import ReportRow
+
+    query = select(*[getattr(ReportRow, field) for field in VALUE_FIELDS])\
+        .where(run.visible_rows_filter()).order_by(ReportRow.run_id.desc(), ReportRow.id)
+    stored = pd.DataFrame(db.session.execute(query).all(), columns=OUTPUT_COLUMNS)
+    values = value_frame(stored)
+    for field in VALUE_FIELDS:
+        if field not in FLOAT_FIELDS and field not in INT_FIELDS:
+            values[field] = values[field].replace('nan', '')
+    return values
+
+
+def chain_length(run):
+    """Number of base runs behind run."""
+    return len(run.chain_ids()) - 1
+
+
+def find_base_run(campaign_id, max_chain):
+    """Latest completed run of the campaign to build a delta run on.
+
+    None when the campaign has no completed run yet, or when that run already
+    sits on max_chain base runs: the update is then stored in full and starts
+    a new chain.
+    """
+    from app.models import ProcessingRun
+
+    base = (ProcessingRun.query
+            .filter_by(campaign_id=campaign_id, status='completed')
+            .order_by(ProcessingRun.created_at.desc(), ProcessingRun.id.desc())
+            .first())
+    if base is None or chain_length(base) + 1 > max_chain:
+        return None
+    return base
+
+
+def rows_frame(values):
+    """Output frame (FRAME_COLUMNS) for stored row values (see value_frame)."""
+    df = values.set_axis(OUTPUT_COLUMNS, axis=1).reset_index(drop=True)
+    df['FECHA'] = parse_dia(df['DIA'])
+    return compact_dtypes(df, FRAME_COLUMNS)
+
+
+def _covered(values, fechas, upload_values, upload_fechas):
+    """Rows of values whose day falls within the days the upload covers for their platform."""
+    rangos = pd.DataFrame({'plataforma': upload_values['plataforma'], 'fecha': upload_fechas})\
+        .dropna().groupby('plataforma')['fecha'].agg(['min', 'max'])
+    desde = values['plataforma'].map(rangos['min'])
+    hasta = values['plataforma'].map(rangos['max'])
+    return ((fechas >= desde) & (fechas <= hasta)).to_numpy()
+
+
+def plan_delta(frames, base_run):
+    """Compare the uploaded output frames with base_run.
+
+    Returns {base_run_id, changed, inherited, rows_unchanged}: changed is the
+    set of group hashes to store (see changed_rows), inherited a frame of the
+    base rows outside the upload's days (the run's aggregates must include
+    them). Returns None when the upload removes base groups within its days:
+    the run must then be stored whole.
+    """
+    frames = [df for df in frames if len(df)]
+    upload = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FRAME_COLUMNS)
+    upload_values = value_frame(upload)
+    upload_groups = group_hashes(upload_values)
+    upload_fechas = upload['FECHA'] if 'FECHA' in upload.columns else parse_dia(upload_values['dia'])
+
+    base_values = stored_values(base_run)
+    base_groups = group_hashes(base_values)
+    base_fechas = parse_dia(base_values['dia'])
+
+    covered = _covered(base_values, base_fechas, upload_values, upload_fechas)
+    in_upload = base_groups.isin(upload_groups).to_numpy()
+    if (covered & ~in_upload).any():
+        return None
+
+    upload_signatures = _group_signatures(upload_values, upload_groups)
+    base_signatures = _group_signatures(base_values, base_groups)
+    same = upload_signatures.eq(base_signatures.reindex(upload_signatures.index)).all(axis=1)
+    changed = set(upload_signatures.index[~same.to_numpy()])
+
+    rows_unchanged = int(upload_signatures.loc[same.to_numpy(), 'rows'].sum())
+    inherited = base_values[~in_upload]
+    return {'base_run_id': base_run.id, 'changed': changed, 'inherited': rows_frame(inherited),
+            'rows_unchanged': rows_unchanged}
+
+
+def changed_rows(df, changed):
+    """Rows of an output frame whose group hash is in changed."""
+    if df.empty:
+        return df
+    return df[group_hashes(value_frame(df)).isin(changed).to_numpy()]
@@ -0,0 +1,113 @@
+"""Run-to-run comparison from grouped aggregates.
+
+Two runs are compared group by group at a chosen granularity, a list of
+dimensions from GRANULARITIES (platform, format, day, ad_group). Each run's
+groups are summed in SQL, so only one row per group reaches Python however
+large the runs are. Delta runs are aggregated over the rows they resolve to
+(ProcessingRun.visible_rows_filter): a row stored by a base run is skipped
+when a newer run of the chain stores its (PLATAFORMA, CAMPANA, AD GROUP, DIA)
+group.
+"""
+
+# Dimension -> ReportRow columns in the group key
+GRANULARITIES = {
+    'platform': ('plataforma',),
+    'format': ('formato',),
+    'day': ('dia',),
+    'ad_group': ('campana', 'ad_group'),
+}
+# Additive ReportRow metrics (ratios such as CTR are not summed)
+SUM_FIELDS = ('gasto', 'alcance', 'clics', 'views', 'impresiones', 'registros')
+# Differences below this are float noise from summing in a different order
+TOLERANCE = 0.005
+
+
+def parse_granularity(value):
+    """ReportRow key columns for a comma-separated list of dimensions.
+
+    Raises ValueError for an unknown dimension.
+    """
+    dims = [dim.strip().lower() for dim in (value or 'platform').split(',') if dim.strip()]
+    unknown = [dim for dim in dims if dim not in GRANULARITIES]
+    if unknown or not dims:
+        raise ValueError(f"Granularidad desconocida: {', '.join(unknown)} "
+                         f"(opciones: {', '.join(GRANULARITIES)})")
+    columns = []
+    for dim in dims:
+        columns.extend(col for col in GRANULARITIES[dim] if col not in columns)
+    return dims, columns
+
+
+def run_aggregates(run, columns):
+    """{group key tuple: {FILAS, GASTO, ...}} of a run, summed in SQL by columns."""
+    from sqlalchemy import func, select
+    from app import db
+    from app.models import ReportRow
+
+    keys = [getattr(ReportRow, col) for col in columns]
+    query = select(*keys, func.count(ReportRow.id),
+                   *[func.coalesce(func.sum(getattr(ReportRow, field)), 0) for field in SUM_FIELDS])\
+        .where(run.visible_rows_filter()).group_by(*keys)
+
+    result = {}
+    for row in db.session.execute(query):
+        key = tuple(value or '' for value in row[:len(keys)])
+        values = {'FILAS': row[len(keys)]}
+        values.update((field.upper(), float(value)) for field, value in zip(SUM_FIELDS, row[len(keys) + 1:]))
+        result[key] = values
+    return result
+
+
+def _delta(values_a, values_b):
+    return {metric: round(values_b[metric] - values_a[metric], 2) for metric in values_a}
+
+
+def _differs(values_a, values_b):
+    return any(abs(values_b[metric] - values_a[metric]) >= TOLERANCE for metric in values_a)
+
+
+def _totals(groups):
+    totals = {'FILAS': 0, **{field.upper(): 0.0 for field in SUM_FIELDS}}
+    for values in groups.values():
+        for metric, value in values.items():
+            totals[metric] += value
+    return {metric: round(value, 2) for metric, value in totals.items()}
+
+
+def diff_runs(run_a, run_b, columns):
+    """Compare run_b against run_a at the granularity of columns (see parse_granularity).
+
+    Returns {totals, added, removed, changed, unchanged}: added groups are only
+    in run_b, removed only in run_a, changed in both with different metrics;
+    unchanged is the number of groups with the same metrics.
+    """
+    groups_a = run_aggregates(run_a, columns)
+    groups_b = run_aggregates(run_b, columns)
+
+    def group(key):
+        return dict(zip((col.upper().replace('_', ' ') for col in columns), key))
+
+    def rounded(values):
+        return {metric: round(value, 2) for metric, value in values.items()}
+
+    added = [{'group': group(key), 'values': rounded(groups_b[key])}
+             for key in sorted(groups_b.keys() - groups_a.keys())]
+    removed = [{'group': group(key), 'values': rounded(groups_a[key])}
+               for key in sorted(groups_a.keys() - groups_b.keys())]
+    changed = []
+    unchanged = 0
+    for key in sorted(groups_a.keys() & groups_b.keys()):
+        if _differs(groups_a[key], groups_b[key]):
+            changed.append({'group': group(key), 'a': rounded(groups_a[key]), 'b': rounded(groups_b[key]),
+                            'delta': _delta(groups_a[key], groups_b[key])})
+        else:
+            unchanged += 1
+
+    totals_a, totals_b = _totals(groups_a), _totals(groups_b)
+    return {
+        'totals': {'a': totals_a, 'b': totals_b, 'delta': _delta(totals_a, totals_b)},
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'unchanged': unchanged,
+    }
@@ -2,42 +2,48 @@
 
 import io
 import re
+import json
+import codecs
+from functools import lru_cache
+import numpy as np
 import pandas as pd
-from .nomenclature import normalize, detect_platform, parse_nomenclature, detect_campaign_from_file, extract_campaign_info
-from .alerts import verificar_columnas_criticas, verificar_campos_vacios
-from .metrics import calcular_alcance_deduplicado
-from .history import verificar_plataformas_faltantes, verificar_datos_historicos, save_history
-
-COLUMN_MAPPING = {
-    'alcance': ['alcance', 'reach', 'unique users'],
-    'gasto': ['importe gastado', 'amount spent', 'cost', 'costo', 'spend', 'coste',
-              'importe gastado (usd)', 'total cost'],
-    'frecuencia': ['frecuencia', 'frequency', 'avg frequency'],
-    'clics': ['clics en el enlace', 'link clicks', 'clics', 'clicks',
-              'clicks (destination)', 'all clicks', 'clicks (all)'],
-    'views': ['thruplays', 'thru plays',
-              'visualizaciones de trueview', 'vistas de trueview',
-              'trueview views',
-              '6-second focused views',
-              '15-second focused views',
-              'vistas', 'views', 'video views'],
-    'impresiones': ['impresiones', 'impressions', 'impr.', 'imps'],
-    'dia': ['dia', 'day', 'by day', 'date', 'fecha', 'reporting starts', 'dia', 'daa'],
-    'campana': ['nombre de la campana', 'campaign name', 'campaign', 'campana',
-                'campana', 'nombre de la campana'],
-    'ad_group': ['nombre del conjunto de anuncios', 'ad set name', 'ad group name',
-                 'grupo de anuncios', 'ad set', 'ad group'],
-    'establecimiento': ['establecimiento', 'establishment', 'estab'],
-    'ciudad': ['ciudad', 'city', 'location', 'geo', 'region', 'ubicacion', 'localidad'],
-    'registros': ['conversiones', 'conversions', 'todas las conv.', 'all conversions',
-                  'registro completado', 'registros completados', 'registros completado',
-                  'registro completados', 'completed registration', 'registrations']
-}
+from .nomenclature import (normalize, parse_nomenclature, collect_campaign_info,
+                           campaign_info_from_counts, campaign_display_name)
+from .registry import resolve_header
+from .alerts import verificar_columnas_criticas, contar_campos_vacios, alertas_campos_vacios
+from .metrics import collect_reach, alcance_from_reach
+from .history import verificar_historial, save_history, collect_platform_stats
+from .summary import collect_summary, summary_from_totals
+from .dates import DateParser, format_dia
+from .profiling import RunProfile, NO_PROFILE
+from . import cache
 
 OUTPUT_COLUMNS = ['MARCA', 'PLATAFORMA', 'CAMPANA', 'AD GROUP', 'ETAPA', 'COMPRA',
                   'COM', 'FORMATO', 'AUDIENCIA', 'ESTABLECIMIENTO', 'CIUDAD', 'GASTO', 'ALCANCE',
                   'FRECUENCIA', 'CLICS', 'VIEWS', 'IMPRESIONES', 'REGISTROS', 'CTR', 'VTR', 'DIA']
 
+# Processed frames also carry FECHA, the parsed DIA as datetime64, so later
+# stages (history, reach) never parse DIA strings again. It is not stored.
+FRAME_COLUMNS = OUTPUT_COLUMNS + ['FECHA']
+
+# Low-cardinality text columns kept as category and count columns downcast
+# to integers in the output frames (see compact_dtypes). GASTO, FRECUENCIA,
+# CTR and VTR stay float64 so totals match to the cent.
+DIMENSION_COLUMNS = ['MARCA', 'PLATAFORMA', 'CAMPANA', 'AD GROUP', 'ETAPA', 'COMPRA', 'COM',
+                     'FORMATO', 'AUDIENCIA', 'ESTABLECIMIENTO', 'CIUDAD', 'DIA']
+COUNT_COLUMNS = ['ALCANCE', 'CLICS', 'VIEWS', 'IMPRESIONES', 'REGISTROS']
+
+# Nomenclature fields extracted from campaign (and, as fallback, ad group) names
+NOMENCLATURE_FIELDS = ['MARCA', 'PLATAFORMA', 'ETAPA', 'COMPRA', 'COM', 'FORMATO', 'AUDIENCIA',
+                       'ESTABLECIMIENTO', 'CIUDAD']
+
+# Rows per chunk and header sample size for streamed CSV files (see stream_csv_file)
+STREAM_CHUNK_ROWS = 50000
+STREAM_HEAD_BYTES = 256 * 1024
+
+# Rows per INSERT statement when saving report rows
+INSERT_BATCH_ROWS = 5000
+
 
 def normalizar_nombre_campana(nombre):
     """Normalize campaign name for use as slug."""
@@ -59,129 +65,313 @@ def detect_header_row(df_raw):
     return 0
 
 
-def map_columns(df, filename, platform):
-    """Map platform-specific column names to standard names."""
-    df = df.copy()
-    original_columns = list(df.columns)
-    df.columns = [normalize(col) for col in df.columns]
+def compact_dtypes(df, columns=None):
+    """Memory-compact frame with the given columns (all by default).
+
+    Text dimension columns become category and whole-number count columns
+    the smallest integer dtype; values are unchanged. Builds the result
+    column by column, without copying the whole frame first.
+    """
+    compact = {}
+    for col in (columns if columns is not None else df.columns):
+        series = df[col]
+        if col in DIMENSION_COLUMNS and (pd.api.types.is_object_dtype(series)
+                                         or pd.api.types.is_string_dtype(series)):
+            series = series.astype('category')
+        elif col in COUNT_COLUMNS and pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, downcast='integer')
+        compact[col] = series
+    return pd.DataFrame(compact, index=df.index)
+
+
+def header_alerts(header, filename):
+    """Platform detection and missing-column alerts for a resolved file header."""
+    alerts = []
+    if header.platform == 'DESCONOCIDO':
+        alerts.append({'tipo': 'ADVERTENCIA', 'archivo': filename,
+                       'mensaje': 'No se pudo detectar la plataforma automaticamente'})
+    map_alerts, _ = verificar_columnas_criticas(header.columnas_encontradas, filename, header.platform)
+    alerts.extend(map_alerts)
+    return alerts
 
-    column_map = {}
-    columnas_encontradas = []
 
-    for std_name, variants in COLUMN_MAPPING.items():
-        for col in df.columns:
-            if col in [normalize(v) for v in variants]:
-                column_map[col] = std_name.upper()
-                columnas_encontradas.append(std_name.upper())
-                break
+def filter_campaign_rows(df, campaign_filter):
+    """Keep only the rows of a raw file whose campaign display name matches campaign_filter.
+
+    Nomenclature is parsed once per distinct campaign name, not once per row.
+    Files without a campaign column have no rows for any campaign.
+    """
+    campaign_col = resolve_header(df.columns).raw_campaign_col
+    if campaign_col is None:
+        return df.iloc[0:0]
+
+    display_names = {raw: campaign_display_name(raw) for raw in df[campaign_col].dropna().unique()}
+    return df[df[campaign_col].map(display_names) == campaign_filter]
+
+
+def filter_campaign_frame(df, campaign_filter):
+    """Keep only the rows of an output frame whose campaign display name matches campaign_filter.
+
+    Same rows as filter_campaign_rows on the raw file, as CAMPANA holds the
+    raw campaign name.
+    """
+    display_names = {raw: campaign_display_name(raw) for raw in df['CAMPANA'].dropna().unique()}
+    return df[(df['CAMPANA'].map(display_names) == campaign_filter).to_numpy()]
+
+
+def _csv_read_params(raw_lines, encoding):
+    """read_csv parameters for an export, from its first lines: header row and number format."""
+    # Detect header row
+    skiprows = 0
+    keywords = ['campana', 'campaign', 'dia', 'day', 'clics', 'clicks',
+                 'impresiones', 'impressions', 'gasto', 'cost', 'coste', 'impr', 'fecha', 'date']
+    for i, line in enumerate(raw_lines):
+        line_lower = normalize(line)
+        matches = sum(1 for kw in keywords if kw in line_lower)
+        if matches >= 2:
+            skiprows = i
+            break
 
-    df = df.rename(columns=column_map)
+    # Detect European number format
+    sample_lines = '\n'.join(raw_lines[skiprows+1:skiprows+5])
+    uses_european_format = bool(re.search(r'"[\d.]+,\d{2}"', sample_lines))
 
-    alerts, has_critical = verificar_columnas_criticas(columnas_encontradas, filename, platform)
-    return df, has_critical, alerts
+    csv_params = {'encoding': encoding, 'skiprows': skiprows, 'on_bad_lines': 'skip'}
+    if uses_european_format:
+        csv_params['decimal'] = ','
+        csv_params['thousands'] = '.'
+    return csv_params
 
 
-def process_file_from_memory(file_storage, filename):
-    """Process an uploaded file (from memory). Returns (df_output, platform, alerts)."""
+@lru_cache(maxsize=None)
+def pyarrow_available():
+    """True when the optional pyarrow package is installed."""
+    import importlib.util
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def column_pushdown(columns, header):
+    """read_csv parameters that read only the columns the pipeline uses.
+
+    Returns (params, header) where header is the resolution of the full raw
+    header restricted to those columns, ready for standardize_rows. Text
+    columns (dates, campaign and ad group names, places) are read as str.
+    Files with no known column are read whole.
+    """
+    if not header.used_columns:
+        return {}, header
+    params = {'usecols': list(header.used_columns),
+              'dtype': {columns[i]: str for i in header.text_columns}}
+    return params, header._replace(
+        mapped_columns=[header.mapped_columns[i] for i in header.used_columns])
+
+
+def read_csv_columns(source, csv_params, columns, header):
+    """Read the used columns of a CSV export (see column_pushdown). Returns (df, header).
+
+    Uses the pyarrow engine when it is installed. European number formats
+    stay on the C parser (pyarrow has no thousands separator), and so do
+    files pyarrow rejects, e.g. rows with a different number of fields,
+    which the C parser pads or skips.
+    """
+    params, header = column_pushdown(columns, header)
+    if pyarrow_available() and 'thousands' not in csv_params:
+        arrow_params = dict(csv_params, engine='pyarrow', on_bad_lines='error')
+        if params:
+            arrow_params.update(params, usecols=[columns[i] for i in params['usecols']])
+        try:
+            return pd.read_csv(source, **arrow_params), header
+        except Exception:
+            source.seek(0)
+    return pd.read_csv(source, **csv_params, **params), header
+
+
+def process_file_from_memory(file_storage, filename, campaign_filter=None, profile=NO_PROFILE):
+    """Process a whole uploaded file. Returns (df_output, platform, alerts).
+
+    file_storage is any seekable binary file (the saved upload on disk); it
+    is parsed straight from the stream, without an in-memory copy of its
+    bytes. With campaign_filter, rows of other campaigns are dropped right
+    after the file is read so they never reach mapping, nomenclature or
+    metric stages. Reading, filtering and each standardization step are
+    stages of profile.
+    """
     alerts = []
     ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
     is_csv = ext == 'csv'
 
-    file_bytes = file_storage.read()
+    with profile.stage('read', filename) as stage:
+        if is_csv:
+            # Encoding over the whole file, header row and number format from its first lines
+            csv_encoding = _detect_stream_encoding(file_storage)
+            head = file_storage.read(STREAM_HEAD_BYTES)
+            file_storage.seek(0)
+            raw_lines = codecs.getincrementaldecoder(csv_encoding)().decode(head).split('\n')[:15]
+            csv_params = _csv_read_params(raw_lines, csv_encoding)
+
+            # Mapping, platform and key columns, resolved once per export template
+            try:
+                columns = pd.read_csv(file_storage, nrows=0, **csv_params).columns
+                file_storage.seek(0)
+                header = resolve_header(columns)
+                df, header = read_csv_columns(file_storage, csv_params, columns, header)
+            except Exception as e:
+                alerts.append({'tipo': 'ERROR', 'archivo': filename, 'mensaje': f"No se pudo leer CSV: {e}"})
+                raise
+            finally:
+                file_storage.seek(0)
+        else:
+            # Excel
+            try:
+                df_raw = pd.read_excel(file_storage, header=None, nrows=10)
+            except Exception as e:
+                alerts.append({'tipo': 'ERROR', 'archivo': filename, 'mensaje': f"No se pudo leer el archivo: {e}"})
+                raise
+            finally:
+                file_storage.seek(0)
+
+            skiprows = detect_header_row(df_raw)
+            df = pd.read_excel(file_storage, skiprows=skiprows)
+            file_storage.seek(0)
+            header = resolve_header(df.columns)
+
+        stage['rows_out'] = len(df)
+
+    if campaign_filter:
+        with profile.stage('filter', filename, rows_in=len(df)) as stage:
+            df = filter_campaign_rows(df, campaign_filter)
+            stage['rows_out'] = len(df)
+
+    alerts.extend(header_alerts(header, filename))
+
+    return standardize_rows(df, header, filename=filename, profile=profile), header.platform, alerts
+
+
+def _detect_stream_encoding(file_storage):
+    """'utf-8' if the whole file decodes as UTF-8, else 'latin-1', reading it in blocks."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for block in iter(lambda: file_storage.read(1024 * 1024), b''):
+            decoder.decode(block)
+        decoder.decode(b'', final=True)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+    finally:
+        file_storage.seek(0)
+
+
+def stream_csv_file(file_storage, filename, campaign_filter=None, chunksize=STREAM_CHUNK_ROWS,
+                    profile=NO_PROFILE):
+    """Open a CSV export for chunked processing. Returns (chunks, platform, alerts).
+
+    Encoding, header row and number format are detected as in
+    process_file_from_memory without loading the file. chunks is a generator
+    of output DataFrames (same columns as process_file_from_memory) that only
+    reads the next block of rows once the previous one has been consumed.
+    The stages of every chunk add up in profile.
+    """
+    encoding = _detect_stream_encoding(file_storage)
+    head = file_storage.read(STREAM_HEAD_BYTES)
     file_storage.seek(0)
+    raw_lines = codecs.getincrementaldecoder(encoding)().decode(head).split('\n')[:15]
+    csv_params = _csv_read_params(raw_lines, encoding)
 
-    if is_csv:
-        # Detect encoding
-        csv_encoding = 'utf-8'
-        try:
-            raw_text = file_bytes.decode('utf-8')
-        except UnicodeDecodeError:
-            csv_encoding = 'latin-1'
-            raw_text = file_bytes.decode('latin-1')
-
-        raw_lines = raw_text.split('\n')[:15]
+    try:
+        columns = pd.read_csv(file_storage, nrows=0, **csv_params).columns
+    except Exception as e:
+        raise ValueError(f"No se pudo leer CSV: {e}") from e
+    finally:
+        file_storage.seek(0)
+
+    header = resolve_header(columns)
+    alerts = header_alerts(header, filename)
+    dates = DateParser()
+    # Chunked reads need the C parser; they still read only the used columns
+    read_params, header = column_pushdown(columns, header)
+
+    def chunks():
+        with pd.read_csv(file_storage, chunksize=chunksize, **csv_params, **read_params) as reader:
+            while True:
+                with profile.stage('read', filename) as stage:
+                    df = next(reader, None)
+                    stage['rows_out'] = 0 if df is None else len(df)
+                if df is None:
+                    break
+                if campaign_filter:
+                    with profile.stage('filter', filename, rows_in=len(df)) as stage:
+                        df = filter_campaign_rows(df, campaign_filter)
+                        stage['rows_out'] = len(df)
+                if not df.empty:
+                    yield standardize_rows(df, header, dates=dates, filename=filename, profile=profile)
 
-        # Detect header row
-        skiprows = 0
-        keywords = ['campana', 'campaign', 'dia', 'day', 'clics', 'clicks',
-                     'impresiones', 'impressions', 'gasto', 'cost', 'coste', 'impr', 'fecha', 'date']
-        for i, line in enumerate(raw_lines):
-            line_lower = normalize(line)
-            matches = sum(1 for kw in keywords if kw in line_lower)
-            if matches >= 2:
-                skiprows = i
-                break
+    return chunks(), header.platform, alerts
 
-        # Detect European number format
-        sample_lines = '\n'.join(raw_lines[skiprows+1:skiprows+5])
-        uses_european_format = bool(re.search(r'"[\d.]+,\d{2}"', sample_lines))
 
-        csv_params = {'encoding': csv_encoding, 'skiprows': skiprows, 'on_bad_lines': 'skip'}
-        if uses_european_format:
-            csv_params['decimal'] = ','
-            csv_params['thousands'] = '.'
+def standardize_rows(df, header, dates=None, filename='', profile=NO_PROFILE):
+    """Map a block of raw rows (with the given resolved header) to FRAME_COLUMNS.
 
-        try:
-            df = pd.read_csv(io.BytesIO(file_bytes), **csv_params)
-        except Exception as e:
-            alerts.append({'tipo': 'ERROR', 'archivo': filename, 'mensaje': f"No se pudo leer CSV: {e}"})
-            raise
-    else:
-        # Excel
-        try:
-            df_raw = pd.read_excel(io.BytesIO(file_bytes), header=None, nrows=10)
-        except Exception as e:
-            alerts.append({'tipo': 'ERROR', 'archivo': filename, 'mensaje': f"No se pudo leer el archivo: {e}"})
-            raise
+    Runs column mapping, nomenclature parsing, platform fallback, metric and
+    date normalization. Used for whole files and for streamed chunks alike;
+    chunks of one file share its DateParser (dates). Each step is timed as a
+    stage of profile.
+    """
+    with profile.stage('nomenclature', filename, rows_in=len(df)) as stage:
+        df = _apply_nomenclature(df, header)
+        stage['rows_out'] = len(df)
+    with profile.stage('metrics', filename, rows_in=len(df)) as stage:
+        df = _normalize_metrics(df)
+        stage['rows_out'] = len(df)
+    with profile.stage('dates', filename, rows_in=len(df)) as stage:
+        df = _normalize_dates(df, dates or DateParser())
+        stage['rows_out'] = len(df)
+    with profile.stage('dtypes', filename, rows_in=len(df)) as stage:
+        df = compact_dtypes(df, FRAME_COLUMNS)
+        stage['rows_out'] = len(df)
+    return df
+
+
+def _nomenclature_fields(names):
+    """{field: object array} of the NOMENCLATURE_FIELDS of each name ('' when absent).
+
+    Each distinct name is parsed once and the rows take their values by code.
+    """
+    codes, uniques = pd.factorize(names)
+    parsed = [parse_nomenclature(name) for name in uniques]
+    fields = {}
+    for field in NOMENCLATURE_FIELDS:
+        # Last label '' for missing names (code -1)
+        labels = np.array([values.get(field, '') for values in parsed] + [''], dtype=object)
+        fields[field] = labels[codes]
+    return fields
 
-        skiprows = detect_header_row(df_raw)
-        df = pd.read_excel(io.BytesIO(file_bytes), skiprows=skiprows)
 
-    # Detect platform BEFORE normalizing columns
-    platform = detect_platform(df)
-    if platform == 'DESCONOCIDO':
-        alerts.append({'tipo': 'ADVERTENCIA', 'archivo': filename,
-                       'mensaje': 'No se pudo detectar la plataforma automaticamente'})
+def _apply_nomenclature(df, header):
+    """Mapped columns plus nomenclature fields, PLATAFORMA and AD GROUP."""
+    platform = header.platform
 
-    # Map columns
-    df, has_critical, map_alerts = map_columns(df, filename, platform)
-    alerts.extend(map_alerts)
+    # Map columns (df is a fresh read or filter result owned by this call, so no copy)
+    df.columns = header.mapped_columns
 
-    # Find campaign column
-    campaign_col = None
-    for col in df.columns:
-        col_norm = normalize(col)
-        if 'campaign' in col_norm or 'campana' in col_norm or col == 'CAMPANA':
-            campaign_col = col
-            break
+    campaign_col = header.campaign_col
 
     # Extract nomenclature metadata
-    fields_to_extract = ['MARCA', 'PLATAFORMA', 'ETAPA', 'COMPRA', 'COM', 'FORMATO', 'AUDIENCIA', 'ESTABLECIMIENTO', 'CIUDAD']
-    for field in fields_to_extract:
-        df[field] = ''
-
     if campaign_col:
-        for idx, row in df.iterrows():
-            parsed = parse_nomenclature(row[campaign_col])
-            for field in fields_to_extract:
-                if field in parsed:
-                    df.at[idx, field] = parsed[field]
+        fields = _nomenclature_fields(df[campaign_col])
         df['CAMPANA'] = df[campaign_col]
+    else:
+        fields = {field: np.full(len(df), '', dtype=object) for field in NOMENCLATURE_FIELDS}
 
     # Parse ad group column for fallback metadata
-    ad_group_col_for_parse = None
-    for col in df.columns:
-        col_norm = normalize(col)
-        if any(kw in col_norm for kw in ['conjunto', 'ad set', 'ad group', 'ad_group', 'grupo']) or col == 'AD_GROUP':
-            ad_group_col_for_parse = col
-            break
+    ad_group_col_for_parse = header.ad_group_parse_col
 
     if ad_group_col_for_parse:
-        for idx, row in df.iterrows():
-            parsed_adgroup = parse_nomenclature(row[ad_group_col_for_parse])
-            for field in fields_to_extract:
-                if (pd.isna(df.at[idx, field]) or df.at[idx, field] == '') and field in parsed_adgroup:
-                    df.at[idx, field] = parsed_adgroup[field]
+        fallback = _nomenclature_fields(df[ad_group_col_for_parse])
+        for field in NOMENCLATURE_FIELDS:
+            fields[field] = np.where(fields[field] == '', fallback[field], fields[field])
+
+    for field in NOMENCLATURE_FIELDS:
+        df[field] = fields[field]
 
     # Assign detected platform where empty
     if 'PLATAFORMA' not in df.columns:
@@ -190,19 +380,19 @@ def process_file_from_memory(file_storage, filename):
         df['PLATAFORMA'] = df['PLATAFORMA'].replace('', platform)
         df['PLATAFORMA'] = df['PLATAFORMA'].fillna(platform)
 
-    # Find ad group column for output
-    ad_group_col = None
-    for col in df.columns:
-        col_norm = normalize(col)
-        if 'ad group' in col_norm or 'ad set' in col_norm or 'conjunto' in col_norm or col == 'AD_GROUP':
-            ad_group_col = col
-            break
+    # Ad group column for output
+    ad_group_col = header.ad_group_col
 
     if ad_group_col:
         df['AD GROUP'] = df[ad_group_col]
     else:
         df['AD GROUP'] = ''
 
+    return df
+
+
+def _normalize_metrics(df):
+    """CTR/VTR and numeric metric columns."""
     # Calculate CTR and VTR
     if 'CLICS' in df.columns and 'IMPRESIONES' in df.columns:
         df['CTR'] = (pd.to_numeric(df['CLICS'], errors='coerce') /
@@ -226,24 +416,159 @@ def process_file_from_memory(file_storage, filename):
     if 'REGISTROS' in df.columns:
         df['REGISTROS'] = pd.to_numeric(df['REGISTROS'], errors='coerce').fillna(0).round().astype(int)
 
+    return df
+
+
+def _normalize_dates(df, dates):
+    """FECHA and DIA from the raw date column, dropping rows without a date."""
     # Format date — drop rows where date can't be parsed (they become "nan" and create ghost data points)
     if 'DIA' in df.columns:
-        df['DIA'] = pd.to_datetime(df['DIA'], errors='coerce')
-        df = df.dropna(subset=['DIA'])
-        df['DIA'] = df['DIA'].dt.strftime('%d/%m/%y')
+        df['FECHA'] = dates.parse(df['DIA'])
+        df = df.dropna(subset=['FECHA'])
+        df['DIA'] = format_dia(df['FECHA'])
+    else:
+        df['FECHA'] = pd.NaT
 
     # Ensure all output columns exist
     for col in OUTPUT_COLUMNS:
         if col not in df.columns:
             df[col] = ''
 
-    df_output = df[OUTPUT_COLUMNS].copy()
-    return df_output, platform, alerts
+    return df
+
+
+SCAN_HEADER_KEYWORDS = ['campana', 'campaign', 'dia', 'day', 'clics', 'clicks',
+                        'impresiones', 'impressions', 'gasto', 'cost', 'coste']
+
+
+def _scan_csv_params(file_path):
+    """Encoding and header row of a CSV export, from its first lines only."""
+    with open(file_path, 'rb') as f:
+        head = f.read(64 * 1024)
+    try:
+        head_text = head.decode('utf-8')
+        encoding = 'utf-8'
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the 64 KB boundary is still UTF-8
+        if e.start < len(head) - 3:
+            head_text = head.decode('latin-1')
+            encoding = 'latin-1'
+        else:
+            head_text = head[:e.start].decode('utf-8')
+            encoding = 'utf-8'
+
+    skiprows = 0
+    for i, line in enumerate(head_text.split('\n')[:15]):
+        if sum(1 for kw in SCAN_HEADER_KEYWORDS if kw in normalize(line)) >= 2:
+            skiprows = i
+            break
+    return {'encoding': encoding, 'skiprows': skiprows}
+
+
+def _scan_file_fast(file_path, ext):
+    """Read only the campaign and date columns and aggregate them in one groupby.
+
+    Returns (platform, {raw_name: (filas, fecha_min, fecha_max)}) or None when
+    the file has no campaign column.
+    """
+    if ext == 'csv':
+        params = _scan_csv_params(file_path)
+        header = pd.read_csv(file_path, nrows=0, **params)
+    else:
+        df_raw = pd.read_excel(file_path, header=None, nrows=10)
+        params = {'skiprows': detect_header_row(df_raw)}
+        header = pd.read_excel(file_path, nrows=0, **params)
+
+    resolved = resolve_header(header.columns)
+    platform = resolved.platform
+    campaign_col = resolved.raw_campaign_col
+    if campaign_col is None:
+        return None
+    date_col = resolved.raw_date_col
+    usecols = [campaign_col] if date_col is None else [campaign_col, date_col]
+
+    if ext == 'csv':
+        try:
+            df = pd.read_csv(file_path, usecols=usecols, on_bad_lines='skip', **params)
+        except UnicodeDecodeError:
+            # Non UTF-8 bytes past the sampled header
+            params['encoding'] = 'latin-1'
+            df = pd.read_csv(file_path, usecols=usecols, on_bad_lines='skip', **params)
+    else:
+        df = pd.read_excel(file_path, usecols=usecols, **params)
+
+    names = df[campaign_col].dropna().astype(str).str.strip()
+    names = names[names != '']
+    frame = pd.DataFrame({'nombre': names})
+    if date_col is not None:
+        frame['fecha'] = DateParser().parse(df.loc[names.index, date_col])
+    else:
+        frame['fecha'] = pd.NaT
+
+    stats = frame.groupby('nombre', sort=False).agg(filas=('nombre', 'size'),
+                                        fecha_min=('fecha', 'min'),
+                                        fecha_max=('fecha', 'max'))
+    per_name = {name: (int(row.filas), row.fecha_min, row.fecha_max)
+                for name, row in stats.iterrows()}
+    return platform, per_name
+
+
+def _scan_file_full(file_path, ext):
+    """Full read of a file, filtering rows once per campaign name. Same return as _scan_file_fast."""
+    with open(file_path, 'rb') as f:
+        file_bytes = f.read()
 
+    if ext == 'csv':
+        try:
+            raw_text = file_bytes.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            raw_text = file_bytes.decode('latin-1')
+            encoding = 'latin-1'
+
+        raw_lines = raw_text.split('\n')[:15]
+        skiprows = 0
+        for i, line in enumerate(raw_lines):
+            if sum(1 for kw in SCAN_HEADER_KEYWORDS if kw in normalize(line)) >= 2:
+                skiprows = i
+                break
+        df = pd.read_csv(io.BytesIO(file_bytes), skiprows=skiprows,
+                         on_bad_lines='skip', encoding=encoding)
+    else:
+        df_raw = pd.read_excel(io.BytesIO(file_bytes), header=None, nrows=10)
+        skiprows = detect_header_row(df_raw)
+        df = pd.read_excel(io.BytesIO(file_bytes), skiprows=skiprows)
+
+    resolved = resolve_header(df.columns)
+    platform = resolved.platform
+    campaign_col = resolved.raw_campaign_col
+    date_col = resolved.raw_date_col
+    if campaign_col is None:
+        return None
+
+    per_name = {}
+    for raw_name in df[campaign_col].dropna().unique():
+        raw_name = str(raw_name).strip()
+        if not raw_name:
+            continue
+        rows_for_name = df[df[campaign_col] == raw_name]
+        fecha_min = fecha_max = pd.NaT
+        if date_col:
+            dates = pd.to_datetime(rows_for_name[date_col], errors='coerce').dropna()
+            if not dates.empty:
+                fecha_min, fecha_max = dates.min(), dates.max()
+        per_name[raw_name] = (len(rows_for_name), fecha_min, fecha_max)
+    return platform, per_name
 
-def scan_campaigns_from_files(file_paths):
+
+def scan_campaigns_from_files(file_paths, fast=True):
     """Quick read to detect campaigns without processing or saving to DB.
 
+    The fast mode (default) reads only the campaign and date columns and
+    aggregates rows and date range per campaign name in one groupby; the
+    full mode reads every column and filters the file once per name.
+    Nomenclature is parsed once per distinct name in both modes.
+
     Returns list of dicts: {nombre, plataformas, filas, fecha_min, fecha_max}
     """
     import os
@@ -254,80 +579,32 @@ def scan_campaigns_from_files(file_paths):
         ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
 
         try:
-            with open(file_path, 'rb') as f:
-                file_bytes = f.read()
-
-            if ext == 'csv':
-                try:
-                    raw_text = file_bytes.decode('utf-8')
-                    encoding = 'utf-8'
-                except UnicodeDecodeError:
-                    raw_text = file_bytes.decode('latin-1')
-                    encoding = 'latin-1'
-
-                raw_lines = raw_text.split('\n')[:15]
-                skiprows = 0
-                kws = ['campana', 'campaign', 'dia', 'day', 'clics', 'clicks',
-                       'impresiones', 'impressions', 'gasto', 'cost', 'coste']
-                for i, line in enumerate(raw_lines):
-                    if sum(1 for kw in kws if kw in normalize(line)) >= 2:
-                        skiprows = i
-                        break
-                df = pd.read_csv(io.BytesIO(file_bytes), skiprows=skiprows,
-                                 on_bad_lines='skip', encoding=encoding)
-            else:
-                df_raw = pd.read_excel(io.BytesIO(file_bytes), header=None, nrows=10)
-                skiprows = detect_header_row(df_raw)
-                df = pd.read_excel(io.BytesIO(file_bytes), skiprows=skiprows)
-
-            platform = detect_platform(df)
-
-            campaign_col = None
-            for col in df.columns:
-                col_norm = normalize(str(col))
-                if 'campaign' in col_norm or 'campana' in col_norm:
-                    campaign_col = col
-                    break
-
-            date_col = None
-            for col in df.columns:
-                col_norm = normalize(str(col))
-                if col_norm in ['dia', 'day', 'date', 'fecha']:
-                    date_col = col
-                    break
+            scan = _scan_file_fast(file_path, ext) if fast else _scan_file_full(file_path, ext)
+        except Exception:
+            continue
+        if scan is None:
+            continue
+        platform, per_name = scan
 
-            if campaign_col is None:
+        for raw_name, (filas, fecha_min, fecha_max) in per_name.items():
+            parsed = parse_nomenclature(raw_name)
+            # Skip campaigns with legacy nomenclature (no CAMPO:VALOR segments found)
+            if not parsed:
                 continue
+            display_name = parsed.get('CAMPANA', raw_name)
 
-            for raw_name in df[campaign_col].dropna().unique():
-                raw_name = str(raw_name).strip()
-                if not raw_name:
-                    continue
-
-                parsed = parse_nomenclature(raw_name)
-                # Skip campaigns with legacy nomenclature (no CAMPO:VALOR segments found)
-                if not parsed:
-                    continue
-                display_name = parsed.get('CAMPANA', raw_name)
-
-                if display_name not in campaign_data:
-                    campaign_data[display_name] = {
-                        'nombre': display_name,
-                        'plataformas': set(),
-                        'filas': 0,
-                        'fechas': [],
-                    }
+            if display_name not in campaign_data:
+                campaign_data[display_name] = {
+                    'nombre': display_name,
+                    'plataformas': set(),
+                    'filas': 0,
+                    'fechas': [],
+                }
 
-                rows_for_name = df[df[campaign_col] == raw_name]
-                campaign_data[display_name]['plataformas'].add(platform)
-                campaign_data[display_name]['filas'] += len(rows_for_name)
-
-                if date_col:
-                    dates = pd.to_datetime(rows_for_name[date_col], errors='coerce').dropna()
-                    campaign_data[display_name]['fechas'].extend(dates.tolist())
-
-        except Exception:
-            continue
+            campaign_data[display_name]['plataformas'].add(platform)
+            campaign_data[display_name]['filas'] += filas
+            campaign_data[display_name]['fechas'].extend(
+                f for f in (fecha_min, fecha_max) if pd.notna(f))
 
     result = []
     for display_name, data in campaign_data.items():
@@ -344,152 +621,441 @@ def scan_campaigns_from_files(file_paths):
     return result
 
 
-def process_uploaded_files(file_storages, run_id, campaign_id, campaign_filter=None):
+def _file_size(file_storage):
+    pos = file_storage.tell()
+    file_storage.seek(0, io.SEEK_END)
+    size = file_storage.tell()
+    file_storage.seek(pos)
+    return size
+
+
+def _parse_files(file_storages, campaign_filter=None, stream_min_bytes=None, chunksize=STREAM_CHUNK_ROWS,
+                 profile=NO_PROFILE, cache_dir=None, file_hashes=None):
+    """Parse each uploaded file once.
+
+    Returns a list of dicts {filename, sha256, size, df, chunks, platform,
+    alerts, error, cached}; df is None when the file could not be processed.
+    CSV files of at least stream_min_bytes are not loaded: chunks is then a
+    lazy generator (see stream_csv_file) and df is None; otherwise chunks is [df].
+
+    With cache_dir, files whose content was already processed are read back
+    from the processed-file cache (see cache.py) instead of being parsed, and
+    new results are stored there. With campaign_filter the whole-file entry
+    is used (its output filtered) when there is one; otherwise only the
+    campaign's raw rows are standardized and stored under the filter's own
+    key. file_hashes ({filename: sha256}, e.g. computed while uploading)
+    saves hashing those files again.
+    """
+    parsed_files = []
+    for file_storage, filename in file_storages:
+        ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        with profile.stage('hash', filename):
+            sha256 = (file_hashes or {}).get(filename) or cache.file_sha256(file_storage)
+            size = _file_size(file_storage)
+        streamed = ext == 'csv' and stream_min_bytes is not None and size >= stream_min_bytes
+        key = cache.cache_key(sha256, campaign_filter)
+        info = {'filename': filename, 'sha256': sha256, 'size': size, 'cached': False}
+        try:
+            entry, output_filter = None, None
+            if cache_dir:
+                entry = cache.load_entry(cache_dir, key, filename)
+                if entry is None and campaign_filter:
+                    entry = cache.load_entry(cache_dir, cache.cache_key(sha256), filename)
+                    output_filter = campaign_filter
+            if entry is not None:
+                with profile.stage('cache', filename) as stage:
+                    df = None if streamed else cache.load_frame(entry)
+                    stage['rows_out'] = None if streamed else (0 if df is None else len(df))
+                if streamed or df is not None:
+                    chunks = entry['chunks'] if streamed else [df]
+                    if output_filter:
+                        df, chunks = _filter_output(df, chunks, output_filter, filename, profile)
+                    parsed_files.append(dict(info, df=df, chunks=chunks, platform=entry['platform'],
+                                             alerts=entry['alerts'], error=None, cached=True))
+                    continue
+
+            if streamed:
+                chunks, platform, file_alerts = stream_csv_file(file_storage, filename,
+                                                                campaign_filter=campaign_filter,
+                                                                chunksize=chunksize, profile=profile)
+                if cache_dir:
+                    chunks = cache.store_chunks(cache_dir, key, filename, chunks, platform, file_alerts)
+                parsed_files.append(dict(info, df=None, chunks=chunks, platform=platform,
+                                         alerts=file_alerts, error=None))
+                continue
+            df, platform, file_alerts = process_file_from_memory(file_storage, filename,
+                                                                 campaign_filter=campaign_filter,
+                                                                 profile=profile)
+            if cache_dir:
+                cache.store_frame(cache_dir, key, filename, df, platform, file_alerts)
+            parsed_files.append(dict(info, df=df, chunks=[df], platform=platform,
+                                     alerts=file_alerts, error=None))
+        except Exception as e:
+            parsed_files.append(dict(info, df=None, chunks=[], platform='', alerts=[], error=str(e)))
+    return parsed_files
+
+
+def _filter_output(df, chunks, campaign_filter, filename, profile):
+    """(df, chunks) of a whole parsed file restricted to one campaign (see filter_campaign_frame).
+
+    A frame read whole is filtered right away; streamed chunks lazily, empty
+    ones being skipped as stream_csv_file does.
+    """
+    if df is not None:
+        with profile.stage('filter', filename, rows_in=len(df)) as stage:
+            df = filter_campaign_frame(df, campaign_filter)
+            stage['rows_out'] = len(df)
+        return df, [df]
+
+    def filtered():
+        for chunk in chunks:
+            with profile.stage('filter', filename, rows_in=len(chunk)) as stage:
+                chunk = filter_campaign_frame(chunk, campaign_filter)
+                stage['rows_out'] = len(chunk)
+            if not chunk.empty:
+                yield chunk
+    return None, filtered()
+
+
+def process_uploaded_files(file_storages, run_id, campaign_id, campaign_filter=None,
+                           stream_min_bytes=None, chunksize=STREAM_CHUNK_ROWS, profile_memory=False,
+                           cache_dir=None, base_run_id=None, file_hashes=None):
     """Process multiple uploaded files and save results to database.
 
     Args:
         file_storages: list of (file_storage, filename) tuples
         run_id: ProcessingRun.id
         campaign_id: Campaign.id
+        stream_min_bytes: CSV files at least this large are processed and
+            saved in chunks of chunksize rows instead of being loaded whole
+        profile_memory: trace peak memory per stage (tracemalloc) in the
+            run profile; stage times and rows are always recorded
+        cache_dir: processed-file cache directory; files uploaded before
+            with the same content are not parsed again (see _parse_files)
+        base_run_id: make a delta run on this earlier run of the campaign,
+            storing only new or changed row groups (see delta.py); files are
+            then read whole, as groups are compared across the upload. The
+            run is stored whole when the upload removes groups of the base run
+        file_hashes: {filename: sha256} already known (see _parse_files)
 
     Returns:
         dict with processing results
     """
+    from app.partitioning import ensure_run_partition
+    ensure_run_partition(run_id)
+
+    with RunProfile(memory=profile_memory) as profile:
+        if base_run_id is not None:
+            stream_min_bytes = None
+        parsed_files = _parse_files(file_storages, campaign_filter=campaign_filter,
+                                    stream_min_bytes=stream_min_bytes, chunksize=chunksize,
+                                    profile=profile, cache_dir=cache_dir, file_hashes=file_hashes)
+        delta = None
+        if base_run_id is not None:
+            from app import db
+            from app.models import ProcessingRun
+            from .delta import plan_delta
+            with profile.stage('delta') as stage:
+                # None when the upload removes groups of the base run: stored whole
+                delta = plan_delta([p['df'] for p in parsed_files if p['df'] is not None],
+                                   db.session.get(ProcessingRun, base_run_id))
+                stage['rows_out'] = len(delta['inherited']) if delta is not None else None
+        return _save_run(parsed_files, run_id, campaign_id, len(file_storages),
+                         skip_empty=bool(campaign_filter), profile=profile, delta=delta)
+
+
+def process_all_campaigns(file_storages, create_run, profile_memory=False, cache_dir=None,
+                          file_hashes=None):
+    """Process every campaign found in the files, parsing each file only once.
+
+    Rows are partitioned by campaign display name and each campaign gets its
+    own ProcessingRun, alerts and history comparison. Only names with
+    FIELD:VALUE nomenclature are processed, as in scan_campaigns_from_files.
+
+    Args:
+        file_storages: list of (file_storage, filename) tuples
+        create_run: callable(campaign_name) -> (run_id, campaign_id) that creates
+            the Campaign/ProcessingRun/UploadedFile records for one campaign
+        profile_memory: see process_uploaded_files; the shared file reading
+            stages appear in the profile of every campaign run
+        cache_dir, file_hashes: see process_uploaded_files
+
+    Returns:
+        list of per-campaign result dicts (see process_uploaded_files)
+    """
+    with RunProfile(memory=profile_memory) as profile:
+        return _process_all_campaigns(file_storages, create_run, profile, cache_dir, file_hashes)
+
+
+def _process_all_campaigns(file_storages, create_run, profile, cache_dir=None, file_hashes=None):
+    from app.partitioning import ensure_run_partition
+
+    parsed_files = _parse_files(file_storages, profile=profile, cache_dir=cache_dir,
+                                file_hashes=file_hashes)
+
+    # Split every file's rows by campaign display name
+    partitions = {}
+    for parsed in parsed_files:
+        df = parsed['df']
+        if df is None or df.empty:
+            continue
+        display_names = {}
+        for raw in df['CAMPANA'].dropna().unique():
+            if parse_nomenclature(str(raw)):
+                display_names[raw] = campaign_display_name(raw)
+        display = df['CAMPANA'].map(display_names)
+        for name, df_campaign in df.groupby(display, sort=False, observed=True):
+            partitions.setdefault(name, {})[parsed['filename']] = df_campaign
+
+    results = []
+    for name in sorted(partitions):
+        run_id, campaign_id = create_run(name)
+        ensure_run_partition(run_id)
+        campaign_files = []
+        for parsed in parsed_files:
+            df_campaign = partitions[name].get(parsed['filename'])
+            if parsed['df'] is not None:
+                df_campaign = df_campaign if df_campaign is not None else parsed['df'].iloc[0:0]
+            campaign_files.append(dict(parsed, df=df_campaign, chunks=[] if df_campaign is None else [df_campaign]))
+        result = _save_run(campaign_files, run_id, campaign_id, len(file_storages), skip_empty=True,
+                           profile=profile.branch())
+        result['campaign'] = name
+        results.append(result)
+
+    return results
+
+
+def _accumulate(aggregates, df):
+    """Fold one block of output rows into the run-level aggregates."""
+    aggregates['filas'] += len(df)
+    aggregates['plataformas'] = collect_platform_stats(df, aggregates['plataformas'])
+    aggregates['vacios'] = contar_campos_vacios(df, aggregates['vacios'])
+    aggregates['alcance'] = collect_reach(df, aggregates['alcance'])
+    aggregates['resumen'] = collect_summary(df, aggregates['resumen'])
+    aggregates['campana'] = collect_campaign_info(df, aggregates['campana'])
+
+
+def _text(value):
+    """Stored text of an output cell: '' for missing values (None or NaN), as delta.value_frame."""
+    return '' if value is None or pd.isna(value) else str(value)
+
+
+def _report_row_records(df, run_id):
+    """ReportRow column values for a block of output rows."""
+    records = []
+    for row in df.to_dict('records'):
+        records.append({
+            'run_id': run_id,
+            'marca': _text(row.get('MARCA')),
+            'plataforma': _text(row.get('PLATAFORMA')),
+            'campana': _text(row.get('CAMPANA')),
+            'ad_group': _text(row.get('AD GROUP')),
+            'etapa': _text(row.get('ETAPA')),
+            'compra': _text(row.get('COMPRA')),
+            'com': _text(row.get('COM')),
+            'formato': _text(row.get('FORMATO')),
+            'audiencia': _text(row.get('AUDIENCIA')),
+            'establecimiento': _text(row.get('ESTABLECIMIENTO')),
+            'ciudad': _text(row.get('CIUDAD')),
+            'gasto': float(row.get('GASTO', 0) or 0),
+            'alcance': float(row.get('ALCANCE', 0) or 0),
+            'frecuencia': float(row.get('FRECUENCIA', 0) or 0),
+            'clics': float(row.get('CLICS', 0) or 0),
+            'views': float(row.get('VIEWS', 0) or 0),
+            'impresiones': float(row.get('IMPRESIONES', 0) or 0),
+            'registros': int(row.get('REGISTROS', 0) or 0),
+            'ctr': float(row.get('CTR', 0) or 0),
+            'vtr': float(row.get('VTR', 0) or 0),
+            'dia': _text(row.get('DIA')),
+        })
+    return records
+
+
+def _insert_report_rows(df, run_id):
+    """Bulk insert a block of output rows, INSERT_BATCH_ROWS per statement."""
+    from app import db
+    from app.models import ReportRow
+
+    for start in range(0, len(df), INSERT_BATCH_ROWS):
+        records = _report_row_records(df.iloc[start:start + INSERT_BATCH_ROWS], run_id)
+        db.session.execute(ReportRow.__table__.insert(), records)
+
+
+def _save_run(parsed_files, run_id, campaign_id, total_files, skip_empty=False, profile=None, delta=None):
+    """Run validations and history checks on parsed files and save the run to the database.
+
+    Rows are consumed one chunk at a time: each chunk is folded into
+    incremental aggregates (alerts, history, reach, dashboard summary) and
+    inserted before the next one is read, so streamed files are never held
+    in memory whole.
+
+    With skip_empty, files left without rows (filtered to another campaign)
+    are marked processed with 0 rows and contribute no alerts or platforms.
+
+    The stages timed here are added to profile, which is stored on the run
+    (profile_json) whatever the outcome.
+
+    With delta (see delta.plan_delta) only the changed row groups are
+    inserted, while alerts, history and the summary cover the whole data of
+    the run: every uploaded row plus the rows inherited from the base run.
+    """
     from app import db
-    from app.models import ProcessingRun, ReportRow, Alert, UploadedFile
+    from app.models import ProcessingRun, Alert, UploadedFile
+    from .delta import changed_rows
 
-    run = ProcessingRun.query.get(run_id)
-    all_data = []
+    if profile is None:
+        profile = RunProfile(memory=False)
+    run = db.session.get(ProcessingRun, run_id)
     all_alerts = []
     platforms_found = []
+    files_with_data = 0
+    aggregates = {'filas': 0, 'plataformas': None, 'vacios': None, 'alcance': None,
+                  'resumen': None, 'campana': None}
 
-    for file_storage, filename in file_storages:
+    for parsed in parsed_files:
+        filename = parsed['filename']
+        platform = parsed['platform']
         uploaded = UploadedFile.query.filter_by(run_id=run_id, filename=filename).first()
+        if uploaded:
+            uploaded.sha256 = parsed['sha256']
+            uploaded.file_size = parsed['size']
 
+        if parsed['error'] is not None:
+            all_alerts.append({'tipo': 'ERROR', 'archivo': filename, 'mensaje': parsed['error']})
+            if uploaded:
+                uploaded.status = 'error'
+                uploaded.error_message = parsed['error']
+            continue
+
+        file_rows = 0
         try:
-            df, platform, file_alerts = process_file_from_memory(file_storage, filename)
-
-            # Filter by campaign display name if specified
-            if campaign_filter and 'CAMPANA' in df.columns:
-                def _get_display(raw):
-                    p = parse_nomenclature(str(raw))
-                    return p.get('CAMPANA', str(raw).strip())
-                mask = df['CAMPANA'].apply(_get_display) == campaign_filter
-                df = df[mask].copy()
+            for df in parsed['chunks']:
                 if len(df) == 0:
-                    if uploaded:
-                        uploaded.platform_detected = platform
-                        uploaded.rows_processed = 0
-                        uploaded.status = 'processed'
                     continue
-
-            all_data.append(df)
-            all_alerts.extend(file_alerts)
-            platforms_found.append(platform)
-
+                with profile.stage('aggregate', filename, rows_in=len(df)):
+                    _accumulate(aggregates, df)
+                with profile.stage('insert', filename, rows_in=len(df)) as stage:
+                    rows = df if delta is None else changed_rows(df, delta['changed'])
+                    _insert_report_rows(rows, run_id)
+                    stage['rows_out'] = len(rows)
+                file_rows += len(df)
+        except Exception as e:
+            # Rows of earlier chunks are already part of the run: fail it as a whole
+            db.session.rollback()
+            run = db.session.get(ProcessingRun, run_id)
+            run.status = 'error'
+            run.profile_json = json.dumps(profile.to_dict())
+            db.session.commit()
+            return {'error': f"Error procesando {filename}: {e}"}
+
+        # File has no rows for the requested campaign
+        if skip_empty and file_rows == 0:
             if uploaded:
                 uploaded.platform_detected = platform
-                uploaded.rows_processed = len(df)
+                uploaded.rows_processed = 0
                 uploaded.status = 'processed'
-        except Exception as e:
-            all_alerts.append({'tipo': 'ERROR', 'archivo': filename, 'mensaje': str(e)})
-            if uploaded:
-                uploaded.status = 'error'
-                uploaded.error_message = str(e)
+            continue
+
+        files_with_data += 1
+        all_alerts.extend(parsed['alerts'])
+        platforms_found.append(platform)
+
+        if uploaded:
+            uploaded.platform_detected = platform
+            uploaded.rows_processed = file_rows
+            uploaded.status = 'processed'
 
-    if not all_data:
+    if not files_with_data:
         run.status = 'error'
+        run.profile_json = json.dumps(profile.to_dict())
         db.session.commit()
         return {'error': 'No se pudo procesar ningun archivo'}
 
-    # Unify all dataframes
-    df_unified = pd.concat(all_data, ignore_index=True)
-
-    # Historical comparisons
-    hist_alerts = verificar_plataformas_faltantes(platforms_found, campaign_id)
-    all_alerts.extend(hist_alerts)
-
-    hist_data_alerts = verificar_datos_historicos(df_unified, campaign_id)
-    all_alerts.extend(hist_data_alerts)
-
-    # Validate empty fields
-    empty_alerts = verificar_campos_vacios(df_unified)
-    all_alerts.extend(empty_alerts)
+    # Groups of the base run missing from this upload are still part of the run
+    if delta is not None and len(delta['inherited']):
+        with profile.stage('aggregate', rows_in=len(delta['inherited'])):
+            _accumulate(aggregates, delta['inherited'])
+        platforms_found.extend(delta['inherited']['PLATAFORMA'].astype(str).unique())
+
+    # Runs whose files were all empty still report (empty) aggregates
+    if aggregates['filas'] == 0:
+        _accumulate(aggregates, pd.DataFrame(columns=FRAME_COLUMNS))
+
+    total_rows = aggregates['filas']
+    platform_stats = aggregates['plataformas']
+
+    # Historical comparisons, timed per rule like the validation rules below
+    segundos_historial = {}
+    with profile.stage('history_check'):
+        all_alerts.extend(verificar_historial(None, campaign_id, plataformas=platforms_found,
+                                              stats=platform_stats, segundos=segundos_historial))
+    for rule_name, seconds in segundos_historial.items():
+        profile.add('rule', rule_name, seconds)
+
+    # Validate empty fields; the rules were counted chunk by chunk in _accumulate
+    with profile.stage('validation'):
+        empty_alerts = alertas_campos_vacios(aggregates['vacios'])
+        all_alerts.extend(empty_alerts)
+    for rule_name, seconds in aggregates['vacios']['segundos'].items():
+        profile.add('rule', rule_name, seconds, rows_in=total_rows)
 
     # Calculate deduplicated reach
-    alcance_dedup = calcular_alcance_deduplicado(df_unified, overlap_pct=72)
+    with profile.stage('reach'):
+        alcance_dedup = alcance_from_reach(aggregates['alcance'], overlap_pct=72)
 
     # Extract campaign info
-    info_campana = extract_campaign_info(df_unified)
-
-    # Save report rows to database
-    for _, row in df_unified.iterrows():
-        report_row = ReportRow(
-            run_id=run_id,
-            marca=str(row.get('MARCA', '') or ''),
-            plataforma=str(row.get('PLATAFORMA', '') or ''),
-            campana=str(row.get('CAMPANA', '') or ''),
-            ad_group=str(row.get('AD GROUP', '') or ''),
-            etapa=str(row.get('ETAPA', '') or ''),
-            compra=str(row.get('COMPRA', '') or ''),
-            com=str(row.get('COM', '') or ''),
-            formato=str(row.get('FORMATO', '') or ''),
-            audiencia=str(row.get('AUDIENCIA', '') or ''),
-            establecimiento=str(row.get('ESTABLECIMIENTO', '') or ''),
-            ciudad=str(row.get('CIUDAD', '') or ''),
-            gasto=float(row.get('GASTO', 0) or 0),
-            alcance=float(row.get('ALCANCE', 0) or 0),
-            frecuencia=float(row.get('FRECUENCIA', 0) or 0),
-            clics=float(row.get('CLICS', 0) or 0),
-            views=float(row.get('VIEWS', 0) or 0),
-            impresiones=float(row.get('IMPRESIONES', 0) or 0),
-            registros=int(row.get('REGISTROS', 0) or 0),
-            ctr=float(row.get('CTR', 0) or 0),
-            vtr=float(row.get('VTR', 0) or 0),
-            dia=str(row.get('DIA', '') or ''),
-        )
-        db.session.add(report_row)
-
-    # Save alerts to database
-    for alert_data in all_alerts:
-        alert = Alert(
-            run_id=run_id,
-            tipo=alert_data['tipo'],
-            archivo=alert_data.get('archivo', ''),
-            mensaje=alert_data.get('mensaje', ''),
-        )
-        db.session.add(alert)
-
-    # Update run metadata
-    run.status = 'completed'
-    run.total_files = len(file_storages)
-    run.total_rows = len(df_unified)
-    run.platforms = ','.join(sorted(set(platforms_found)))
-
-    # Update campaign info
-    from app.models import Campaign
-    campaign = Campaign.query.get(campaign_id)
-    if campaign and info_campana:
-        if info_campana.get('marca'):
-            campaign.brand = info_campana['marca']
-        if info_campana.get('marca_display'):
-            campaign.brand_display = info_campana['marca_display']
+    info_campana = campaign_info_from_counts(aggregates['campana'])
+
+    with profile.stage('save'):
+        # Save alerts to database
+        for alert_data in all_alerts:
+            alert = Alert(
+                run_id=run_id,
+                tipo=alert_data['tipo'],
+                archivo=alert_data.get('archivo', ''),
+                mensaje=alert_data.get('mensaje', ''),
+            )
+            db.session.add(alert)
+
+        # Update run metadata
+        run.status = 'completed'
+        run.total_files = total_files
+        run.total_rows = total_rows
+        run.platforms = ','.join(sorted(set(platforms_found)))
+        run.summary_json = json.dumps(summary_from_totals(aggregates['resumen'], alcance_dedup))
+        if delta is not None:
+            run.base_run_id = delta['base_run_id']
+
+        # Update campaign info
+        from app.models import Campaign
+        campaign = db.session.get(Campaign, campaign_id)
+        if campaign and info_campana:
+            if info_campana.get('marca'):
+                campaign.brand = info_campana['marca']
+            if info_campana.get('marca_display'):
+                campaign.brand_display = info_campana['marca_display']
 
-    db.session.commit()
+        db.session.commit()
 
     # Save history (non-critical — don't let failures break the result)
-    try:
-        save_history(run_id, campaign_id, platforms_found, df_unified)
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("save_history failed (non-fatal): %s", e)
+    with profile.stage('history_save'):
+        try:
+            save_history(run_id, campaign_id, platforms_found, None, stats=platform_stats)
+        except Exception as e:
+            db.session.rollback()
+            import logging
+            logging.getLogger(__name__).warning("save_history failed (non-fatal): %s", e)
+
+    run.profile_json = json.dumps(profile.to_dict())
+    db.session.commit()
 
     return {
         'run_id': run_id,
-        'total_rows': len(df_unified),
-        'total_files': len(file_storages),
+        'total_rows': total_rows,
+        'total_files': total_files,
         'platforms': list(set(platforms_found)),
         'alerts_count': len(all_alerts),
         'alcance_dedup': alcance_dedup,
         'info_campana': info_campana,
+        'base_run_id': delta['base_run_id'] if delta is not None else None,
     }
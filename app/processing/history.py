@@ -1,8 +1,40 @@
 """Historical comparison using database."""
 
 import json
+from datetime import datetime
 import pandas as pd
 from app.models import RunHistory
+from .dates import row_dates
+from .history_metrics import _history_metrics
+from .rules import Rule, alertas_historicas
+
+# Per-platform totals kept in history snapshots
+METRICAS_TOTALES = ('GASTO', 'IMPRESIONES', 'VIEWS')
+
+# Each platform's values compared with the last snapshot (see rules.py and _valores_historicos):
+# PLATAFORMA and FORMATO are sets, FECHA_MIN its first day, metrics its totals
+REGLAS_HISTORICAS = [
+    Rule(nombre='plataforma_faltante', columna='PLATAFORMA', predicado='desaparece_categoria',
+         umbrales=((0, 'CRITICO'),),
+         mensaje='PLATAFORMA FALTANTE: {valor} estaba en la ejecucion anterior pero no hay datos de ella hoy',
+         excluir_plataformas=()),
+    Rule(nombre='formato_faltante', columna='FORMATO', predicado='desaparece_categoria',
+         umbrales=((0, 'CRITICO'),),
+         mensaje='FORMATO FALTANTE: {valor} de {plataforma} estaba en ejecucion anterior pero no aparece hoy',
+         excluir_plataformas=()),
+    Rule(nombre='rango_fechas_reducido', columna='FECHA_MIN', predicado='delta_dias', umbrales=((3, 'CRITICO'),),
+         mensaje=('RANGO DE FECHAS REDUCIDO en {plataforma}: Datos inician {actual:%d/%m/%Y}, pero antes '
+                  'iniciaban {anterior:%d/%m/%Y} (faltan {valor} dias)'),
+         excluir_plataformas=()),
+    Rule(nombre='caida_gasto', columna='GASTO', predicado='caida_pct', umbrales=((50, 'ADVERTENCIA'),),
+         mensaje='CAIDA DRASTICA EN {plataforma}: Gasto cayo {valor:.0f}% (${anterior:,.2f} -> ${actual:,.2f})',
+         excluir_plataformas=()),
+    # Views existed before but are now zero
+    Rule(nombre='views_desaparecen', columna='VIEWS', predicado='desaparece', umbrales=((0, 'CRITICO'),),
+         mensaje=('VIEWS DESAPARECIERON EN {plataforma}: La ejecucion anterior tenia {anterior:,.0f} '
+                  'views pero ahora es 0. Verifique que la columna de views este presente en el archivo.'),
+         excluir_plataformas=()),
+]
 
 
 def get_last_history(campaign_id):
@@ -30,110 +62,106 @@ def get_last_history(campaign_id):
     return None
 
 
-def verificar_plataformas_faltantes(plataformas_actuales, campaign_id):
-    """Compare current platforms against last historical run. Returns alerts."""
-    alerts = []
-    last = get_last_history(campaign_id)
-    if not last:
-        return alerts
+def collect_platform_stats(df, stats=None):
+    """Formats, date range and metric totals per platform for a block of rows.
 
-    plataformas_previas = set(last['platforms'].get('plataformas', []))
-    plataformas_actuales_set = set(plataformas_actuales)
+    Pass the previous result as stats to merge chunks of the same run.
+    """
+    if stats is None:
+        stats = {'formats': {}, 'dates': {}, 'totals': {}}
 
-    faltantes = plataformas_previas - plataformas_actuales_set
-    for plat in faltantes:
-        msg = f"PLATAFORMA FALTANTE: {plat} estaba en la ejecucion anterior pero no hay datos de ella hoy"
-        alerts.append({'tipo': 'CRITICO', 'archivo': 'COMPARACION HISTORICA', 'mensaje': msg})
+    fechas_filas = row_dates(df) if 'DIA' in df.columns else None
+    for plat in df['PLATAFORMA'].unique():
+        if not (plat and str(plat).strip()):
+            continue
+        es_plat = df['PLATAFORMA'] == plat
+        df_plat = df[es_plat]
+
+        fmts = [f for f in df_plat['FORMATO'].dropna().unique() if f and str(f).strip()]
+        if fmts:
+            stats['formats'].setdefault(plat, set()).update(fmts)
+
+        if fechas_filas is not None:
+            fechas = fechas_filas[es_plat].dropna()
+            if not fechas.empty:
+                fecha_min, fecha_max = fechas.min(), fechas.max()
+                if plat in stats['dates']:
+                    prev_min, prev_max = stats['dates'][plat]
+                    fecha_min, fecha_max = min(fecha_min, prev_min), max(fecha_max, prev_max)
+                stats['dates'][plat] = (fecha_min, fecha_max)
 
-    return alerts
+    agg_cols = {'GASTO': 'sum', 'IMPRESIONES': 'sum'}
+    if 'VIEWS' in df.columns:
+        agg_cols['VIEWS'] = 'sum'
+    for plat, vals in df.groupby('PLATAFORMA', observed=True).agg(agg_cols).to_dict('index').items():
+        totals = stats['totals'].setdefault(plat, {})
+        for metric, value in vals.items():
+            totals[metric] = totals[metric] + value if metric in totals else value
 
+    return stats
 
-def verificar_datos_historicos(df_unified, campaign_id):
-    """Check for missing formats and date range changes. Returns alerts."""
-    alerts = []
+
+def _valores_historicos(plataformas, formats, fechas_min, totals):
+    """{plataforma: values compared by REGLAS_HISTORICAS} of a run.
+
+    Metric totals default to 0 for platforms with totals, and are left out
+    (not compared) for platforms without them.
+    """
+    valores = {}
+    for plat in list(plataformas) + [p for source in (formats, fechas_min, totals) for p in source]:
+        if plat in valores:
+            continue
+        valores[plat] = {
+            'PLATAFORMA': {plat} if plat in plataformas else set(),
+            'FORMATO': set(formats.get(plat, ())),
+            'FECHA_MIN': fechas_min.get(plat),
+        }
+        if plat in totals:
+            valores[plat].update(dict.fromkeys(METRICAS_TOTALES, 0))
+            valores[plat].update(totals[plat])
+    return valores
+
+
+def verificar_historial(df_unified, campaign_id, plataformas=None, stats=None, segundos=None):
+    """Compare the run with the campaign's last history snapshot (REGLAS_HISTORICAS). Returns alerts.
+
+    plataformas are the platforms found in the run (by default those with
+    rows); stats (from collect_platform_stats) replaces df_unified when the
+    run was processed in chunks. The time spent on each rule is added up in
+    segundos.
+    """
     last = get_last_history(campaign_id)
     if not last:
-        return alerts
-
-    # Check missing formats per platform
-    formatos_previos = last['formats']
-    if formatos_previos:
-        formatos_actuales = {}
-        for plat in df_unified['PLATAFORMA'].unique():
-            if plat and str(plat).strip():
-                formatos = df_unified[df_unified['PLATAFORMA'] == plat]['FORMATO'].dropna().unique()
-                formatos = [f for f in formatos if f and str(f).strip()]
-                if formatos:
-                    formatos_actuales[plat] = set(formatos)
-
-        for plat, formatos_prev in formatos_previos.items():
-            formatos_prev_set = set(formatos_prev)
-            formatos_act_set = formatos_actuales.get(plat, set())
-            for fmt in formatos_prev_set - formatos_act_set:
-                msg = f"FORMATO FALTANTE: {fmt} de {plat} estaba en ejecucion anterior pero no aparece hoy"
-                alerts.append({'tipo': 'CRITICO', 'archivo': 'COMPARACION HISTORICA', 'mensaje': msg})
-
-    # Check date range changes per platform
-    fechas_previas = last['dates']
-    if fechas_previas and 'DIA' in df_unified.columns:
-        for plat, fechas_prev in fechas_previas.items():
-            fecha_min_prev = fechas_prev.get('fecha_min')
-            if not fecha_min_prev:
-                continue
-
-            df_plat = df_unified[df_unified['PLATAFORMA'] == plat]
-            if df_plat.empty:
-                continue
-
-            fechas_plat = pd.to_datetime(df_plat['DIA'], format='%d/%m/%y', errors='coerce').dropna()
-            if fechas_plat.empty:
-                continue
-
-            fecha_min_actual = fechas_plat.min()
-            fecha_min_prev_dt = pd.to_datetime(fecha_min_prev)
-            dias_diferencia = (fecha_min_actual - fecha_min_prev_dt).days
-
-            if dias_diferencia > 3:
-                msg = (f"RANGO DE FECHAS REDUCIDO en {plat}: Datos inician "
-                       f"{fecha_min_actual.strftime('%d/%m/%Y')}, pero antes iniciaban "
-                       f"{fecha_min_prev_dt.strftime('%d/%m/%Y')} (faltan {dias_diferencia} dias)")
-                alerts.append({'tipo': 'CRITICO', 'archivo': 'COMPARACION HISTORICA', 'mensaje': msg})
-
-    # Check drastic metric drops
-    totales_previos = last['totals']
-    if totales_previos:
-        agg_cols = {'GASTO': 'sum', 'IMPRESIONES': 'sum'}
-        if 'VIEWS' in df_unified.columns:
-            agg_cols['VIEWS'] = 'sum'
-        totales_actuales = df_unified.groupby('PLATAFORMA').agg(agg_cols).to_dict('index')
-
-        for plat, metricas_prev in totales_previos.items():
-            if plat in totales_actuales:
-                gasto_prev = metricas_prev.get('GASTO', 0)
-                gasto_act = totales_actuales[plat].get('GASTO', 0)
-                if gasto_prev > 0:
-                    variacion = ((gasto_act - gasto_prev) / gasto_prev) * 100
-                    if variacion < -50:
-                        msg = (f"CAIDA DRASTICA EN {plat}: Gasto cayo {abs(variacion):.0f}% "
-                               f"(${gasto_prev:,.2f} -> ${gasto_act:,.2f})")
-                        alerts.append({'tipo': 'ADVERTENCIA', 'archivo': 'COMPARACION HISTORICA', 'mensaje': msg})
-
-                # Alert if views existed before but are now zero
-                views_prev = metricas_prev.get('VIEWS', 0)
-                views_act = totales_actuales[plat].get('VIEWS', 0)
-                if views_prev > 0 and views_act == 0:
-                    msg = (f"VIEWS DESAPARECIERON EN {plat}: La ejecucion anterior tenia "
-                           f"{views_prev:,.0f} views pero ahora es 0. "
-                           f"Verifique que la columna de views este presente en el archivo.")
-                    alerts.append({'tipo': 'CRITICO', 'archivo': 'COMPARACION HISTORICA', 'mensaje': msg})
-
-    return alerts
-
-
-def save_history(run_id, campaign_id, plataformas, df_unified):
-    """Save processing history to database."""
+        return []
+
+    if stats is None:
+        stats = collect_platform_stats(df_unified)
+    if plataformas is None:
+        plataformas = list(stats['totals'])
+
+    previos = _valores_historicos(
+        last['platforms'].get('plataformas', []), last['formats'],
+        {plat: pd.to_datetime(fechas['fecha_min']) for plat, fechas in last['dates'].items()
+         if fechas.get('fecha_min')},
+        last['totals'])
+    actuales = _valores_historicos(
+        plataformas, stats['formats'],
+        {plat: fecha_min for plat, (fecha_min, _) in stats['dates'].items()},
+        stats['totals'])
+    return alertas_historicas(REGLAS_HISTORICAS, previos, actuales, 'COMPARACION HISTORICA', segundos=segundos)
+
+
+def save_history(run_id, campaign_id, plataformas, df_unified, stats=None):
+    """Save processing history to database.
+
+    stats (from collect_platform_stats) replaces df_unified when the run was
+    processed in chunks.
+    """
     from app import db
 
+    if stats is None:
+        stats = collect_platform_stats(df_unified)
+
     # per_campaign=True marks this record as coming from the per-campaign filtered
     # flow. Records without this flag (old combined-upload runs) are ignored by
     # get_last_history to prevent cross-campaign false comparisons.
@@ -143,34 +171,20 @@ def save_history(run_id, campaign_id, plataformas, df_unified):
     }
 
     # Formats per platform
-    formatos = {}
-    for plat in df_unified['PLATAFORMA'].unique():
-        if plat and str(plat).strip():
-            fmts = df_unified[df_unified['PLATAFORMA'] == plat]['FORMATO'].dropna().unique()
-            fmts = [f for f in fmts if f and str(f).strip()]
-            if fmts:
-                formatos[plat] = sorted(fmts)
+    formatos = {plat: sorted(fmts) for plat, fmts in stats['formats'].items()}
 
     # Date ranges per platform
-    dates_data = {}
-    if 'DIA' in df_unified.columns:
-        for plat in df_unified['PLATAFORMA'].unique():
-            if plat and str(plat).strip():
-                df_plat = df_unified[df_unified['PLATAFORMA'] == plat]
-                fechas = pd.to_datetime(df_plat['DIA'], format='%d/%m/%y', errors='coerce').dropna()
-                if not fechas.empty:
-                    dates_data[plat] = {
-                        'fecha_min': fechas.min().strftime('%Y-%m-%d'),
-                        'fecha_max': fechas.max().strftime('%Y-%m-%d')
-                    }
+    dates_data = {
+        plat: {
+            'fecha_min': fecha_min.strftime('%Y-%m-%d'),
+            'fecha_max': fecha_max.strftime('%Y-%m-%d')
+        }
+        for plat, (fecha_min, fecha_max) in stats['dates'].items()
+    }
 
     # Totals per platform
-    agg_cols = {'GASTO': 'sum', 'IMPRESIONES': 'sum'}
-    if 'VIEWS' in df_unified.columns:
-        agg_cols['VIEWS'] = 'sum'
-    totales = df_unified.groupby('PLATAFORMA').agg(agg_cols).to_dict('index')
     totals_data = {k: {m: round(v, 2) for m, v in vals.items()}
-                   for k, vals in totales.items()}
+                   for k, vals in sorted(stats['totals'].items())}
 
     history = RunHistory(
         run_id=run_id,
@@ -179,6 +193,8 @@ def save_history(run_id, campaign_id, plataformas, df_unified):
         formats_json=json.dumps(formatos),
         dates_json=json.dumps(dates_data),
         totals_json=json.dumps(totals_data),
+        created_at=datetime.utcnow(),
     )
     db.session.add(history)
+    db.session.add_all(_history_metrics(history, dates_data, totals_data))
     db.session.commit()
@@ -0,0 +1,81 @@
+"""Normalized history metrics (HistoryMetric) and the cross-run trend read from them.
+
+Kept apart from history.py so the startup backfill and the trend endpoint
+never import pandas.
+"""
+
+import json
+from app.models import RunHistory, HistoryMetric
+
+
+def _history_metrics(history, dates_data, totals_data):
+    """HistoryMetric rows (one per platform and metric) of a RunHistory snapshot."""
+    return [
+        HistoryMetric(
+            campaign_id=history.campaign_id,
+            run_id=history.run_id,
+            plataforma=plat,
+            metric=metric,
+            value=value,
+            fecha_min=dates_data.get(plat, {}).get('fecha_min', ''),
+            fecha_max=dates_data.get(plat, {}).get('fecha_max', ''),
+            created_at=history.created_at,
+        )
+        for plat, vals in totals_data.items()
+        for metric, value in vals.items()
+    ]
+
+
+def backfill_history_metrics():
+    """Write the HistoryMetric rows of per-campaign snapshots saved before the table existed.
+
+    Returns the number of snapshots backfilled.
+    """
+    from app import db
+
+    done = db.session.query(HistoryMetric.run_id).distinct()
+    histories = RunHistory.query.filter(RunHistory.run_id.notin_(done)).all()
+    backfilled = 0
+    for history in histories:
+        platforms = json.loads(history.platforms_json) if history.platforms_json else {}
+        if not platforms.get('per_campaign'):
+            continue
+        dates_data = json.loads(history.dates_json) if history.dates_json else {}
+        totals_data = json.loads(history.totals_json) if history.totals_json else {}
+        db.session.add_all(_history_metrics(history, dates_data, totals_data))
+        backfilled += 1
+    db.session.commit()
+    return backfilled
+
+
+def get_campaign_trend(slug, metrics=None, platforms=None):
+    """Cross-run series of a campaign's per-platform totals, oldest run first.
+
+    Returns {(plataforma, metric): [{run_id, created_at, value, fecha_min,
+    fecha_max}]}, or None when there is no campaign with that slug. metrics
+    and platforms optionally restrict the series returned.
+    """
+    from app import db
+    from app.models import Campaign
+
+    query = db.session.query(HistoryMetric).join(Campaign, Campaign.id == HistoryMetric.campaign_id)\
+        .filter(Campaign.slug == slug)
+    if metrics:
+        query = query.filter(HistoryMetric.metric.in_(metrics))
+    if platforms:
+        query = query.filter(HistoryMetric.plataforma.in_(platforms))
+    points = query.order_by(HistoryMetric.created_at, HistoryMetric.run_id).all()
+
+    if not points and Campaign.query.filter_by(slug=slug).first() is None:
+        return None
+
+    series = {}
+    for point in points:
+        series.setdefault((point.plataforma, point.metric), []).append({
+            'run_id': point.run_id,
+            'created_at': point.created_at.strftime('%Y-%m-%d %H:%M'),
+            'value': point.value,
+            'fecha_min': point.fecha_min,
+            'fecha_max': point.fecha_max,
+        })
+    return series
@@ -1,6 +1,7 @@
 """Metric calculations: CTR, VTR, deduplicated reach."""
 
 import pandas as pd
+from .dates import row_dates
 
 
 def deduplicate_reach_list(reaches, new_reach_factor):
@@ -15,39 +16,55 @@ def deduplicate_reach_list(reaches, new_reach_factor):
     return largest + (others_sum * new_reach_factor)
 
 
-def calcular_alcance_deduplicado(df, overlap_pct=80):
-    """
-    3-level reach deduplication (META and TIKTOK only).
-    Level 1: Ad sets within same platform (same day)
-    Level 2: Between platforms (same day)
-    Level 3: Between days (accumulated)
+def collect_reach(df, acc=None):
+    """Per-day, per-platform reach aggregates of a block of rows (META and TIKTOK only).
 
-    Google excluded because it doesn't provide reach metric.
+    Keeps the largest and the total ad set reach of each day and platform, which
+    is all level 1 deduplication needs, so chunks of the same run can be merged.
     """
-    df_reach = df[df['PLATAFORMA'].isin(['META', 'TIKTOK'])].copy()
-    df_reach = df_reach[pd.to_numeric(df_reach['ALCANCE'], errors='coerce').fillna(0) > 0]
+    if acc is None:
+        acc = {'filas': 0, 'impresiones': 0.0, 'dias': {}}
 
+    df_reach = df[df['PLATAFORMA'].isin(['META', 'TIKTOK'])]
+    alcance = pd.to_numeric(df_reach['ALCANCE'], errors='coerce').fillna(0)
+    df_reach, alcance = df_reach[alcance > 0], alcance[alcance > 0]
     if df_reach.empty:
+        return acc
+
+    acc['filas'] += len(df_reach)
+    acc['impresiones'] += float(pd.to_numeric(df_reach['IMPRESIONES'], errors='coerce').fillna(0).sum())
+
+    por_dia = pd.DataFrame({
+        'DIA_PARSED': row_dates(df_reach),
+        'PLATAFORMA': df_reach['PLATAFORMA'],
+        'ALCANCE': alcance,
+    }).dropna(subset=['DIA_PARSED'])
+    grouped = por_dia.groupby(['DIA_PARSED', 'PLATAFORMA'], sort=False, observed=True)['ALCANCE'].agg(['max', 'sum'])
+
+    for (date, platform), row in grouped.iterrows():
+        platforms = acc['dias'].setdefault(date, {})
+        largest, total = platforms.get(platform, (0.0, 0.0))
+        platforms[platform] = (max(largest, float(row['max'])), total + float(row['sum']))
+
+    return acc
+
+
+def alcance_from_reach(acc, overlap_pct=80):
+    """Deduplicated reach (see calcular_alcance_deduplicado) from collect_reach aggregates."""
+    if acc['filas'] == 0:
         return {'final_reach': 0, 'frecuencia': 0, 'daily_evolution': []}
 
     new_reach_factor = (100 - overlap_pct) / 100
 
-    df_reach['DIA_PARSED'] = pd.to_datetime(df_reach['DIA'], format='%d/%m/%y', errors='coerce')
-    df_reach = df_reach.sort_values('DIA_PARSED')
-    unique_dates = sorted(df_reach['DIA_PARSED'].dropna().unique())
-
     daily_reaches = []
     daily_evolution = []
 
-    for date in unique_dates:
-        day_data = df_reach[df_reach['DIA_PARSED'] == date]
-
-        # Level 1: Deduplicate ad sets within each platform
-        platform_reaches = {}
-        for platform in day_data['PLATAFORMA'].unique():
-            platform_data = day_data[day_data['PLATAFORMA'] == platform]
-            ad_set_reaches = pd.to_numeric(platform_data['ALCANCE'], errors='coerce').fillna(0).tolist()
-            platform_reaches[platform] = deduplicate_reach_list(ad_set_reaches, new_reach_factor)
+    for date in sorted(acc['dias']):
+        # Level 1: Deduplicate ad sets within each platform (largest + factor * others)
+        platform_reaches = {
+            platform: largest + (total - largest) * new_reach_factor
+            for platform, (largest, total) in acc['dias'][date].items()
+        }
 
         # Level 2: Deduplicate between platforms
         day_reach = deduplicate_reach_list(list(platform_reaches.values()), new_reach_factor)
@@ -65,8 +82,7 @@ def calcular_alcance_deduplicado(df, overlap_pct=80):
         accumulated += daily_reaches[i] * new_reach_factor
 
     # Calculate frequency based on deduplicated reach
-    total_imp_reach = pd.to_numeric(df_reach['IMPRESIONES'], errors='coerce').fillna(0).sum()
-    frecuencia = total_imp_reach / accumulated if accumulated > 0 else 0
+    frecuencia = acc['impresiones'] / accumulated if accumulated > 0 else 0
 
     return {
         'final_reach': accumulated,
@@ -74,3 +90,15 @@ def calcular_alcance_deduplicado(df, overlap_pct=80):
         'overlap_pct': overlap_pct,
         'daily_evolution': daily_evolution
     }
+
+
+def calcular_alcance_deduplicado(df, overlap_pct=80):
+    """
+    3-level reach deduplication (META and TIKTOK only).
+    Level 1: Ad sets within same platform (same day)
+    Level 2: Between platforms (same day)
+    Level 3: Between days (accumulated)
+
+    Google excluded because it doesn't provide reach metric.
+    """
+    return alcance_from_reach(collect_reach(df), overlap_pct=overlap_pct)
@@ -2,6 +2,7 @@
 
 import re
 import unicodedata
+from functools import lru_cache
 
 
 PLATFORM_KEYWORDS = {
@@ -24,27 +25,25 @@ BRAND_NAMES = {
 }
 
 
-def normalize(text):
-    """Remove accents and convert to lowercase."""
-    text = str(text).lower().strip()
+@lru_cache(maxsize=16384)
+def _normalize_text(text):
+    text = text.lower().strip()
+    if text.isascii():
+        return text  # NFKD leaves ASCII untouched
     text = unicodedata.normalize('NFKD', text)
     text = ''.join(c for c in text if not unicodedata.combining(c))
     return text
 
 
-def detect_platform(df):
-    """Detect platform based on file columns."""
-    columns_lower = [normalize(col) for col in df.columns]
-    columns_text = ' '.join(columns_lower)
+def normalize(text):
+    """Remove accents and convert to lowercase (memoized per distinct string)."""
+    return _normalize_text(str(text))
 
-    scores = {}
-    for platform, keywords in PLATFORM_KEYWORDS.items():
-        score = sum(1 for kw in keywords if normalize(kw) in columns_text)
-        scores[platform] = score
 
-    if max(scores.values()) > 0:
-        return max(scores, key=scores.get)
-    return 'DESCONOCIDO'
+def detect_platform(df):
+    """Detect platform based on file columns."""
+    from .registry import resolve_header
+    return resolve_header(df.columns).platform
 
 
 def parse_nomenclature(campaign_name):
@@ -62,14 +61,24 @@ def parse_nomenclature(campaign_name):
     return parsed
 
 
-def detect_campaign_from_file(df):
-    """Detect campaign name from DataFrame by parsing nomenclature."""
-    campaign_col = None
-    for col in df.columns:
+def campaign_display_name(campaign_name):
+    """Display name of a raw campaign name: its CAMPANA field, or the raw name itself."""
+    parsed = parse_nomenclature(str(campaign_name))
+    return parsed.get('CAMPANA', str(campaign_name).strip())
+
+
+def find_campaign_column(columns):
+    """Return the first column that looks like a campaign name column, or None."""
+    for col in columns:
         col_norm = normalize(str(col))
         if 'campaign' in col_norm or 'campana' in col_norm:
-            campaign_col = col
-            break
+            return col
+    return None
+
+
+def detect_campaign_from_file(df):
+    """Detect campaign name from DataFrame by parsing nomenclature."""
+    campaign_col = find_campaign_column(df.columns)
 
     if campaign_col is None:
         return None
@@ -85,31 +94,47 @@ def detect_campaign_from_file(df):
     return None
 
 
-def extract_campaign_info(df):
-    """Extract campaign title and brand from unified dataset."""
-    marca = ''
-    campana_nombre = ''
+def collect_campaign_info(df, acc=None):
+    """Brand counts and distinct campaign names of a block of rows, for extract_campaign_info.
+
+    Pass the previous result as acc to merge chunks of the same run.
+    """
+    if acc is None:
+        acc = {'marcas': {}, 'nombres': {}}
 
     if 'MARCA' in df.columns:
-        import pandas as pd
-        marcas = df['MARCA'].replace('', pd.NA).dropna()
-        if not marcas.empty:
-            marca = marcas.value_counts().index[0]
+        marcas = df['MARCA'].dropna()
+        marcas = marcas[marcas != '']
+        for marca, count in marcas.value_counts(sort=False).items():
+            if count:  # categorical columns also list unused categories
+                acc['marcas'][marca] = acc['marcas'].get(marca, 0) + int(count)
 
     if 'CAMPANA' in df.columns:
         for campaign_name in df['CAMPANA'].dropna().unique():
-            parsed = parse_nomenclature(str(campaign_name))
-            if 'CAMPANA' in parsed and parsed['CAMPANA']:
-                campana_nombre = parsed['CAMPANA']
-                break
-
-    if not campana_nombre and 'CAMPANA' in df.columns:
-        nombres = df['CAMPANA'].dropna().unique()
-        if len(nombres) > 0:
-            nombre_base = min(nombres, key=len)
-            limpio = re.sub(r'[A-Za-z\u00C0-\u00FF\u00D1\u00F1]+:[^_]+_?', '', str(nombre_base)).strip('_ ')
-            if limpio:
-                campana_nombre = limpio
+            acc['nombres'].setdefault(campaign_name, True)
+
+    return acc
+
+
+def campaign_info_from_counts(acc):
+    """Campaign title and brand from collect_campaign_info counts."""
+    marca = ''
+    campana_nombre = ''
+
+    if acc['marcas']:
+        marca = max(acc['marcas'], key=acc['marcas'].get)
+
+    for campaign_name in acc['nombres']:
+        parsed = parse_nomenclature(str(campaign_name))
+        if 'CAMPANA' in parsed and parsed['CAMPANA']:
+            campana_nombre = parsed['CAMPANA']
+            break
+
+    if not campana_nombre and acc['nombres']:
+        nombre_base = min(acc['nombres'], key=len)
+        limpio = re.sub(r'[A-Za-z\u00C0-\u00FF\u00D1\u00F1]+:[^_]+_?', '', str(nombre_base)).strip('_ ')
+        if limpio:
+            campana_nombre = limpio
 
     marca_display = BRAND_NAMES.get(marca.upper(), marca) if marca else ''
 
@@ -125,3 +150,8 @@ def extract_campaign_info(df):
         'marca': marca,
         'marca_display': marca_display,
     }
+
+
+def extract_campaign_info(df):
+    """Extract campaign title and brand from unified dataset."""
+    return campaign_info_from_counts(collect_campaign_info(df))
@@ -0,0 +1,139 @@
+"""Per-stage timing and memory instrumentation for processing runs."""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Stage names, in pipeline order, with their labels for the results page
+STAGE_LABELS = {
+    'hash': 'Huella SHA-256',
+    'cache': 'Cache de archivos procesados',
+    'read': 'Lectura',
+    'filter': 'Filtro de campana',
+    'nomenclature': 'Mapeo y nomenclatura',
+    'metrics': 'Metricas',
+    'dates': 'Fechas',
+    'dtypes': 'Tipos compactos',
+    'delta': 'Comparacion con el run anterior',
+    'aggregate': 'Agregados',
+    'insert': 'Insercion de filas',
+    'history_check': 'Comparacion historica',
+    'validation': 'Reglas de validacion',
+    'rule': 'Regla de validacion',
+    'reach': 'Alcance deduplicado',
+    'save': 'Guardado del run',
+    'history_save': 'Guardado del historial',
+}
+
+
+class RunProfile:
+    """Wall time, rows in/out and peak traced memory per stage and file of a run.
+
+    Repeated stages of one file (streamed chunks) are merged: times and rows
+    add up and the peak is the largest. Stages must not nest, as tracemalloc
+    has a single peak counter. Memory is only traced with memory=True, between
+    start() and stop() (or inside a with block).
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self._stages = {}
+        self._start = time.perf_counter()
+        self._offset = 0.0
+        self._peak = 0
+        self._owns_tracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        return self
+
+    def stop(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    @contextmanager
+    def stage(self, name, filename='', rows_in=None):
+        """Time the block as stage `name`; set record['rows_out'] in the block to report output rows."""
+        record = {'rows_out': None}
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if tracing:
+                peak_abs = tracemalloc.get_traced_memory()[1]
+                self._peak = max(self._peak, peak_abs)
+                peak = peak_abs - base
+            self._add(name, filename, seconds, rows_in, record['rows_out'], peak)
+
+    def add(self, name, filename='', seconds=0.0, rows_in=None):
+        """Record time measured outside stage(), such as the per-rule timings of a validation pass."""
+        self._add(name, filename, seconds, rows_in, None, None)
+
+    def _add(self, name, filename, seconds, rows_in, rows_out, peak):
+        entry = self._stages.setdefault((name, filename), {
+            'stage': name, 'label': STAGE_LABELS.get(name, name), 'file': filename,
+            'calls': 0, 'seconds': 0.0, 'rows_in': None, 'rows_out': None, 'peak_mb': None})
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        if rows_in is not None:
+            entry['rows_in'] = (entry['rows_in'] or 0) + rows_in
+        if rows_out is not None:
+            entry['rows_out'] = (entry['rows_out'] or 0) + rows_out
+        if peak is not None:
+            entry['peak_mb'] = max(entry['peak_mb'] or 0, peak / (1024 * 1024))
+
+    def branch(self):
+        """Profile for one run of a multi-run upload, starting with the stages recorded so far.
+
+        Shared stages (file reading) are reported in full on every branch and
+        count towards its total time.
+        """
+        branch = RunProfile(memory=self.memory)
+        branch._stages = {key: dict(entry) for key, entry in self._stages.items()}
+        branch._offset = sum(entry['seconds'] for entry in self._stages.values())
+        branch._peak = self._peak
+        return branch
+
+    def to_dict(self):
+        """JSON-ready profile: totals and the stages in the order they first ran."""
+        stages = []
+        for entry in self._stages.values():
+            entry = dict(entry, seconds=round(entry['seconds'], 4))
+            if entry['peak_mb'] is not None:
+                entry['peak_mb'] = round(entry['peak_mb'], 2)
+            stages.append(entry)
+        return {
+            'memory': self.memory,
+            'total_seconds': round(self._offset + time.perf_counter() - self._start, 4),
+            'peak_mb': round(self._peak / (1024 * 1024), 2) if self.memory else None,
+            'stages': stages,
+        }
+
+
+class _NoProfile:
+    """Stand-in for RunProfile when a caller does not profile."""
+
+    @contextmanager
+    def stage(self, name, filename='', rows_in=None):
+        yield {'rows_out': None}
+
+    def add(self, name, filename='', seconds=0.0, rows_in=None):
+        pass
+
+
+NO_PROFILE = _NoProfile()
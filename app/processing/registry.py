@@ -0,0 +1,138 @@
+"""Compiled column-mapping registry.
+
+Header lookups (standard column mapping, platform detection and the
+campaign/ad group/date column searches) are resolved once per distinct
+raw header and cached, so files exported from the same platform template
+resolve in a single pass over their columns.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from .nomenclature import normalize, PLATFORM_KEYWORDS
+
+COLUMN_MAPPING = {
+    'alcance': ['alcance', 'reach', 'unique users'],
+    'gasto': ['importe gastado', 'amount spent', 'cost', 'costo', 'spend', 'coste',
+              'importe gastado (usd)', 'total cost'],
+    'frecuencia': ['frecuencia', 'frequency', 'avg frequency'],
+    'clics': ['clics en el enlace', 'link clicks', 'clics', 'clicks',
+              'clicks (destination)', 'all clicks', 'clicks (all)'],
+    'views': ['thruplays', 'thru plays',
+              'visualizaciones de trueview', 'vistas de trueview',
+              'trueview views',
+              '6-second focused views',
+              '15-second focused views',
+              'vistas', 'views', 'video views'],
+    'impresiones': ['impresiones', 'impressions', 'impr.', 'imps'],
+    'dia': ['dia', 'day', 'by day', 'date', 'fecha', 'reporting starts', 'dia', 'daa'],
+    'campana': ['nombre de la campana', 'campaign name', 'campaign', 'campana',
+                'campana', 'nombre de la campana'],
+    'ad_group': ['nombre del conjunto de anuncios', 'ad set name', 'ad group name',
+                 'grupo de anuncios', 'ad set', 'ad group'],
+    'establecimiento': ['establecimiento', 'establishment', 'estab'],
+    'ciudad': ['ciudad', 'city', 'location', 'geo', 'region', 'ubicacion', 'localidad'],
+    'registros': ['conversiones', 'conversions', 'todas las conv.', 'all conversions',
+                  'registro completado', 'registros completados', 'registros completado',
+                  'registro completados', 'completed registration', 'registrations']
+}
+
+# Normalized variant -> standard column name
+COMPILED_MAPPING = {}
+for _std_name, _variants in COLUMN_MAPPING.items():
+    for _variant in _variants:
+        COMPILED_MAPPING.setdefault(normalize(_variant), _std_name.upper())
+
+STANDARD_ORDER = [std_name.upper() for std_name in COLUMN_MAPPING]
+
+# Normalized detection keywords per platform
+PLATFORM_PROFILES = {
+    platform: tuple(normalize(kw) for kw in keywords)
+    for platform, keywords in PLATFORM_KEYWORDS.items()
+}
+
+SCAN_DATE_COLUMNS = ['dia', 'day', 'date', 'fecha']
+
+HeaderResolution = namedtuple('HeaderResolution', [
+    'platform',              # META / GOOGLE / TIKTOK / DESCONOCIDO
+    'column_map',            # normalized column -> standard name
+    'columnas_encontradas',  # standard names found, in COLUMN_MAPPING order
+    'mapped_columns',        # header after normalization and mapping
+    'campaign_col',          # campaign column in the mapped header
+    'ad_group_parse_col',    # ad group column used for nomenclature fallback
+    'ad_group_col',          # ad group column copied to AD GROUP
+    'raw_campaign_col',      # campaign column in the raw header
+    'raw_date_col',          # date column in the raw header
+    'used_columns',          # positions of the columns the pipeline reads, in header order
+    'text_columns',          # positions among them holding text (date, names, places)
+])
+
+# Standard columns read as text whatever their values look like
+TEXT_STANDARD_COLUMNS = {'DIA', 'CAMPANA', 'AD_GROUP', 'ESTABLECIMIENTO', 'CIUDAD'}
+
+
+def _detect_platform(columns_text):
+    scores = {platform: sum(1 for kw in keywords if kw in columns_text)
+              for platform, keywords in PLATFORM_PROFILES.items()}
+    if max(scores.values()) > 0:
+        return max(scores, key=scores.get)
+    return 'DESCONOCIDO'
+
+
+@lru_cache(maxsize=256)
+def _resolve_header(columns):
+    normalized = [normalize(col) for col in columns]
+
+    # First column per standard name, as in the original nested-loop mapping
+    column_map = {}
+    found = set()
+    for col in normalized:
+        std_name = COMPILED_MAPPING.get(col)
+        if std_name and std_name not in found:
+            column_map[col] = std_name
+            found.add(std_name)
+    columnas_encontradas = [std for std in STANDARD_ORDER if std in found]
+    mapped = [column_map.get(col, col) for col in normalized]
+    mapped_norm = [normalize(col) for col in mapped]
+
+    def _index_of(candidates, predicate):
+        for i, col in enumerate(candidates):
+            if predicate(i, col):
+                return i
+        return None
+
+    campaign_idx = _index_of(mapped_norm, lambda i, c: 'campaign' in c or 'campana' in c
+                             or mapped[i] == 'CAMPANA')
+    ad_group_parse_idx = _index_of(mapped_norm, lambda i, c: any(
+        kw in c for kw in ['conjunto', 'ad set', 'ad group', 'ad_group', 'grupo'])
+        or mapped[i] == 'AD_GROUP')
+    ad_group_idx = _index_of(mapped_norm, lambda i, c: 'ad group' in c or 'ad set' in c
+                             or 'conjunto' in c or mapped[i] == 'AD_GROUP')
+    raw_campaign_idx = _index_of(normalized, lambda i, c: 'campaign' in c or 'campana' in c)
+    raw_date_idx = _index_of(normalized, lambda i, c: c in SCAN_DATE_COLUMNS)
+
+    name_idx = {campaign_idx, ad_group_parse_idx, ad_group_idx, raw_campaign_idx, raw_date_idx}
+    name_idx.discard(None)
+    text_idx = name_idx | {i for i, col in enumerate(mapped) if col in TEXT_STANDARD_COLUMNS}
+    used_idx = text_idx | {i for i, col in enumerate(mapped) if col in found}
+
+    return HeaderResolution(
+        platform=_detect_platform(' '.join(normalized)),
+        column_map=column_map,
+        columnas_encontradas=columnas_encontradas,
+        mapped_columns=mapped,
+        campaign_col=None if campaign_idx is None else mapped[campaign_idx],
+        ad_group_parse_col=None if ad_group_parse_idx is None else mapped[ad_group_parse_idx],
+        ad_group_col=None if ad_group_idx is None else mapped[ad_group_idx],
+        raw_campaign_col=None if raw_campaign_idx is None else columns[raw_campaign_idx],
+        raw_date_col=None if raw_date_idx is None else columns[raw_date_idx],
+        used_columns=tuple(sorted(used_idx)),
+        text_columns=tuple(sorted(text_idx)),
+    )
+
+
+def resolve_header(columns):
+    """Resolve mapping, platform and key columns for a raw header (cached per header).
+
+    The returned HeaderResolution is shared between calls and must not be mutated.
+    """
+    return _resolve_header(tuple(columns))
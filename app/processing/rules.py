@@ -0,0 +1,218 @@
+"""Declarative validation rules.
+
+Validations are declared as Rule values (see alerts.py and history.py for
+the rule lists) and evaluated here:
+
+    row rules        a predicate over one column of the output rows; the
+                     alert severity comes from the share of rows matching it
+    column rules     columns missing from a file's header
+    history rules    a predicate comparing one value of each platform (a
+                     metric total, its formats, its first day...) with the
+                     last history snapshot
+
+Row rules are counted per block of rows, so streamed runs add up their
+chunks. The platform column is factorized once per block and each rule's
+mask is counted per platform with np.bincount on those codes, so no rule
+filters or copies the frame.
+"""
+
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+Rule = namedtuple('Rule', [
+    'nombre',               # unique rule name, also the key of its timing in run profiles
+    'columna',              # column checked; a tuple of columns for column rules
+    'predicado',            # name in PREDICADOS_FILA / PREDICADOS_HISTORICOS ('faltante' for column rules)
+    # ((limite, tipo), ...) highest first; the first limit reached (exceeded, for
+    # history rules) sets the alert severity
+    'umbrales',
+    'mensaje',              # str.format template of the alert message
+    'excluir_plataformas',  # platforms the rule does not apply to
+])
+
+
+VALORES_VACIOS = ['', 'Sin definir']
+
+
+def _vacio(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Test each category once and look the rows up by code (-1 is a missing value)
+        codes = serie.cat.codes.to_numpy()
+        vacias = np.append(serie.cat.categories.isin(VALORES_VACIOS), True)
+        return pd.Series(vacias[codes], index=serie.index)
+    return serie.isna() | serie.isin(VALORES_VACIOS)
+
+
+# Row predicates: column Series -> boolean mask of the matching rows
+PREDICADOS_FILA = {
+    'vacio': _vacio,
+}
+
+
+def _caida_pct(anterior, actual):
+    if anterior is None or actual is None:
+        return None
+    return (anterior - actual) / anterior * 100 if anterior > 0 else None
+
+
+def _desaparece(anterior, actual):
+    if anterior is None or actual is None:
+        return None
+    return anterior if anterior > 0 and actual == 0 else None
+
+
+def _desaparece_categoria(anterior, actual):
+    faltantes = sorted(set(anterior or ()) - set(actual or ()))
+    return faltantes or None
+
+
+def _delta_dias(anterior, actual):
+    if anterior is None or actual is None:
+        return None
+    return (actual - anterior).days
+
+
+# History predicates: (previous value, current value) -> value compared with
+# the rule's limits, a list of values (one alert each) or None when the rule
+# does not apply. The current value is None for platforms without data today.
+PREDICADOS_HISTORICOS = {
+    'caida_pct': _caida_pct,
+    'desaparece': _desaparece,
+    'desaparece_categoria': _desaparece_categoria,
+    'delta_dias': _delta_dias,
+}
+
+
+def _severidad(umbrales, valor, inclusive):
+    for limite, tipo in umbrales:
+        if valor >= limite if inclusive else valor > limite:
+            return tipo
+    return None
+
+
+def contar_reglas(df, reglas, conteo=None):
+    """Count the rows matching each row rule in a block of rows, per platform.
+
+    Pass the previous result as conteo to add up counts across chunks of the
+    same run. Rules whose column is not in df are skipped; the time spent
+    on each rule is added up in conteo['segundos'].
+    """
+    if conteo is None:
+        conteo = {'total_filas': 0, 'filas_plataforma': {}, 'reglas': {}, 'segundos': {}}
+    conteo['total_filas'] += len(df)
+    if len(df) == 0:
+        return conteo
+
+    # Platforms coded once (code 0: no platform); every rule is then counted
+    # per platform code with a weighted bincount
+    plataforma = df['PLATAFORMA']
+    if isinstance(plataforma.dtype, pd.CategoricalDtype):
+        codigos, plataformas = plataforma.cat.codes.to_numpy(), plataforma.cat.categories
+    else:
+        codigos, plataformas = pd.factorize(plataforma, sort=False)
+    codigos = codigos.astype(np.intp) + 1
+    filas = np.bincount(codigos, minlength=len(plataformas) + 1)
+    for plat, cantidad in zip(plataformas, filas[1:]):
+        if cantidad:
+            conteo['filas_plataforma'][plat] = conteo['filas_plataforma'].get(plat, 0) + int(cantidad)
+
+    for regla in reglas:
+        if regla.columna not in df.columns:
+            continue
+        start = time.perf_counter()
+        mask = PREDICADOS_FILA[regla.predicado](df[regla.columna])
+        if regla.excluir_plataformas:
+            mask &= ~plataforma.isin(regla.excluir_plataformas)
+        mask = mask.to_numpy()
+        cantidades = np.bincount(codigos, weights=mask, minlength=len(plataformas) + 1).astype(np.int64)
+
+        regla_conteo = conteo['reglas'].setdefault(regla.nombre, {'cantidad': 0, 'plataformas': {}})
+        regla_conteo['cantidad'] += int(cantidades.sum())
+        con_filas = np.flatnonzero(cantidades[1:]) + 1
+        if len(con_filas) > 1:
+            # Platforms in the order of their first matching row
+            con_filas = sorted(con_filas, key=lambda c: np.argmax(mask & (codigos == c)))
+        for codigo in con_filas:
+            plat = plataformas[codigo - 1]
+            regla_conteo['plataformas'][plat] = regla_conteo['plataformas'].get(plat, 0) + int(cantidades[codigo])
+        conteo['segundos'][regla.nombre] = conteo['segundos'].get(regla.nombre, 0.0) + time.perf_counter() - start
+
+    return conteo
+
+
+def alertas_reglas(conteo, reglas, archivo):
+    """Alerts of the row rules, from contar_reglas counts.
+
+    A rule's share is taken over the rows of the platforms it applies to.
+    """
+    alerts = []
+    for regla in reglas:
+        regla_conteo = conteo['reglas'].get(regla.nombre)
+        if regla_conteo is None:
+            continue
+        total = conteo['total_filas'] - sum(conteo['filas_plataforma'].get(plat, 0)
+                                            for plat in regla.excluir_plataformas)
+        if total == 0:
+            continue
+
+        proporcion = regla_conteo['cantidad'] / total
+        tipo = _severidad(regla.umbrales, proporcion, inclusive=True)
+        if tipo:
+            msg = regla.mensaje.format(
+                columna=regla.columna, cantidad=regla_conteo['cantidad'], total=total,
+                porcentaje=proporcion * 100,
+                plataformas=', '.join(str(p) for p in regla_conteo['plataformas']))
+            alerts.append({'tipo': tipo, 'archivo': archivo, 'mensaje': msg})
+    return alerts
+
+
+def alertas_columnas(reglas, columnas_encontradas, platform, filename):
+    """Alerts of the column rules for a file header.
+
+    Returns (alerts, tipos), tipos being the severities raised.
+    """
+    alerts = []
+    for regla in reglas:
+        if platform in regla.excluir_plataformas:
+            continue
+        faltantes = [col for col in regla.columna if col not in columnas_encontradas]
+        tipo = _severidad(regla.umbrales, len(faltantes), inclusive=True)
+        if tipo:
+            alerts.append({'tipo': tipo, 'archivo': filename,
+                           'mensaje': regla.mensaje.format(columnas=', '.join(faltantes))})
+    return alerts, {alert['tipo'] for alert in alerts}
+
+
+def alertas_historicas(reglas, previos, actuales, archivo, segundos=None):
+    """Alerts of the history rules.
+
+    previos and actuales map each platform to its values ({columna: value});
+    platforms of the previous snapshot without data today are compared with
+    None. The time spent on each rule is added up in segundos.
+    """
+    alerts = []
+    for regla in reglas:
+        start = time.perf_counter()
+        predicado = PREDICADOS_HISTORICOS[regla.predicado]
+        for plat, valores_prev in previos.items():
+            if plat in regla.excluir_plataformas:
+                continue
+            anterior = valores_prev.get(regla.columna)
+            actual = actuales[plat].get(regla.columna) if plat in actuales else None
+            resultado = predicado(anterior, actual)
+            if resultado is None:
+                continue
+            # A list holds one value per alert; its limits are compared with their count
+            valores = resultado if isinstance(resultado, list) else [resultado]
+            tipo = _severidad(regla.umbrales, len(valores) if isinstance(resultado, list) else resultado,
+                              inclusive=False)
+            if not tipo:
+                continue
+            for valor in valores:
+                msg = regla.mensaje.format(plataforma=plat, valor=valor, anterior=anterior, actual=actual)
+                alerts.append({'tipo': tipo, 'archivo': archivo, 'mensaje': msg})
+        if segundos is not None:
+            segundos[regla.nombre] = segundos.get(regla.nombre, 0.0) + time.perf_counter() - start
+    return alerts
@@ -0,0 +1,282 @@
+"""Per-run dashboard summaries: KPI totals, filter values and chart series.
+
+The summary holds every chart of the unfiltered dashboard, so the page
+draws from it alone; dashboard.js fetches the run's rows only once a
+filter is applied.
+"""
+
+import json
+import pandas as pd
+from .metrics import calcular_alcance_deduplicado
+
+FILTER_FIELDS = ['PLATAFORMA', 'ETAPA', 'COMPRA', 'FORMATO', 'AUDIENCIA', 'CIUDAD']
+SUM_FIELDS = {'GASTO': 'gasto', 'IMPRESIONES': 'imp', 'CLICS': 'clics', 'VIEWS': 'views', 'REGISTROS': 'reg'}
+# Dimensions charted per value (groupBy() in dashboard.js), and the metrics
+# summed or averaged over their rows (groupByAvg())
+GROUP_FIELDS = ['PLATAFORMA', 'ETAPA', 'COMPRA', 'FORMATO', 'AUDIENCIA', 'COM', 'CIUDAD', 'ESTABLECIMIENTO']
+GROUP_SUM_FIELDS = ['GASTO', 'IMPRESIONES', 'CLICS', 'VIEWS', 'REGISTROS', 'ALCANCE']
+GROUP_AVG_FIELDS = ['CTR', 'VTR', 'FRECUENCIA']
+# Dimensions with a daily evolution chart per value (getDailyDataBy*() in dashboard.js)
+DAILY_GROUP_FIELDS = ['PLATAFORMA', 'FORMATO', 'COM', 'ETAPA', 'CIUDAD']
+TABLE_FIELDS = ['PLATAFORMA', 'ETAPA', 'COMPRA', 'FORMATO', 'AUDIENCIA', 'GASTO', 'IMPRESIONES', 'CLICS',
+                'VIEWS', 'CTR', 'VTR']
+TABLE_ROWS = 50
+
+
+def _numeric(df, col):
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+
+def _daily_totals(df):
+    """Per-day sums of one block of rows, indexed by the DIA string."""
+    if 'DIA' not in df.columns or df.empty:
+        return None
+
+    daily = pd.DataFrame({'DIA': df['DIA'].astype(str)})
+    for col, key in SUM_FIELDS.items():
+        daily[key] = _numeric(df, col)
+    frec = _numeric(df, 'FRECUENCIA')
+    daily['frec_sum'] = frec.where(frec > 0, 0)
+    daily['frec_count'] = (frec > 0).astype(int)
+    daily = daily[~daily['DIA'].isin(['', 'nan', 'NaT'])]
+    return daily.groupby('DIA').sum()
+
+
+def _text(df, col):
+    """Column as strings, '' for missing values (rows without a value are not charted)."""
+    if col not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[col].astype(object).where(df[col].notna(), '').astype(str)
+
+
+def _merge(previous, current):
+    """Add up two group totals frames, keeping groups in order of first appearance."""
+    if previous is None:
+        return current
+    return pd.concat([previous, current]).groupby(level=list(range(current.index.nlevels)), sort=False).sum()
+
+
+def _group_totals(df, field):
+    """Per-value sums of GROUP_SUM_FIELDS and GROUP_AVG_FIELDS, with the row count, for one dimension."""
+    values = pd.DataFrame({col: _numeric(df, col) for col in GROUP_SUM_FIELDS + GROUP_AVG_FIELDS})
+    values['filas'] = 1
+    keys = _text(df, field)
+    return values[keys != ''].groupby(keys[keys != ''], sort=False).sum()
+
+
+def _daily_group_totals(df, field):
+    """Per-(value, DIA) sums of SUM_FIELDS for one dimension."""
+    values = pd.DataFrame({key: _numeric(df, col) for col, key in SUM_FIELDS.items()})
+    keys, days = _text(df, field), _text(df, 'DIA')
+    valid = (keys != '') & (days != '')
+    return values[valid].groupby([keys[valid], days[valid]], sort=False).sum()
+
+
+def _chronological(days):
+    fechas = pd.to_datetime(pd.Series(days, dtype=object), format='%d/%m/%y', errors='coerce')
+    return [days[i] for i in fechas.sort_values(kind='stable').index]
+
+
+def _daily_series(grouped):
+    """Daily totals matching getDailyData() in dashboard.js (chronological order)."""
+    if grouped is None:
+        return []
+
+    grouped = grouped.copy()
+    grouped['fecha'] = pd.to_datetime(grouped.index, format='%d/%m/%y', errors='coerce')
+    grouped = grouped.sort_values('fecha')
+
+    series = []
+    for dia, g in grouped.iterrows():
+        gasto, imp, clics, views, reg = (float(g[k]) for k in SUM_FIELDS.values())
+        series.append({
+            'label': dia[:5],
+            'gasto': round(gasto, 2),
+            'imp': imp,
+            'clics': clics,
+            'views': views,
+            'reg': reg,
+            'cpa': round(gasto / reg, 2) if reg > 0 else 0,
+            'cvr': round(reg / clics * 100, 2) if clics > 0 else 0,
+            'ctr': clics / imp * 100 if imp > 0 else 0,
+            'vtr': views / imp * 100 if imp > 0 else 0,
+            'frec': float(g['frec_sum']) / g['frec_count'] if g['frec_count'] > 0 else 0,
+        })
+    return series
+
+
+def _grouped_series(groups):
+    """{value: {GASTO, ..., CTR, ...}} of a dimension, averages taken over its rows."""
+    result = {}
+    for value, g in groups.iterrows():
+        metrics = {col: float(g[col]) for col in GROUP_SUM_FIELDS}
+        metrics.update((col, round(float(g[col]) / g['filas'], 2)) for col in GROUP_AVG_FIELDS)
+        result[value] = metrics
+    return result
+
+
+def _daily_group_series(grouped, days):
+    """{labels, values, series: {value: [points]}} of a dimension over every day of the run."""
+    labels = [dia[:5] for dia in days]
+    if grouped is None:
+        return {'labels': labels, 'values': [], 'series': {}}
+
+    values = sorted(grouped.index.get_level_values(0).unique())
+    series = {}
+    for value in values:
+        por_dia = grouped.loc[value].reindex(days, fill_value=0)
+        points = []
+        for dia, gasto, imp, clics, views, reg in por_dia[list(SUM_FIELDS.values())].itertuples():
+            gasto, imp, clics, views, reg = float(gasto), float(imp), float(clics), float(views), float(reg)
+            points.append({
+                'label': dia[:5],
+                'gasto': round(gasto, 2),
+                'imp': imp,
+                'clics': clics,
+                'views': views,
+                'reg': reg,
+                'cpa': round(gasto / reg, 2) if reg > 0 else 0,
+                'cvr': round(reg / clics * 100, 2) if clics > 0 else 0,
+            })
+        series[value] = points
+    return {'labels': labels, 'values': values, 'series': series}
+
+
+def _table_rows(df, count):
+    """First count rows of the detail table (updateTable() in dashboard.js)."""
+    df = df.iloc[:count]
+    rows = pd.DataFrame({col: _numeric(df, col).astype(float) if col in SUM_FIELDS or col in GROUP_AVG_FIELDS
+                         else _text(df, col) for col in TABLE_FIELDS})
+    return rows.to_dict('records')
+
+
+def _has_values(df, col):
+    return col in df.columns and bool((df[col].notna() & (df[col].astype(str) != '')).any())
+
+
+def collect_summary(df, acc=None):
+    """Accumulate the summary totals of a block of rows.
+
+    Pass the previous result as acc to merge chunks of the same run;
+    summary_from_totals() turns it into the dashboard payload.
+    """
+    if acc is None:
+        acc = {
+            'totals': dict.fromkeys(SUM_FIELDS, 0.0),
+            'filters': {field: set() for field in FILTER_FIELDS},
+            'daily': None,
+            'groups': dict.fromkeys(GROUP_FIELDS),
+            'daily_groups': dict.fromkeys(DAILY_GROUP_FIELDS),
+            'compra_formato': {},
+            'table': [],
+            'has_ciudad': False,
+            'has_establecimiento': False,
+        }
+
+    for col in SUM_FIELDS:
+        acc['totals'][col] += float(_numeric(df, col).sum())
+
+    # Distinct non-empty values per dashboard filter
+    for field in FILTER_FIELDS:
+        if field in df.columns:
+            vals = df[field].dropna().astype(str)
+            acc['filters'][field].update(v for v in vals.unique() if v)
+
+    daily = _daily_totals(df)
+    if daily is not None:
+        if acc['daily'] is not None:
+            daily = pd.concat([acc['daily'], daily]).groupby(level=0).sum()
+        acc['daily'] = daily
+
+    for field in GROUP_FIELDS:
+        acc['groups'][field] = _merge(acc['groups'][field], _group_totals(df, field))
+    if 'DIA' in df.columns:
+        for field in DAILY_GROUP_FIELDS:
+            acc['daily_groups'][field] = _merge(acc['daily_groups'][field], _daily_group_totals(df, field))
+
+    # Purchase types of each format, shown under the format labels
+    pares = pd.DataFrame({'FORMATO': _text(df, 'FORMATO'), 'COMPRA': _text(df, 'COMPRA')}).drop_duplicates()
+    for formato, compra in pares[(pares['FORMATO'] != '') & (pares['COMPRA'] != '')].itertuples(index=False):
+        compras = acc['compra_formato'].setdefault(formato, [])
+        if compra not in compras:
+            compras.append(compra)
+
+    if len(acc['table']) < TABLE_ROWS:
+        acc['table'].extend(_table_rows(df, TABLE_ROWS - len(acc['table'])))
+
+    acc['has_ciudad'] = acc['has_ciudad'] or _has_values(df, 'CIUDAD')
+    acc['has_establecimiento'] = acc['has_establecimiento'] or _has_values(df, 'ESTABLECIMIENTO')
+    return acc
+
+
+def summary_from_totals(acc, alcance_dedup):
+    """Dashboard payload from collect_summary totals and the run's deduplicated reach."""
+    totals = acc['totals']
+    gasto = totals['GASTO']
+    imp = totals['IMPRESIONES']
+    clics = totals['CLICS']
+    views = totals['VIEWS']
+    registros = int(totals['REGISTROS'])
+
+    kpis = {
+        'gasto': round(gasto, 2),
+        'impresiones': imp,
+        'clics': clics,
+        'views': views,
+        'alcance': float(alcance_dedup.get('final_reach', 0)),
+        'frecuencia': float(alcance_dedup.get('frecuencia', 0)),
+        'ctr': clics / imp * 100 if imp > 0 else 0,
+        'vtr': views / imp * 100 if imp > 0 else 0,
+        'registros': registros,
+    }
+
+    days = _chronological(list(acc['daily'].index)) if acc['daily'] is not None else []
+    return {
+        'kpis': kpis,
+        'filters': {field: sorted(values) for field, values in acc['filters'].items()},
+        'daily': _daily_series(acc['daily']),
+        'groups': {field: _grouped_series(groups) if groups is not None else {}
+                   for field, groups in acc['groups'].items()},
+        'daily_groups': {field: _daily_group_series(grouped, days)
+                         for field, grouped in acc['daily_groups'].items()},
+        'compra_formato': {formato: ' / '.join(compras) for formato, compras in acc['compra_formato'].items()},
+        'table': acc['table'],
+        'has_ciudad': acc['has_ciudad'],
+        'has_establecimiento': acc['has_establecimiento'],
+    }
+
+
+def build_run_summary(df, alcance_dedup=None):
+    """Build the first-paint dashboard payload for a run.
+
+    Holds what the dashboard shows before any filter is applied: KPI totals,
+    the values for each filter dropdown, the per-dimension and daily chart
+    series and the first rows of the detail table.
+    """
+    if alcance_dedup is None:
+        alcance_dedup = calcular_alcance_deduplicado(df, overlap_pct=72)
+    return summary_from_totals(collect_summary(df), alcance_dedup)
+
+
+def get_run_summary(run):
+    """Return the stored summary for a run.
+
+    Built again for runs processed before summaries, or before summaries
+    held the chart series.
+    """
+    if run.summary_json:
+        summary = json.loads(run.summary_json)
+        if 'groups' in summary:
+            return summary
+
+    from app import db
+    df = pd.DataFrame([row.to_dict() for row in run.report_rows()])
+    if df.empty:
+        return None
+
+    summary = build_run_summary(df)
+    run.summary_json = json.dumps(summary)
+    db.session.commit()
+    return summary
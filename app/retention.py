@@ -0,0 +1,169 @@
+"""Retention of superseded processing runs.
+
+Every update creates a new run, so report rows, alerts and uploaded-file
+records of old runs pile up. Runs outside the retention policy are archived:
+their report_rows, alerts and uploaded_files are deleted and the run itself
+is kept with status 'archived', together with its RunHistory snapshot, so
+historical comparisons of later uploads keep working.
+
+A run is kept when any of these holds:
+
+    it is one of the keep_last latest completed runs of its campaign
+    it is newer than keep_days days
+    a kept delta run inherits rows from it (see processing/delta.py)
+
+Runs that did not complete (errors, runs that never finished) are only kept
+while newer than keep_days, even when they are the latest of their campaign,
+so they never hold a partition back from being dropped.
+
+Rows are deleted in batches of batch_rows, one transaction per batch, so a
+large archive never holds long locks; with the partitioned layout on
+PostgreSQL (see partitioning.py) a partition whose runs are all archived is
+dropped instead. A run is marked archived before its rows go, and an
+interrupted archive is finished by the next invocation.
+
+    flask --app run retention [--keep-last 10] [--keep-days 30] [--batch-rows 5000] [--dry-run]
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED = 'archived'
+
+
+def select_runs_to_archive(keep_last, keep_days, now=None):
+    """Ids of runs outside the retention policy that still hold rows, alerts or files."""
+    from app import db
+    from app.models import ProcessingRun, ReportRow, Alert, UploadedFile
+
+    cutoff = (now or datetime.utcnow()) - timedelta(days=keep_days)
+    runs = db.session.query(ProcessingRun.id, ProcessingRun.campaign_id, ProcessingRun.status,
+                            ProcessingRun.created_at, ProcessingRun.base_run_id)\
+        .order_by(ProcessingRun.campaign_id, ProcessingRun.created_at.desc(), ProcessingRun.id.desc())\
+        .all()
+
+    keep = set()
+    completed_kept = {}
+    for run in runs:
+        if run.status == 'completed' and completed_kept.get(run.campaign_id, 0) < keep_last:
+            completed_kept[run.campaign_id] = completed_kept.get(run.campaign_id, 0) + 1
+            keep.add(run.id)
+        if run.created_at is not None and run.created_at >= cutoff:
+            keep.add(run.id)
+
+    # Delta runs read their base runs' rows: keep the whole chain
+    base_of = {run.id: run.base_run_id for run in runs}
+    pending = list(keep)
+    while pending:
+        base = base_of.get(pending.pop())
+        if base and base not in keep:
+            keep.add(base)
+            pending.append(base)
+
+    candidates = [run.id for run in runs if run.id not in keep and run.status != ARCHIVED]
+
+    # Archived runs whose rows were not all deleted (interrupted earlier invocation)
+    archived = [run.id for run in runs if run.id not in keep and run.status == ARCHIVED]
+    leftover = set()
+    for model in (ReportRow, Alert, UploadedFile):
+        for start in range(0, len(archived), 500):
+            batch = archived[start:start + 500]
+            leftover.update(run_id for (run_id,) in db.session.query(model.run_id)
+                            .filter(model.run_id.in_(batch)).distinct())
+    return sorted(candidates + [run_id for run_id in archived if run_id in leftover])
+
+
+def _delete_batched(table, run_id, batch_rows):
+    """Delete the rows of run_id from table, batch_rows per transaction. Returns the count."""
+    from sqlalchemy import select
+    from app import db
+
+    deleted = 0
+    while True:
+        with db.engine.begin() as conn:
+            ids = conn.execute(select(table.c.id).where(table.c.run_id == run_id)
+                               .limit(batch_rows)).scalars().all()
+            if not ids:
+                return deleted
+            # run_id as well, so a partitioned report_rows only touches the run's partition
+            conn.execute(table.delete().where(table.c.run_id == run_id, table.c.id.in_(ids)))
+        deleted += len(ids)
+
+
+def archive_run(run_id, batch_rows):
+    """Archive one run: mark it, then delete its rows, alerts and uploaded files.
+
+    Returns {'report_rows', 'alerts', 'uploaded_files'} with the deleted counts.
+    """
+    from app import db
+    from app.models import ProcessingRun, ReportRow, Alert, UploadedFile
+    from app.partitioning import drop_archived_partition
+
+    run = db.session.get(ProcessingRun, run_id)
+    if run.status != ARCHIVED:
+        run.status = ARCHIVED
+        db.session.commit()
+    db.session.close()
+
+    dropped = drop_archived_partition(run_id)
+    return {
+        'report_rows': dropped if dropped is not None else _delete_batched(ReportRow.__table__, run_id, batch_rows),
+        'alerts': _delete_batched(Alert.__table__, run_id, batch_rows),
+        'uploaded_files': _delete_batched(UploadedFile.__table__, run_id, batch_rows),
+    }
+
+
+def apply_retention(keep_last, keep_days, batch_rows=5000, dry_run=False, now=None):
+    """Archive every run outside the policy (see module docstring).
+
+    Returns {runs, report_rows, alerts, uploaded_files, seconds}; with
+    dry_run only runs is filled in and nothing is changed.
+    """
+    if keep_last < 1:
+        raise ValueError('keep_last must be at least 1')
+
+    start = time.perf_counter()
+    run_ids = select_runs_to_archive(keep_last, keep_days, now=now)
+    totals = {'runs': run_ids, 'report_rows': 0, 'alerts': 0, 'uploaded_files': 0}
+    if not dry_run:
+        for run_id in run_ids:
+            for name, count in archive_run(run_id, batch_rows).items():
+                totals[name] += count
+            logger.info("Run %s archivado", run_id)
+    totals['seconds'] = time.perf_counter() - start
+    return totals
+
+
+@click.command('retention')
+@click.option('--keep-last', type=int, default=None,
+              help='Completed runs kept per campaign (RETENTION_KEEP_LAST).')
+@click.option('--keep-days', type=int, default=None,
+              help='Runs newer than this many days are kept (RETENTION_KEEP_DAYS).')
+@click.option('--batch-rows', type=int, default=None,
+              help='Rows deleted per transaction (RETENTION_BATCH_ROWS).')
+@click.option('--dry-run', is_flag=True, help='Only list the runs that would be archived.')
+@with_appcontext
+def retention_command(keep_last, keep_days, batch_rows, dry_run):
+    """Archive superseded runs, keeping their history snapshots."""
+    config = current_app.config
+    keep_last = keep_last if keep_last is not None else config['RETENTION_KEEP_LAST']
+    keep_days = keep_days if keep_days is not None else config['RETENTION_KEEP_DAYS']
+    batch_rows = batch_rows if batch_rows is not None else config['RETENTION_BATCH_ROWS']
+
+    result = apply_retention(keep_last, keep_days, batch_rows=batch_rows, dry_run=dry_run)
+    runs = result['runs']
+    if dry_run:
+        click.echo(f"{len(runs)} runs se archivarian: {', '.join(map(str, runs)) or '-'}")
+        return
+
+    rate = result['report_rows'] / result['seconds'] if result['seconds'] else 0
+    click.echo(f"{len(runs)} runs archivados: {result['report_rows']} filas, {result['alerts']} alertas, "
+               f"{result['uploaded_files']} archivos eliminados en {result['seconds']:.1f}s "
+               f"({rate:,.0f} filas/s)")
@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify, abort
-from app.models import ProcessingRun, ReportRow
+import json
+from flask import Blueprint, jsonify, abort, request
+from app.models import ProcessingRun
 
 api_bp = Blueprint('api', __name__)
 
@@ -10,11 +11,63 @@ def run_data(run_id):
     if run.status != 'completed':
         abort(404)
 
-    rows = ReportRow.query.filter_by(run_id=run_id).all()
-    data = [row.to_dict() for row in rows]
+    data = [row.to_dict() for row in run.report_rows()]
     return jsonify(data)
 
 
+@api_bp.route('/api/run/<int:run_id>/profile')
+def run_profile(run_id):
+    """Per-stage timing, rows and peak memory of a run (see processing/profiling.py)."""
+    run = ProcessingRun.query.get_or_404(run_id)
+    if not run.profile_json:
+        abort(404)
+
+    return jsonify(dict(json.loads(run.profile_json), run_id=run.id, status=run.status))
+
+
+@api_bp.route('/api/run/<int:run_a>/diff/<int:run_b>')
+def run_diff(run_a, run_b):
+    """Groups added, removed and changed from run_a to run_b (see processing/diff.py).
+
+    ?by=platform (default), format, day, ad_group or a comma-separated combination.
+    Both runs must be completed runs of the same campaign.
+    """
+    from app.processing.diff import parse_granularity, diff_runs
+
+    first = ProcessingRun.query.get_or_404(run_a)
+    second = ProcessingRun.query.get_or_404(run_b)
+    if first.status != 'completed' or second.status != 'completed' \
+            or first.campaign_id != second.campaign_id:
+        abort(404)
+    try:
+        dims, columns = parse_granularity(request.args.get('by'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(dict(diff_runs(first, second, columns), run_a=run_a, run_b=run_b, by=dims))
+
+
+@api_bp.route('/api/campaign/<slug>/trend')
+def campaign_trend(slug):
+    """Per-platform metric totals of every run of a campaign, oldest first.
+
+    ?metric=GASTO,VIEWS and ?platform=META restrict the series returned.
+    """
+    from app.processing.history_metrics import get_campaign_trend
+
+    metrics = [m.strip().upper() for m in request.args.get('metric', '').split(',') if m.strip()]
+    platforms = [p.strip().upper() for p in request.args.get('platform', '').split(',') if p.strip()]
+    series = get_campaign_trend(slug, metrics=metrics, platforms=platforms)
+    if series is None:
+        abort(404)
+
+    return jsonify({
+        'campaign': slug,
+        'series': [{'platform': plat, 'metric': metric, 'points': points}
+                   for (plat, metric), points in sorted(series.items())],
+    })
+
+
 @api_bp.route('/api/run/<int:run_id>/summary')
 def run_summary(run_id):
     run = ProcessingRun.query.get_or_404(run_id)
@@ -15,6 +15,12 @@ def dashboard(run_id):
     alerts_criticos = Alert.query.filter_by(run_id=run_id, tipo='CRITICO').all()
     alerts_errores = Alert.query.filter_by(run_id=run_id, tipo='ERROR').all()
 
+    # Precomputed KPIs, filter values, chart series and table for the first
+    # paint; raw rows are only fetched by dashboard.js once a filter changes.
+    # get_run_summary rebuilds summaries stored without the chart series.
+    from app.processing.summary import get_run_summary
+    summary = get_run_summary(run)
+
     auto_print = request.args.get('print') == '1'
     session_id = request.args.get('session_id', '')
 
@@ -23,5 +29,6 @@ def dashboard(run_id):
                            campaign=campaign,
                            alerts_criticos=alerts_criticos,
                            alerts_errores=alerts_errores,
+                           summary=summary,
                            auto_print=auto_print,
                            session_id=session_id)
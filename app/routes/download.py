@@ -1,19 +1,24 @@
 import io
+import time
 from flask import Blueprint, send_file, abort
-from app.models import ProcessingRun, ReportRow, Alert
-from app.processing.engine import OUTPUT_COLUMNS
-import pandas as pd
+from app import monitoring
+from app.models import ProcessingRun, Alert
 
 download_bp = Blueprint('download', __name__)
 
 
 @download_bp.route('/download/excel/<int:run_id>')
 def download_excel(run_id):
+    # pandas/openpyxl are only needed here; imported on first export, not at boot
+    import pandas as pd
+    from app.processing.engine import OUTPUT_COLUMNS
+
+    start = time.perf_counter()
     run = ProcessingRun.query.get_or_404(run_id)
     if run.status != 'completed':
         abort(404)
 
-    rows = ReportRow.query.filter_by(run_id=run_id).all()
+    rows = run.report_rows()
     if not rows:
         abort(404)
 
@@ -33,6 +38,7 @@ def download_excel(run_id):
     from app.models import Campaign
     campaign = Campaign.query.get(run.campaign_id)
     filename = f"REPORTE_{campaign.slug}_{run.created_at.strftime('%Y-%m-%d')}.xlsx"
+    monitoring.EXPORT_SECONDS.observe(time.perf_counter() - start, export='excel')
 
     return send_file(output, as_attachment=True, download_name=filename,
                      mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
@@ -40,6 +46,7 @@ def download_excel(run_id):
 
 @download_bp.route('/download/alerts/<int:run_id>')
 def download_alerts(run_id):
+    start = time.perf_counter()
     run = ProcessingRun.query.get_or_404(run_id)
     alerts = Alert.query.filter_by(run_id=run_id).all()
 
@@ -85,6 +92,7 @@ def download_alerts(run_id):
     from app.models import Campaign
     campaign = Campaign.query.get(run.campaign_id)
     filename = f"ALERTAS_{campaign.slug}_{run.created_at.strftime('%Y-%m-%d')}.txt"
+    monitoring.EXPORT_SECONDS.observe(time.perf_counter() - start, export='alerts')
 
     return send_file(text_bytes, as_attachment=True, download_name=filename,
                      mimetype='text/plain')
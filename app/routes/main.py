@@ -1,23 +1,67 @@
-from flask import Blueprint, render_template, redirect, url_for
+from flask import Blueprint, render_template, redirect, url_for, request
+from sqlalchemy import func, and_, or_
+from app import db
 from app.models import Campaign, ProcessingRun
 
 main_bp = Blueprint('main', __name__)
 
+CAMPAIGNS_PER_PAGE = 24
+
 
 @main_bp.route('/')
 def index():
     return redirect(url_for('upload.upload_page'))
 
 
+def latest_runs_subquery():
+    """Rank each campaign's runs newest first; rank 1 is the latest run."""
+    return db.session.query(
+        ProcessingRun.id.label('run_id'),
+        ProcessingRun.campaign_id.label('campaign_id'),
+        func.row_number().over(
+            partition_by=ProcessingRun.campaign_id,
+            order_by=(ProcessingRun.created_at.desc(), ProcessingRun.id.desc()),
+        ).label('rank'),
+    ).subquery()
+
+
+def _prefix_match(column, prefix):
+    """Case-insensitive prefix filter that can use the ix_campaigns_*_lower indexes."""
+    expr = func.lower(column)
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite only uses expression indexes for range comparisons, not LIKE
+        return and_(expr >= prefix, expr < prefix + '\U0010ffff')
+    return expr.startswith(prefix, autoescape=True)
+
+
 @main_bp.route('/campaigns')
 def campaigns():
-    campaigns = Campaign.query.order_by(Campaign.updated_at.desc()).all()
+    search = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+
+    # Campaigns and their latest run in one query (no per-campaign lookups)
+    latest = latest_runs_subquery()
+    query = db.session.query(Campaign, ProcessingRun)\
+        .outerjoin(latest, and_(latest.c.campaign_id == Campaign.id, latest.c.rank == 1))\
+        .outerjoin(ProcessingRun, ProcessingRun.id == latest.c.run_id)
+
+    if search:
+        prefix = search.lower()
+        query = query.filter(or_(
+            _prefix_match(Campaign.name, prefix),
+            _prefix_match(Campaign.brand, prefix),
+            _prefix_match(Campaign.brand_display, prefix),
+        ))
+
+    pagination = query.order_by(Campaign.updated_at.desc(), Campaign.id.desc())\
+        .paginate(page=page, per_page=CAMPAIGNS_PER_PAGE, error_out=False)
+
     campaign_data = []
-    for c in campaigns:
-        last_run = c.runs.first()
+    for c, last_run in pagination.items:
         campaign_data.append({
             'campaign': c,
             'last_run': last_run,
             'last_run_id': last_run.id if last_run else None,
         })
-    return render_template('index.html', campaigns=campaign_data)
+    return render_template('index.html', campaigns=campaign_data,
+                           pagination=pagination, search=search)
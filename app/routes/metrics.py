@@ -0,0 +1,17 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, request
+from app import monitoring
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint, aggregated across all workers.
+
+    With METRICS_TOKEN set, requests must send it as a bearer token.
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    return Response(monitoring.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -1,23 +1,105 @@
 import io
 import os
+import json
 import uuid
+import gzip
 import shutil
-from datetime import datetime, timedelta
+import hashlib
+import zipfile
+import time
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify, current_app
-from app import db
+from app import db, monitoring
 from app.models import Campaign, ProcessingRun, UploadedFile
-from app.processing.engine import (normalizar_nombre_campana, process_uploaded_files,
-                                   scan_campaigns_from_files, detect_header_row)
-from app.processing.nomenclature import normalize, detect_campaign_from_file
-import pandas as pd
+
+# The processing engine (and pandas with it) is imported inside the views
+# that process files, so workers boot and serve other pages without it.
 
 upload_bp = Blueprint('upload', __name__)
 
-ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+REPORT_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = REPORT_EXTENSIONS | {'zip', 'gz'}
+COPY_BLOCK_BYTES = 1024 * 1024
+# Chunked uploads: pending upload description and received chunks, inside the session directory
+CHUNKED_MANIFEST_NAME = '.chunked.json'
+CHUNKS_DIR_NAME = '.chunks'
+
+
+def _extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    ext = _extension(filename)
+    if ext == 'gz':
+        return filename.lower().endswith('.csv.gz')
+    return ext in ALLOWED_EXTENSIONS
+
+
+def _safe_name(filename):
+    return os.path.basename(filename.replace('\\', '/'))
+
+
+def _unique_name(name, session_dir):
+    """name, or 'stem (2).ext', 'stem (3).ext'... when session_dir already has a file of that name."""
+    stem, dot, ext = name.rpartition('.')
+    candidate, n = name, 1
+    while os.path.exists(os.path.join(session_dir, candidate)):
+        n += 1
+        candidate = f'{stem} ({n}){dot}{ext}'
+    return candidate
+
+
+def _copy_hashed(source, dest_path, budget):
+    """Copy a stream to dest_path in blocks, hashing it on the way.
+
+    budget is a one-item list with the bytes still allowed (None: no limit);
+    going over it raises ValueError. Returns the hex SHA-256.
+    """
+    digest = hashlib.sha256()
+    with open(dest_path, 'wb') as f:
+        for block in iter(lambda: source.read(COPY_BLOCK_BYTES), b''):
+            if budget[0] is not None:
+                budget[0] -= len(block)
+                if budget[0] < 0:
+                    raise ValueError('Los archivos descomprimidos superan el limite permitido')
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+
+def save_upload(file_storage, filename, session_dir, budget):
+    """Stream one uploaded file to session_dir. Returns {saved filename: sha256}.
+
+    .csv.gz files are decompressed to their .csv, and the CSV/Excel members
+    of .zip files are extracted (flattened to their base names); both count
+    against budget (see _copy_hashed). A name already saved in the session
+    is numbered ('name (2).csv'...) so no file overwrites another. Nothing
+    is held in memory whole.
+    """
+    ext = _extension(filename)
+    safe_name = _safe_name(filename)
+    stream = file_storage.stream if hasattr(file_storage, 'stream') else file_storage
+
+    if ext == 'gz':
+        dest_name = _unique_name(safe_name[:-len('.gz')], session_dir)
+        with gzip.GzipFile(fileobj=stream) as source:
+            return {dest_name: _copy_hashed(source, os.path.join(session_dir, dest_name), budget)}
+
+    if ext == 'zip':
+        hashes = {}
+        with zipfile.ZipFile(stream) as archive:
+            for member in archive.infolist():
+                member_name = _safe_name(member.filename)
+                if member.is_dir() or member_name.startswith('.') \
+                        or _extension(member_name) not in REPORT_EXTENSIONS:
+                    continue
+                member_name = _unique_name(member_name, session_dir)
+                with archive.open(member) as source:
+                    hashes[member_name] = _copy_hashed(source, os.path.join(session_dir, member_name), budget)
+        return hashes
+
+    dest_name = _unique_name(safe_name, session_dir)
+    return {dest_name: _copy_hashed(stream, os.path.join(session_dir, dest_name), [None])}
 
 
 def get_uploads_dir():
@@ -27,54 +109,48 @@ def get_uploads_dir():
     return uploads_dir
 
 
-def cleanup_old_uploads(max_age_hours=24):
-    """Remove upload session directories older than max_age_hours."""
-    try:
-        uploads_dir = get_uploads_dir()
-        cutoff = datetime.now() - timedelta(hours=max_age_hours)
-        for name in os.listdir(uploads_dir):
-            path = os.path.join(uploads_dir, name)
-            if os.path.isdir(path):
-                mtime = datetime.fromtimestamp(os.path.getmtime(path))
-                if mtime < cutoff:
-                    shutil.rmtree(path, ignore_errors=True)
-    except Exception:
-        pass
+def get_parse_cache_dir():
+    """Processed-file cache directory, or None when the cache is disabled."""
+    if not current_app.config['PARSE_CACHE_ENABLED']:
+        return None
+    return current_app.config['PARSE_CACHE_DIR'] or os.path.join(current_app.instance_path, 'parse_cache')
 
 
-def detect_campaign_from_upload(file_storage, filename):
-    """Detect campaign name from an uploaded file without consuming the stream."""
-    file_bytes = file_storage.read()
-    file_storage.seek(0)
+def prune_parse_cache():
+    """Apply the processed-file cache limits (age, then size). Returns the entries removed."""
+    from app.processing.cache import prune_cache
+    config = current_app.config
+    return prune_cache(get_parse_cache_dir(), config['PARSE_CACHE_MAX_AGE_HOURS'],
+                       max_bytes=config['PARSE_CACHE_MAX_MB'] * 1024 * 1024)
 
-    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
 
-    try:
-        if ext == 'csv':
-            try:
-                raw_text = file_bytes.decode('utf-8')
-            except UnicodeDecodeError:
-                raw_text = file_bytes.decode('latin-1')
-
-            raw_lines = raw_text.split('\n')[:15]
-            skiprows = 0
-            keywords = ['campana', 'campaign', 'dia', 'day', 'clics', 'clicks',
-                        'impresiones', 'impressions', 'gasto', 'cost', 'coste']
-            for i, line in enumerate(raw_lines):
-                line_lower = normalize(line)
-                matches = sum(1 for kw in keywords if kw in line_lower)
-                if matches >= 2:
-                    skiprows = i
-                    break
-            df = pd.read_csv(io.BytesIO(file_bytes), skiprows=skiprows, on_bad_lines='skip', nrows=20)
-        else:
-            df_raw = pd.read_excel(io.BytesIO(file_bytes), header=None, nrows=10)
-            skiprows = detect_header_row(df_raw)
-            df = pd.read_excel(io.BytesIO(file_bytes), skiprows=skiprows, nrows=20)
-
-        return detect_campaign_from_file(df)
-    except Exception:
-        return None
+def session_paths(session, session_dir):
+    """Paths of the files of an upload session (from its manifest), by name."""
+    return [os.path.join(session_dir, name) for name in sorted(f['name'] for f in session.files())]
+
+
+def scan_session(session, session_dir):
+    """Campaigns detected in a session, cached in its manifest.
+
+    Session files never change once saved, so reloading the selection page
+    does not re-read the uploads.
+    """
+    if session.campaigns_json:
+        return json.loads(session.campaigns_json)
+
+    from app.processing.engine import scan_campaigns_from_files
+    campaigns = scan_campaigns_from_files(session_paths(session, session_dir))
+    session.campaigns_json = json.dumps(campaigns)
+    db.session.commit()
+    return campaigns
+
+
+def _add_saved_files(files, saved, session_dir):
+    """Add the {name: sha256} files saved by save_upload to the files of a session manifest."""
+    for name, sha256 in saved.items():
+        size = os.path.getsize(os.path.join(session_dir, name))
+        files[name] = {'name': name, 'size': size, 'sha256': sha256}
+        monitoring.UPLOAD_BYTES.inc(size)
 
 
 @upload_bp.route('/upload', methods=['GET'])
@@ -106,41 +182,268 @@ def upload_files():
     session_dir = os.path.join(uploads_dir, session_id)
     os.makedirs(session_dir, exist_ok=True)
 
-    saved_paths = []
-    for file_storage, filename in valid_files:
-        safe_name = os.path.basename(filename).replace('/', '_').replace('\\', '_')
-        dest_path = os.path.join(session_dir, safe_name)
-        file_storage.seek(0)
-        with open(dest_path, 'wb') as f:
-            f.write(file_storage.read())
-        saved_paths.append(dest_path)
+    # Streamed to disk block by block (compressed files decompressed on the
+    # way), hashing each file for the processed-file cache
+    files = {}
+    budget = [current_app.config['MAX_UNCOMPRESSED_MB'] * 1024 * 1024]
+    try:
+        for file_storage, filename in valid_files:
+            _add_saved_files(files, save_upload(file_storage, filename, session_dir, budget), session_dir)
+            monitoring.UPLOAD_FILES.inc(extension=_extension(filename))
+    except (ValueError, OSError, EOFError, zipfile.BadZipFile) as e:
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return jsonify({'error': f'No se pudo guardar {filename}: {e}'}), 400
+
+    if not files:
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return jsonify({'error': 'No se encontraron archivos validos (CSV/Excel)'}), 400
+
+    return redirect(_finish_upload(session_id, session_dir, files,
+                                   request.form.get('target_slug', '').strip(),
+                                   request.form.get('incremental') == '1'))
 
-    cleanup_old_uploads()
+
+def _finish_upload(session_id, session_dir, files, target_slug, incremental):
+    """Record the manifest of a saved upload and return the URL to continue at.
+
+    files is {name: {name, size, sha256}}. In update mode (target_slug) the
+    files are processed right away and the URL is the new run's dashboard;
+    otherwise it is the campaign selection. Expired sessions are left to the
+    janitor (see app/upload_sessions.py).
+    """
+    from app.upload_sessions import record_session
+    session = record_session(session_id, list(files.values()))
 
     # Update mode: target campaign slug passed as hidden field
-    target_slug = request.form.get('target_slug', '').strip()
     if target_slug:
         campaign = Campaign.query.filter_by(slug=target_slug).first()
         if campaign:
-            result = _process_session_files(session_dir, saved_paths, campaign.name,
-                                            campaign_filter=campaign.name)
+            result = _process_session_files(session, campaign.name,
+                                            campaign_filter=campaign.name,
+                                            incremental=incremental)
             if 'error' not in result:
-                return redirect(url_for('dashboard.dashboard', run_id=result['run_id']))
+                return url_for('dashboard.dashboard', run_id=result['run_id'])
+
+    return url_for('upload.select_campaign', session_id=session_id)
+
+
+# Chunked, resumable uploads: init -> PUT numbered chunks (any order, in
+# parallel, repeatable) -> finalize. Chunks are kept as separate files under
+# the session's .chunks directory, so a retried or resumed upload only sends
+# the chunks still missing; finalize joins them and saves each file exactly
+# as a plain upload would (save_upload).
+
+def _chunked_session(session_id):
+    """(session_dir, manifest) of a pending chunked upload, or (None, None)."""
+    try:
+        uuid.UUID(session_id)
+    except ValueError:
+        return None, None
+    session_dir = os.path.join(get_uploads_dir(), session_id)
+    try:
+        with open(os.path.join(session_dir, CHUNKED_MANIFEST_NAME)) as f:
+            return session_dir, json.load(f)
+    except (OSError, ValueError):
+        return None, None
+
+
+def _chunk_path(session_dir, file_index, chunk_index):
+    return os.path.join(session_dir, CHUNKS_DIR_NAME, f'{file_index}-{chunk_index}.part')
+
+
+def _missing_chunks(session_dir, manifest):
+    """[{index, name, missing: [chunk numbers]}] for every file of the manifest."""
+    return [{'index': index, 'name': entry['name'],
+             'missing': [n for n in range(entry['chunks'])
+                         if not os.path.exists(_chunk_path(session_dir, index, n))]}
+            for index, entry in enumerate(manifest['files'])]
+
+
+@upload_bp.route('/upload/chunked', methods=['POST'])
+def chunked_init():
+    """Start a chunked upload: {files: [{name, size}], target_slug, incremental}."""
+    payload = request.get_json(silent=True) or {}
+    files = [f for f in payload.get('files') or []
+             if isinstance(f, dict) and allowed_file(str(f.get('name') or ''))]
+    if not files:
+        return jsonify({'error': 'No se encontraron archivos validos (CSV/Excel)'}), 400
+
+    try:
+        sizes = [int(f.get('size')) for f in files]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Tamano de archivo invalido'}), 400
+    if any(size < 0 for size in sizes) \
+            or sum(sizes) > current_app.config['MAX_UNCOMPRESSED_MB'] * 1024 * 1024:
+        return jsonify({'error': 'Los archivos superan el limite permitido'}), 400
+
+    chunk_size = current_app.config['UPLOAD_CHUNK_MB'] * 1024 * 1024
+    manifest = {
+        'chunk_size': chunk_size,
+        'files': [{'name': _safe_name(str(f['name'])), 'size': size,
+                   'chunks': max(1, -(-size // chunk_size))}
+                  for f, size in zip(files, sizes)],
+        'target_slug': str(payload.get('target_slug') or '').strip(),
+        'incremental': bool(payload.get('incremental')),
+    }
+
+    session_id = str(uuid.uuid4())
+    session_dir = os.path.join(get_uploads_dir(), session_id)
+    os.makedirs(os.path.join(session_dir, CHUNKS_DIR_NAME))
+    with open(os.path.join(session_dir, CHUNKED_MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f)
+    # Listed in the session manifests right away, so the janitor expires abandoned uploads
+    from app.upload_sessions import record_session
+    record_session(session_id, [])
+
+    return jsonify({'session_id': session_id, 'chunk_size': chunk_size,
+                    'files': _missing_chunks(session_dir, manifest)})
+
+
+@upload_bp.route('/upload/chunked/<session_id>', methods=['GET'])
+def chunked_status(session_id):
+    """Chunks still missing, so an interrupted upload resumes where it stopped."""
+    session_dir, manifest = _chunked_session(session_id)
+    if manifest is None:
+        return jsonify({'error': 'Sesion de carga no encontrada'}), 404
+    return jsonify({'session_id': session_id, 'chunk_size': manifest['chunk_size'],
+                    'files': _missing_chunks(session_dir, manifest)})
+
+
+@upload_bp.route('/upload/chunked/<session_id>/<int:file_index>/<int:chunk_index>', methods=['PUT'])
+def chunked_put(session_id, file_index, chunk_index):
+    """Store one chunk (raw request body). Sending a chunk again replaces it."""
+    session_dir, manifest = _chunked_session(session_id)
+    if manifest is None:
+        return jsonify({'error': 'Sesion de carga no encontrada'}), 404
+    if file_index >= len(manifest['files']) or chunk_index >= manifest['files'][file_index]['chunks']:
+        return jsonify({'error': 'Fragmento fuera de rango'}), 400
+
+    entry = manifest['files'][file_index]
+    chunk_size = manifest['chunk_size']
+    expected = min(chunk_size, entry['size'] - chunk_index * chunk_size)
+
+    dest_path = _chunk_path(session_dir, file_index, chunk_index)
+    tmp_path = f'{dest_path}.{uuid.uuid4().hex}.tmp'
+    received = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for block in iter(lambda: request.stream.read(COPY_BLOCK_BYTES), b''):
+                received += len(block)
+                if received > expected:
+                    break
+                f.write(block)
+        if received != expected:
+            os.remove(tmp_path)
+            return jsonify({'error': f'Fragmento incompleto: {received} de {expected} bytes'}), 400
+        # Renamed into place once complete: a chunk on disk is always whole
+        os.replace(tmp_path, dest_path)
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return jsonify({'error': f'No se pudo guardar el fragmento: {e}'}), 500
+
+    return jsonify({'file': file_index, 'chunk': chunk_index, 'bytes': received})
 
-    return redirect(url_for('upload.select_campaign', session_id=session_id))
+
+class _JoinedChunks(io.RawIOBase):
+    """Read-only, seekable view of the chunk files of one upload, in order.
+
+    zip archives need seeking, so the chunks are read in place instead of
+    being copied into one temporary file first.
+    """
+
+    def __init__(self, paths, chunk_size, size):
+        self._paths = paths
+        self._chunk_size = chunk_size
+        self._size = size
+        self._pos = 0
+        self._open = (None, None)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self._size:
+            return 0
+        index, offset = divmod(self._pos, self._chunk_size)
+        if self._open[0] != index:
+            self._close_chunk()
+            self._open = (index, open(self._paths[index], 'rb'))
+        chunk = self._open[1]
+        chunk.seek(offset)
+        data = chunk.read(min(len(buffer), self._chunk_size - offset))
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def _close_chunk(self):
+        if self._open[1] is not None:
+            self._open[1].close()
+        self._open = (None, None)
+
+    def close(self):
+        self._close_chunk()
+        super().close()
+
+
+@upload_bp.route('/upload/chunked/<session_id>/finalize', methods=['POST'])
+def chunked_finalize(session_id):
+    """Join the chunks of every file, save them like a plain upload and continue.
+
+    Returns {redirect}: the campaign selection, or in update mode the new run's dashboard.
+    """
+    session_dir, manifest = _chunked_session(session_id)
+    if manifest is None:
+        return jsonify({'error': 'Sesion de carga no encontrada'}), 404
+    missing = [f for f in _missing_chunks(session_dir, manifest) if f['missing']]
+    if missing:
+        return jsonify({'error': 'Faltan fragmentos por subir', 'files': missing}), 409
+
+    files = {}
+    budget = [current_app.config['MAX_UNCOMPRESSED_MB'] * 1024 * 1024]
+    try:
+        for index, entry in enumerate(manifest['files']):
+            paths = [_chunk_path(session_dir, index, n) for n in range(entry['chunks'])]
+            with io.BufferedReader(_JoinedChunks(paths, manifest['chunk_size'], entry['size']),
+                                   COPY_BLOCK_BYTES) as joined:
+                _add_saved_files(files, save_upload(joined, entry['name'], session_dir, budget), session_dir)
+            monitoring.UPLOAD_FILES.inc(extension=_extension(entry['name']))
+    except (ValueError, OSError, EOFError, zipfile.BadZipFile) as e:
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return jsonify({'error': f"No se pudo guardar {entry['name']}: {e}"}), 400
+
+    shutil.rmtree(os.path.join(session_dir, CHUNKS_DIR_NAME), ignore_errors=True)
+    os.remove(os.path.join(session_dir, CHUNKED_MANIFEST_NAME))
+    if not files:
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return jsonify({'error': 'No se encontraron archivos validos (CSV/Excel)'}), 400
+
+    return jsonify({'redirect': _finish_upload(session_id, session_dir, files,
+                                               manifest['target_slug'], manifest['incremental'])})
 
 
 @upload_bp.route('/upload/select/<session_id>', methods=['GET'])
 def select_campaign(session_id):
     """Show detected campaigns after upload so the user can choose one."""
-    uploads_dir = get_uploads_dir()
-    session_dir = os.path.join(uploads_dir, session_id)
+    from app.upload_sessions import load_session
+    session = load_session(session_id)
+    session_dir = os.path.join(get_uploads_dir(), session_id)
 
-    if not os.path.isdir(session_dir):
+    if session is None or not session.files() or not os.path.isdir(session_dir):
         return redirect(url_for('upload.upload_page'))
 
-    file_paths = [os.path.join(session_dir, f) for f in os.listdir(session_dir)]
-    campaigns = scan_campaigns_from_files(file_paths)
+    campaigns = scan_session(session, session_dir)
 
     if not campaigns:
         return redirect(url_for('upload.upload_page'))
@@ -159,16 +462,12 @@ def process_campaign():
     if not session_id or not campaign_name:
         return redirect(url_for('upload.upload_page'))
 
-    uploads_dir = get_uploads_dir()
-    session_dir = os.path.join(uploads_dir, session_id)
-
-    if not os.path.isdir(session_dir):
+    from app.upload_sessions import load_session
+    session = load_session(session_id)
+    if session is None or not os.path.isdir(os.path.join(get_uploads_dir(), session_id)):
         return redirect(url_for('upload.upload_page'))
 
-    saved_paths = [os.path.join(session_dir, f) for f in os.listdir(session_dir)]
-
-    result = _process_session_files(session_dir, saved_paths, campaign_name,
-                                    campaign_filter=campaign_name)
+    result = _process_session_files(session, campaign_name, campaign_filter=campaign_name)
 
     if 'error' in result:
         return jsonify(result), 500
@@ -177,24 +476,65 @@ def process_campaign():
                             session_id=session_id))
 
 
-def _process_session_files(session_dir, saved_paths, campaign_name, campaign_filter=None):
-    """Create DB records and process files from a saved session directory.
+@upload_bp.route('/upload/process_all', methods=['POST'])
+def process_all_campaigns_in_session():
+    """Process every campaign of a saved upload session in a single pass."""
+    session_id = request.form.get('session_id', '').strip()
+    if not session_id:
+        return redirect(url_for('upload.upload_page'))
 
-    Returns dict with 'run_id' on success or 'error' on failure.
-    Removes session_dir on success.
-    """
-    # Build in-memory file storage list
-    file_storages = []
-    for path in saved_paths:
-        filename = os.path.basename(path)
-        with open(path, 'rb') as f:
-            file_bytes = f.read()
-        file_storages.append((io.BytesIO(file_bytes), filename))
+    from app.upload_sessions import load_session, touch_session
+    session = load_session(session_id)
+    session_dir = os.path.join(get_uploads_dir(), session_id)
+
+    if session is None or not os.path.isdir(session_dir):
+        return redirect(url_for('upload.upload_page'))
 
+    touch_session(session)
+    file_hashes = session.file_hashes()
+    file_storages = _load_session_files(session_paths(session, session_dir))
     if not file_storages:
-        return {'error': 'No se encontraron archivos para procesar'}
+        return jsonify({'error': 'No se encontraron archivos para procesar'}), 500
+
+    from app.processing.engine import process_all_campaigns
+    filenames = [filename for _, filename in file_storages]
+    start = time.perf_counter()
+    try:
+        results = process_all_campaigns(file_storages,
+                                        lambda name: _create_run_records(name, filenames),
+                                        profile_memory=current_app.config['PROFILE_MEMORY'],
+                                        cache_dir=get_parse_cache_dir(),
+                                        file_hashes=file_hashes)
+    finally:
+        _close_session_files(file_storages)
+    monitoring.observe_processing('all', time.perf_counter() - start,
+                                  sum(r['total_rows'] for r in results if 'error' not in r))
 
-    # Get or create campaign
+    if not results or all('error' in r for r in results):
+        return jsonify({'error': 'No se pudo procesar ninguna campana'}), 500
+
+    return redirect(url_for('main.campaigns'))
+
+
+def _load_session_files(saved_paths):
+    """Open the files of a session as a (file, filename) list; close with _close_session_files.
+
+    Files are read from disk when processed, so large CSVs can be streamed.
+    """
+    return [(open(path, 'rb'), os.path.basename(path)) for path in saved_paths]
+
+
+def _close_session_files(file_storages):
+    for f, _ in file_storages:
+        f.close()
+
+
+def _create_run_records(campaign_name, filenames):
+    """Get or create the campaign and create its run and uploaded-file records.
+
+    Returns (run_id, campaign_id).
+    """
+    from app.processing.engine import normalizar_nombre_campana
     slug = normalizar_nombre_campana(campaign_name)
     campaign = Campaign.query.filter_by(slug=slug).first()
     if not campaign:
@@ -203,21 +543,60 @@ def _process_session_files(session_dir, saved_paths, campaign_name, campaign_fil
         db.session.flush()
 
     # Create processing run
-    run = ProcessingRun(campaign_id=campaign.id, total_files=len(file_storages))
+    run = ProcessingRun(campaign_id=campaign.id, total_files=len(filenames))
     db.session.add(run)
     db.session.flush()
 
-    for _, filename in file_storages:
+    for filename in filenames:
         uploaded = UploadedFile(run_id=run.id, filename=filename, file_size=0)
         db.session.add(uploaded)
 
     db.session.commit()
+    return run.id, campaign.id
+
 
-    result = process_uploaded_files(file_storages, run.id, campaign.id,
-                                    campaign_filter=campaign_filter)
+def _process_session_files(session, campaign_name, campaign_filter=None, incremental=False):
+    """Create DB records and process the files of an upload session (UploadSession).
+
+    With incremental, the run is a delta run on the campaign's previous
+    completed run (see processing/delta.py), when there is one.
+
+    Returns dict with 'run_id' on success or 'error' on failure.
+    """
+    from app.upload_sessions import touch_session
+    touch_session(session)
+    file_hashes = session.file_hashes()
+    file_storages = _load_session_files(session_paths(session, os.path.join(get_uploads_dir(), session.id)))
+
+    if not file_storages:
+        return {'error': 'No se encontraron archivos para procesar'}
+
+    run_id, campaign_id = _create_run_records(campaign_name,
+                                              [filename for _, filename in file_storages])
+
+    from app.processing.engine import process_uploaded_files
+    base_run_id = None
+    if incremental:
+        from app.processing.delta import find_base_run
+        base_run = find_base_run(campaign_id, current_app.config['DELTA_MAX_CHAIN'])
+        base_run_id = base_run.id if base_run is not None else None
+
+    start = time.perf_counter()
+    try:
+        result = process_uploaded_files(
+            file_storages, run_id, campaign_id, campaign_filter=campaign_filter,
+            stream_min_bytes=current_app.config['STREAMING_MIN_FILE_MB'] * 1024 * 1024,
+            chunksize=current_app.config['STREAMING_CHUNK_ROWS'],
+            profile_memory=current_app.config['PROFILE_MEMORY'],
+            cache_dir=get_parse_cache_dir(), base_run_id=base_run_id,
+            file_hashes=file_hashes)
+    finally:
+        _close_session_files(file_storages)
+    if 'error' not in result:
+        monitoring.observe_processing('campaign', time.perf_counter() - start, result['total_rows'])
 
     # Session files are kept so the user can return and process other campaigns
-    # from the same push. cleanup_old_uploads() removes them after 24 hours.
+    # from the same push; the janitor removes them once the session expires.
     return result
 
 
@@ -231,6 +610,8 @@ def run_results(run_id):
     alerts.sort(key=lambda a: order.get(a.tipo, 3))
     files = run.files.all()
 
+    profile = json.loads(run.profile_json) if run.profile_json else None
+
     criticos = sum(1 for a in alerts if a.tipo == 'CRITICO')
     errores = sum(1 for a in alerts if a.tipo == 'ERROR')
     advertencias = sum(1 for a in alerts if a.tipo == 'ADVERTENCIA')
@@ -240,6 +621,7 @@ def run_results(run_id):
                            campaign=campaign,
                            alerts=alerts,
                            files=files,
+                           profile=profile,
                            criticos=criticos,
                            errores=errores,
                            advertencias=advertencias)
@@ -2,6 +2,8 @@
 if (typeof ChartDataLabels !== 'undefined') Chart.register(ChartDataLabels);
 
 let rawData = [];
+let rawDataPromise = null;
+let rawDataLoaded = false;
 let charts = {};
 
 const colors = {
@@ -31,10 +33,17 @@ const platformColors = {
 };
 
 document.addEventListener('DOMContentLoaded', function() {
-    fetch(DATA_URL)
-        .then(r => r.json())
-        .then(data => {
-            rawData = data;
+    if (typeof RUN_SUMMARY !== 'undefined' && RUN_SUMMARY) {
+        // Unfiltered dashboard drawn from the server-side summary; the raw
+        // rows are fetched on the first filter change (see populateFilters)
+        populateFilters(RUN_SUMMARY.filters);
+        updateAllCharts(summaryView(RUN_SUMMARY));
+        updateTable(RUN_SUMMARY.table);
+        return;
+    }
+
+    loadRawData()
+        .then(() => {
             init();
             document.getElementById('loadingOverlay').style.display = 'none';
         })
@@ -45,8 +54,40 @@ document.addEventListener('DOMContentLoaded', function() {
         });
 });
 
+function loadRawData() {
+    if (!rawDataPromise) {
+        rawDataPromise = fetch(DATA_URL)
+            .then(r => {
+                if (!r.ok) throw new Error('HTTP ' + r.status);
+                return r.json();
+            })
+            .then(data => { rawData = data; rawDataLoaded = true; return data; })
+            .catch(err => { rawDataPromise = null; throw err; });  // retried on the next filter change
+    }
+    return rawDataPromise;
+}
+
+// Filter change: the raw rows are fetched once (overlay shown meanwhile),
+// then every change filters them locally
+function applyFilters() {
+    const overlay = document.getElementById('loadingOverlay');
+    const error = document.getElementById('dataError');
+    if (!rawDataLoaded) overlay.style.display = 'flex';
+    loadRawData()
+        .then(() => {
+            overlay.style.display = 'none';
+            error.style.display = 'none';
+            updateDashboard();
+        })
+        .catch(err => {
+            console.error('Error loading data:', err);
+            overlay.style.display = 'none';
+            error.style.display = 'block';
+        });
+}
+
 function init() {
-    populateFilters();
+    populateFilters(getFilterValues(rawData));
     setupFilterListeners();
     updateDashboard();
 }
@@ -57,13 +98,22 @@ const FILTER_MAP = {
     'filterCiudad': 'CIUDAD'
 };
 
-function populateFilters() {
+function getFilterValues(data) {
+    const values = {};
+    Object.values(FILTER_MAP).forEach(field => {
+        values[field] = [...new Set(data.map(d => d[field]))].filter(Boolean).sort();
+    });
+    return values;
+}
+
+function populateFilters(valuesByField) {
     Object.entries(FILTER_MAP).forEach(([filterId, field]) => {
-        const values = [...new Set(rawData.map(d => d[field]))].filter(Boolean).sort();
+        const values = valuesByField[field] || [];
         const container = document.getElementById(filterId);
         const dropdown = container.querySelector('.multi-select-dropdown');
 
-        values.forEach(v => {
+        // Options may already be rendered server-side
+        if (!dropdown.querySelector('input')) values.forEach(v => {
             const lbl = document.createElement('label');
             lbl.className = 'multi-select-option';
             const cb = document.createElement('input');
@@ -87,7 +137,7 @@ function populateFilters() {
             if (checked.length === 0) toggle.textContent = 'Todas';
             else if (checked.length <= 2) toggle.textContent = checked.join(', ');
             else toggle.textContent = checked.length + ' seleccionados';
-            updateDashboard();
+            applyFilters();
         });
     });
 
@@ -112,10 +162,59 @@ function getFilteredData() {
 function updateDashboard() {
     const data = getFilteredData();
     updateKPIs(data);
-    updateAllCharts(data);
+    updateAllCharts(rowsView(data));
     updateTable(data);
 }
 
+// Chart series of a set of rows, computed in the browser
+function rowsView(data) {
+    const dailyBy = {
+        PLATAFORMA: getDailyDataByPlatform, FORMATO: getDailyDataByFormat, COM: getDailyDataByCom,
+        ETAPA: getDailyDataByEtapa, CIUDAD: getDailyDataByCiudad
+    };
+    return {
+        sum: (key, sumKey) => groupBy(data, key, sumKey),
+        avg: (key, avgKey) => groupByAvg(data, key, avgKey),
+        cpa: key => groupByCPA(data, key),
+        cvr: key => groupByCVR(data, key),
+        compraMap: getCompraByFormato(data),
+        daily: getDailyData(data),
+        dailyBy: key => dailyBy[key](data),
+        hasCiudad: data.some(d => d.CIUDAD && d.CIUDAD !== ''),
+        hasEstablecimiento: data.some(d => d.ESTABLECIMIENTO && d.ESTABLECIMIENTO !== '')
+    };
+}
+
+// The same series from the run summary (processing/summary.py), for the unfiltered dashboard
+function summaryView(summary) {
+    const seriesKeys = { PLATAFORMA: '_platforms', FORMATO: '_formats' };
+    const pick = (key, fn) => {
+        const result = {};
+        Object.entries(summary.groups[key] || {}).forEach(([k, g]) => {
+            const value = fn(g);
+            if (value !== undefined) result[k] = value;
+        });
+        return result;
+    };
+    return {
+        sum: (key, sumKey) => pick(key, g => g[sumKey]),
+        avg: (key, avgKey) => pick(key, g => g[avgKey]),
+        cpa: key => pick(key, g => g.REGISTROS > 0 ? parseFloat((g.GASTO / g.REGISTROS).toFixed(2)) : undefined),
+        cvr: key => pick(key, g => g.CLICS > 0 ? parseFloat((g.REGISTROS / g.CLICS * 100).toFixed(2)) : undefined),
+        compraMap: summary.compra_formato,
+        daily: summary.daily,
+        dailyBy: key => {
+            const entry = summary.daily_groups[key];
+            const result = Object.assign({}, entry.series);
+            result._labels = entry.labels;
+            result[seriesKeys[key] || '_coms'] = entry.values;
+            return result;
+        },
+        hasCiudad: summary.has_ciudad,
+        hasEstablecimiento: summary.has_establecimiento
+    };
+}
+
 function dedupReachList(reaches, factor) {
     if (reaches.length === 0) return 0;
     if (reaches.length === 1) return reaches[0];
@@ -127,7 +226,7 @@ function calcAlcanceDedup(data, overlapPct) {
     const factor = (100 - overlapPct) / 100;
     const reachData = data.filter(d => ['META', 'TIKTOK'].includes(d.PLATAFORMA) && (d.ALCANCE || 0) > 0);
     if (reachData.length === 0) return { alcance: 0, frecuencia: 0 };
-    const days = [...new Set(reachData.map(d => d.DIA))].sort();
+    const days = [...new Set(reachData.map(d => d.DIA))].sort(compareDia);
     const dailyReaches = [];
     for (const day of days) {
         const dayData = reachData.filter(d => d.DIA === day);
@@ -164,120 +263,119 @@ function updateKPIs(data) {
     document.getElementById('kpiRegistros').textContent = formatNum(registros);
 }
 
+function compareDia(a, b) {
+    const [da, ma, ya] = a.split('/').map(Number);
+    const [db, mb, yb] = b.split('/').map(Number);
+    return (ya * 10000 + ma * 100 + da) - (yb * 10000 + mb * 100 + db);
+}
+
 function formatNum(n) { return n.toString().replace(/\B(?=(\d{3})+(?!\d))/g, ","); }
 
-function updateAllCharts(data) {
-    const compraMap = getCompraByFormato(data);
-    createBarChart('chartGastoPlataforma', groupBy(data, 'PLATAFORMA', 'GASTO'), 'Gasto');
-    createDoughnutChart('chartGastoAudiencia', groupBy(data, 'AUDIENCIA', 'GASTO'));
-    createDoughnutChart('chartGastoCompra', groupBy(data, 'COMPRA', 'GASTO'));
-    createBarChart('chartImpPlataforma', groupBy(data, 'PLATAFORMA', 'IMPRESIONES'), 'Impresiones');
-    createBarChart('chartImpFormato', groupBy(data, 'FORMATO', 'IMPRESIONES'), 'Impresiones', compraMap);
-    createDoughnutChart('chartImpAudiencia', groupBy(data, 'AUDIENCIA', 'IMPRESIONES'));
-    createBarChart('chartClicsPlataforma', groupBy(data, 'PLATAFORMA', 'CLICS'), 'Clics');
-    createBarChart('chartClicsFormato', groupBy(data, 'FORMATO', 'CLICS'), 'Clics', compraMap);
-    createDoughnutChart('chartClicsAudiencia', groupBy(data, 'AUDIENCIA', 'CLICS'));
-    createBarChart('chartViewsPlataforma', groupBy(data, 'PLATAFORMA', 'VIEWS'), 'Views');
-    createBarChart('chartViewsFormato', groupBy(data, 'FORMATO', 'VIEWS'), 'Views', compraMap);
-    createDoughnutChart('chartViewsAudiencia', groupBy(data, 'AUDIENCIA', 'VIEWS'));
-    createBarChart('chartRegPlataforma', groupBy(data, 'PLATAFORMA', 'REGISTROS'), 'Registros');
-    createDoughnutChart('chartRegCompra', groupBy(data, 'COMPRA', 'REGISTROS'));
-    createDoughnutChart('chartRegAudiencia', groupBy(data, 'AUDIENCIA', 'REGISTROS'));
-    createBarChart('chartCPAPlataforma', groupByCPA(data, 'PLATAFORMA'), 'CPA ($)');
-    createBarChart('chartCPAAudiencia', groupByCPA(data, 'AUDIENCIA'), 'CPA ($)');
-    createBarChart('chartCVRPlataforma', groupByCVR(data, 'PLATAFORMA'), 'CVR (%)');
-    createBarChart('chartCVRAudiencia', groupByCVR(data, 'AUDIENCIA'), 'CVR (%)');
-    createBarChart('chartAlcancePlataforma', groupBy(data, 'PLATAFORMA', 'ALCANCE'), 'Alcance');
-    createDoughnutChart('chartAlcanceAudiencia', groupBy(data, 'AUDIENCIA', 'ALCANCE'));
-    createBarChart('chartFrecuenciaPlataforma', groupByAvg(data, 'PLATAFORMA', 'FRECUENCIA'), 'Frecuencia');
-    createBarChart('chartEfPlatImp',   groupBy(data, 'PLATAFORMA', 'IMPRESIONES'), 'Impresiones');
-    createBarChart('chartEfPlatClics', groupBy(data, 'PLATAFORMA', 'CLICS'), 'Clics');
-    createBarChart('chartEfPlatViews', groupBy(data, 'PLATAFORMA', 'VIEWS'), 'Views');
-    createBarChart('chartEfPlatCTR',   groupByAvg(data, 'PLATAFORMA', 'CTR'), 'CTR %');
-    createBarChart('chartEfPlatVTR',   groupByAvg(data, 'PLATAFORMA', 'VTR'), 'VTR %');
-
-    createBarChart('chartEfEtapaImp',   groupBy(data, 'ETAPA', 'IMPRESIONES'), 'Impresiones');
-    createBarChart('chartEfEtapaClics', groupBy(data, 'ETAPA', 'CLICS'), 'Clics');
-    createBarChart('chartEfEtapaViews', groupBy(data, 'ETAPA', 'VIEWS'), 'Views');
-    createBarChart('chartEfEtapaCTR',   groupByAvg(data, 'ETAPA', 'CTR'), 'CTR %');
-    createBarChart('chartEfEtapaVTR',   groupByAvg(data, 'ETAPA', 'VTR'), 'VTR %');
-
-    createBarChart('chartEfCompraImp',   groupBy(data, 'COMPRA', 'IMPRESIONES'), 'Impresiones');
-    createBarChart('chartEfCompraClics', groupBy(data, 'COMPRA', 'CLICS'), 'Clics');
-    createBarChart('chartEfCompraViews', groupBy(data, 'COMPRA', 'VIEWS'), 'Views');
-    createBarChart('chartEfCompraCTR',   groupByAvg(data, 'COMPRA', 'CTR'), 'CTR %');
-    createBarChart('chartEfCompraVTR',   groupByAvg(data, 'COMPRA', 'VTR'), 'VTR %');
-
-    createBarChart('chartEfFmtImp',   groupBy(data, 'FORMATO', 'IMPRESIONES'), 'Impresiones', compraMap);
-    createBarChart('chartEfFmtClics', groupBy(data, 'FORMATO', 'CLICS'), 'Clics', compraMap);
-    createBarChart('chartEfFmtViews', groupBy(data, 'FORMATO', 'VIEWS'), 'Views', compraMap);
-    createBarChart('chartEfFmtCTR',   groupByAvg(data, 'FORMATO', 'CTR'), 'CTR %', compraMap);
-    createBarChart('chartEfFmtVTR',   groupByAvg(data, 'FORMATO', 'VTR'), 'VTR %', compraMap);
-
-    createBarChart('chartEfAudImp',   groupBy(data, 'AUDIENCIA', 'IMPRESIONES'), 'Impresiones');
-    createBarChart('chartEfAudClics', groupBy(data, 'AUDIENCIA', 'CLICS'), 'Clics');
-    createBarChart('chartEfAudViews', groupBy(data, 'AUDIENCIA', 'VIEWS'), 'Views');
-    createBarChart('chartEfAudCTR',   groupByAvg(data, 'AUDIENCIA', 'CTR'), 'CTR %');
-    createBarChart('chartEfAudVTR',   groupByAvg(data, 'AUDIENCIA', 'VTR'), 'VTR %');
-
-    createBarChart('chartEfComImp',   groupBy(data, 'COM', 'IMPRESIONES'), 'Impresiones');
-    createBarChart('chartEfComClics', groupBy(data, 'COM', 'CLICS'), 'Clics');
-    createBarChart('chartEfComViews', groupBy(data, 'COM', 'VIEWS'), 'Views');
-    createBarChart('chartEfComCTR',   groupByAvg(data, 'COM', 'CTR'), 'CTR %');
-    createBarChart('chartEfComVTR',   groupByAvg(data, 'COM', 'VTR'), 'VTR %');
-
-    createBarChart('chartEfRegPlat', groupBy(data, 'PLATAFORMA', 'REGISTROS'), 'Registros');
-    createBarChart('chartEfRegFmt',  groupBy(data, 'FORMATO', 'REGISTROS'), 'Registros');
-    createBarChart('chartEfRegAud',  groupBy(data, 'AUDIENCIA', 'REGISTROS'), 'Registros');
-
-    const hasCiudad = data.some(d => d.CIUDAD && d.CIUDAD !== '');
+function updateAllCharts(view) {
+    const compraMap = view.compraMap;
+    createBarChart('chartGastoPlataforma', view.sum('PLATAFORMA', 'GASTO'), 'Gasto');
+    createDoughnutChart('chartGastoAudiencia', view.sum('AUDIENCIA', 'GASTO'));
+    createDoughnutChart('chartGastoCompra', view.sum('COMPRA', 'GASTO'));
+    createBarChart('chartImpPlataforma', view.sum('PLATAFORMA', 'IMPRESIONES'), 'Impresiones');
+    createBarChart('chartImpFormato', view.sum('FORMATO', 'IMPRESIONES'), 'Impresiones', compraMap);
+    createDoughnutChart('chartImpAudiencia', view.sum('AUDIENCIA', 'IMPRESIONES'));
+    createBarChart('chartClicsPlataforma', view.sum('PLATAFORMA', 'CLICS'), 'Clics');
+    createBarChart('chartClicsFormato', view.sum('FORMATO', 'CLICS'), 'Clics', compraMap);
+    createDoughnutChart('chartClicsAudiencia', view.sum('AUDIENCIA', 'CLICS'));
+    createBarChart('chartViewsPlataforma', view.sum('PLATAFORMA', 'VIEWS'), 'Views');
+    createBarChart('chartViewsFormato', view.sum('FORMATO', 'VIEWS'), 'Views', compraMap);
+    createDoughnutChart('chartViewsAudiencia', view.sum('AUDIENCIA', 'VIEWS'));
+    createBarChart('chartRegPlataforma', view.sum('PLATAFORMA', 'REGISTROS'), 'Registros');
+    createDoughnutChart('chartRegCompra', view.sum('COMPRA', 'REGISTROS'));
+    createDoughnutChart('chartRegAudiencia', view.sum('AUDIENCIA', 'REGISTROS'));
+    createBarChart('chartCPAPlataforma', view.cpa('PLATAFORMA'), 'CPA ($)');
+    createBarChart('chartCPAAudiencia', view.cpa('AUDIENCIA'), 'CPA ($)');
+    createBarChart('chartCVRPlataforma', view.cvr('PLATAFORMA'), 'CVR (%)');
+    createBarChart('chartCVRAudiencia', view.cvr('AUDIENCIA'), 'CVR (%)');
+    createBarChart('chartAlcancePlataforma', view.sum('PLATAFORMA', 'ALCANCE'), 'Alcance');
+    createDoughnutChart('chartAlcanceAudiencia', view.sum('AUDIENCIA', 'ALCANCE'));
+    createBarChart('chartFrecuenciaPlataforma', view.avg('PLATAFORMA', 'FRECUENCIA'), 'Frecuencia');
+    createBarChart('chartEfPlatImp',   view.sum('PLATAFORMA', 'IMPRESIONES'), 'Impresiones');
+    createBarChart('chartEfPlatClics', view.sum('PLATAFORMA', 'CLICS'), 'Clics');
+    createBarChart('chartEfPlatViews', view.sum('PLATAFORMA', 'VIEWS'), 'Views');
+    createBarChart('chartEfPlatCTR',   view.avg('PLATAFORMA', 'CTR'), 'CTR %');
+    createBarChart('chartEfPlatVTR',   view.avg('PLATAFORMA', 'VTR'), 'VTR %');
+
+    createBarChart('chartEfEtapaImp',   view.sum('ETAPA', 'IMPRESIONES'), 'Impresiones');
+    createBarChart('chartEfEtapaClics', view.sum('ETAPA', 'CLICS'), 'Clics');
+    createBarChart('chartEfEtapaViews', view.sum('ETAPA', 'VIEWS'), 'Views');
+    createBarChart('chartEfEtapaCTR',   view.avg('ETAPA', 'CTR'), 'CTR %');
+    createBarChart('chartEfEtapaVTR',   view.avg('ETAPA', 'VTR'), 'VTR %');
+
+    createBarChart('chartEfCompraImp',   view.sum('COMPRA', 'IMPRESIONES'), 'Impresiones');
+    createBarChart('chartEfCompraClics', view.sum('COMPRA', 'CLICS'), 'Clics');
+    createBarChart('chartEfCompraViews', view.sum('COMPRA', 'VIEWS'), 'Views');
+    createBarChart('chartEfCompraCTR',   view.avg('COMPRA', 'CTR'), 'CTR %');
+    createBarChart('chartEfCompraVTR',   view.avg('COMPRA', 'VTR'), 'VTR %');
+
+    createBarChart('chartEfFmtImp',   view.sum('FORMATO', 'IMPRESIONES'), 'Impresiones', compraMap);
+    createBarChart('chartEfFmtClics', view.sum('FORMATO', 'CLICS'), 'Clics', compraMap);
+    createBarChart('chartEfFmtViews', view.sum('FORMATO', 'VIEWS'), 'Views', compraMap);
+    createBarChart('chartEfFmtCTR',   view.avg('FORMATO', 'CTR'), 'CTR %', compraMap);
+    createBarChart('chartEfFmtVTR',   view.avg('FORMATO', 'VTR'), 'VTR %', compraMap);
+
+    createBarChart('chartEfAudImp',   view.sum('AUDIENCIA', 'IMPRESIONES'), 'Impresiones');
+    createBarChart('chartEfAudClics', view.sum('AUDIENCIA', 'CLICS'), 'Clics');
+    createBarChart('chartEfAudViews', view.sum('AUDIENCIA', 'VIEWS'), 'Views');
+    createBarChart('chartEfAudCTR',   view.avg('AUDIENCIA', 'CTR'), 'CTR %');
+    createBarChart('chartEfAudVTR',   view.avg('AUDIENCIA', 'VTR'), 'VTR %');
+
+    createBarChart('chartEfComImp',   view.sum('COM', 'IMPRESIONES'), 'Impresiones');
+    createBarChart('chartEfComClics', view.sum('COM', 'CLICS'), 'Clics');
+    createBarChart('chartEfComViews', view.sum('COM', 'VIEWS'), 'Views');
+    createBarChart('chartEfComCTR',   view.avg('COM', 'CTR'), 'CTR %');
+    createBarChart('chartEfComVTR',   view.avg('COM', 'VTR'), 'VTR %');
+
+    createBarChart('chartEfRegPlat', view.sum('PLATAFORMA', 'REGISTROS'), 'Registros');
+    createBarChart('chartEfRegFmt',  view.sum('FORMATO', 'REGISTROS'), 'Registros');
+    createBarChart('chartEfRegAud',  view.sum('AUDIENCIA', 'REGISTROS'), 'Registros');
+
+    const hasCiudad = view.hasCiudad;
     document.querySelectorAll('.ciudad-pg-wrap, .ciudad-evo-wrap').forEach(el => el.style.display = hasCiudad ? '' : 'none');
     const secCiudad = document.getElementById('sectionCiudad');
     if (secCiudad) secCiudad.style.display = hasCiudad ? '' : 'none';
     if (hasCiudad) {
-        const dailyByCiudad = getDailyDataByCiudad(data);
+        const dailyByCiudad = view.dailyBy('CIUDAD');
         createComLineChart('chartEvoGastoCiudad',  dailyByCiudad, 'gasto',  'Inversion ($)', true);
         createComLineChart('chartEvoImpCiudad',    dailyByCiudad, 'imp',    'Impresiones', false);
         createComLineChart('chartEvoClicsCiudad',  dailyByCiudad, 'clics',  'Clics', false);
         createComLineChart('chartEvoViewsCiudad',  dailyByCiudad, 'views',  'Video Views', false);
         createComLineChart('chartEvoRegCiudad',    dailyByCiudad, 'reg',    'Registros', false);
-        createDoughnutChart('chartPGGastoCiudad',   groupBy(data, 'CIUDAD', 'GASTO'));
-        createDoughnutChart('chartPGImpCiudad',     groupBy(data, 'CIUDAD', 'IMPRESIONES'));
-        createDoughnutChart('chartPGClicsCiudad',   groupBy(data, 'CIUDAD', 'CLICS'));
-        createDoughnutChart('chartPGViewsCiudad',   groupBy(data, 'CIUDAD', 'VIEWS'));
-        createDoughnutChart('chartPGRegCiudad',     groupBy(data, 'CIUDAD', 'REGISTROS'));
-        createDoughnutChart('chartPGAlcanceCiudad', groupBy(data, 'CIUDAD', 'ALCANCE'));
-        createHorizontalBarChart('chartGastoCiudad',    groupBy(data, 'CIUDAD', 'GASTO'), 'Gasto');
-        createHorizontalBarChart('chartEfCiudadImp',    groupBy(data, 'CIUDAD', 'IMPRESIONES'), 'Impresiones');
-        createHorizontalBarChart('chartEfCiudadClics',  groupBy(data, 'CIUDAD', 'CLICS'), 'Clics');
-        createHorizontalBarChart('chartEfCiudadViews',  groupBy(data, 'CIUDAD', 'VIEWS'), 'Views');
-        createHorizontalBarChart('chartEfCiudadCTR',    groupByAvg(data, 'CIUDAD', 'CTR'), 'CTR %');
-        createHorizontalBarChart('chartEfCiudadVTR',    groupByAvg(data, 'CIUDAD', 'VTR'), 'VTR %');
-        createHorizontalBarChart('chartEfCiudadReg',    groupBy(data, 'CIUDAD', 'REGISTROS'), 'Registros');
-        createHorizontalBarChart('chartEfCiudadCPA',    groupByCPA(data, 'CIUDAD'), 'CPA ($)');
+        createDoughnutChart('chartPGGastoCiudad',   view.sum('CIUDAD', 'GASTO'));
+        createDoughnutChart('chartPGImpCiudad',     view.sum('CIUDAD', 'IMPRESIONES'));
+        createDoughnutChart('chartPGClicsCiudad',   view.sum('CIUDAD', 'CLICS'));
+        createDoughnutChart('chartPGViewsCiudad',   view.sum('CIUDAD', 'VIEWS'));
+        createDoughnutChart('chartPGRegCiudad',     view.sum('CIUDAD', 'REGISTROS'));
+        createDoughnutChart('chartPGAlcanceCiudad', view.sum('CIUDAD', 'ALCANCE'));
+        createHorizontalBarChart('chartGastoCiudad',    view.sum('CIUDAD', 'GASTO'), 'Gasto');
+        createHorizontalBarChart('chartEfCiudadImp',    view.sum('CIUDAD', 'IMPRESIONES'), 'Impresiones');
+        createHorizontalBarChart('chartEfCiudadClics',  view.sum('CIUDAD', 'CLICS'), 'Clics');
+        createHorizontalBarChart('chartEfCiudadViews',  view.sum('CIUDAD', 'VIEWS'), 'Views');
+        createHorizontalBarChart('chartEfCiudadCTR',    view.avg('CIUDAD', 'CTR'), 'CTR %');
+        createHorizontalBarChart('chartEfCiudadVTR',    view.avg('CIUDAD', 'VTR'), 'VTR %');
+        createHorizontalBarChart('chartEfCiudadReg',    view.sum('CIUDAD', 'REGISTROS'), 'Registros');
+        createHorizontalBarChart('chartEfCiudadCPA',    view.cpa('CIUDAD'), 'CPA ($)');
     }
 
-    const hasEstablecimiento = data.some(d => d.ESTABLECIMIENTO && d.ESTABLECIMIENTO !== '');
+    const hasEstablecimiento = view.hasEstablecimiento;
     const secEst = document.getElementById('sectionEstablecimiento');
     if (secEst) secEst.style.display = hasEstablecimiento ? '' : 'none';
     if (hasEstablecimiento) {
-        createHorizontalBarChart('chartEfEstImp',   groupBy(data, 'ESTABLECIMIENTO', 'IMPRESIONES'), 'Impresiones');
-        createHorizontalBarChart('chartEfEstClics', groupBy(data, 'ESTABLECIMIENTO', 'CLICS'), 'Clics');
-        createHorizontalBarChart('chartEfEstViews', groupBy(data, 'ESTABLECIMIENTO', 'VIEWS'), 'Views');
-        createHorizontalBarChart('chartEfEstCTR',   groupByAvg(data, 'ESTABLECIMIENTO', 'CTR'), 'CTR %');
-        createHorizontalBarChart('chartEfEstVTR',   groupByAvg(data, 'ESTABLECIMIENTO', 'VTR'), 'VTR %');
+        createHorizontalBarChart('chartEfEstImp',   view.sum('ESTABLECIMIENTO', 'IMPRESIONES'), 'Impresiones');
+        createHorizontalBarChart('chartEfEstClics', view.sum('ESTABLECIMIENTO', 'CLICS'), 'Clics');
+        createHorizontalBarChart('chartEfEstViews', view.sum('ESTABLECIMIENTO', 'VIEWS'), 'Views');
+        createHorizontalBarChart('chartEfEstCTR',   view.avg('ESTABLECIMIENTO', 'CTR'), 'CTR %');
+        createHorizontalBarChart('chartEfEstVTR',   view.avg('ESTABLECIMIENTO', 'VTR'), 'VTR %');
     }
 
-    const daily = getDailyData(data);
-    createSingleLineChart('chartEvoGasto', daily, 'gasto', 'Inversion ($)', true);
-    createSingleLineChart('chartEvoReg', daily, 'reg', 'Registros');
-    createSingleLineChart('chartEvoCPA', daily, 'cpa', 'CPA ($)', true);
-    createSingleLineChart('chartEvoCVR', daily, 'cvr', 'CVR (%)');
-    createDualLineChart('chartEvoImpresiones', daily, 'imp', 'Impresiones', 'frec', 'Frecuencia', '');
-    createDualLineChart('chartEvoClics', daily, 'clics', 'Clics', 'ctr', 'CTR', '%');
-    createDualLineChart('chartEvoViews', daily, 'views', 'Video Views', 'vtr', 'VTR', '%');
+    updateDailyCharts(view.daily);
 
-    const dailyByPlat = getDailyDataByPlatform(data);
+    const dailyByPlat = view.dailyBy('PLATAFORMA');
     createPlatformLineChart('chartEvoGastoPlat', dailyByPlat, 'gasto', 'Inversion ($)', true);
     createPlatformLineChart('chartEvoRegPlat', dailyByPlat, 'reg', 'Registros', false);
     createPlatformLineChart('chartEvoCPAPlat', dailyByPlat, 'cpa', 'CPA ($)', true);
@@ -286,20 +384,20 @@ function updateAllCharts(data) {
     createPlatformLineChart('chartEvoClicsPlat', dailyByPlat, 'clics', 'Clics', false);
     createPlatformLineChart('chartEvoViewsPlat', dailyByPlat, 'views', 'Video Views', false);
 
-    const dailyByFmt = getDailyDataByFormat(data);
+    const dailyByFmt = view.dailyBy('FORMATO');
     createFormatLineChart('chartEvoGastoFmt', dailyByFmt, 'gasto', 'Inversion ($)', true);
     createFormatLineChart('chartEvoImpFmt', dailyByFmt, 'imp', 'Impresiones', false);
     createFormatLineChart('chartEvoClicsFmt', dailyByFmt, 'clics', 'Clics', false);
     createFormatLineChart('chartEvoViewsFmt', dailyByFmt, 'views', 'Video Views', false);
 
-    const dailyByCom = getDailyDataByCom(data);
+    const dailyByCom = view.dailyBy('COM');
     createComLineChart('chartEvoGastoCom', dailyByCom, 'gasto', 'Inversion ($)', true);
     createComLineChart('chartEvoImpCom', dailyByCom, 'imp', 'Impresiones', false);
     createComLineChart('chartEvoClicsCom', dailyByCom, 'clics', 'Clics', false);
     createComLineChart('chartEvoViewsCom', dailyByCom, 'views', 'Video Views', false);
     createComLineChart('chartEvoRegCom', dailyByCom, 'reg', 'Registros', false);
 
-    const dailyByEtapa = getDailyDataByEtapa(data);
+    const dailyByEtapa = view.dailyBy('ETAPA');
     createComLineChart('chartEvoGastoEtapa', dailyByEtapa, 'gasto', 'Inversion ($)', true);
     createComLineChart('chartEvoImpEtapa', dailyByEtapa, 'imp', 'Impresiones', false);
     createComLineChart('chartEvoClicsEtapa', dailyByEtapa, 'clics', 'Clics', false);
@@ -307,6 +405,16 @@ function updateAllCharts(data) {
     createComLineChart('chartEvoRegEtapa', dailyByEtapa, 'reg', 'Registros', false);
 }
 
+function updateDailyCharts(daily) {
+    createSingleLineChart('chartEvoGasto', daily, 'gasto', 'Inversion ($)', true);
+    createSingleLineChart('chartEvoReg', daily, 'reg', 'Registros');
+    createSingleLineChart('chartEvoCPA', daily, 'cpa', 'CPA ($)', true);
+    createSingleLineChart('chartEvoCVR', daily, 'cvr', 'CVR (%)');
+    createDualLineChart('chartEvoImpresiones', daily, 'imp', 'Impresiones', 'frec', 'Frecuencia', '');
+    createDualLineChart('chartEvoClics', daily, 'clics', 'Clics', 'ctr', 'CTR', '%');
+    createDualLineChart('chartEvoViews', daily, 'views', 'Video Views', 'vtr', 'VTR', '%');
+}
+
 function createBarChart(canvasId, grouped, label, subtitles) {
     const ctx = document.getElementById(canvasId).getContext('2d');
     if (charts[canvasId]) charts[canvasId].destroy();
@@ -22,8 +22,9 @@ document.addEventListener('DOMContentLoaded', function() {
         dropZone.classList.remove('dragover');
         const dt = new DataTransfer();
         for (const file of e.dataTransfer.files) {
-            const ext = file.name.split('.').pop().toLowerCase();
-            if (['csv', 'xlsx', 'xls'].includes(ext)) {
+            const name = file.name.toLowerCase();
+            const ext = name.split('.').pop();
+            if (['csv', 'xlsx', 'xls', 'zip'].includes(ext) || name.endsWith('.csv.gz')) {
                 dt.items.add(file);
             }
         }
@@ -61,7 +62,112 @@ document.addEventListener('DOMContentLoaded', function() {
         uploadActions.style.display = 'block';
     }
 
-    uploadForm.addEventListener('submit', function() {
+    // Chunked upload: files go in numbered pieces, several at a time, and a
+    // failed upload resumes with only the missing pieces when resubmitted.
+    // Browsers without fetch/Blob.slice fall back to the plain form post.
+    const uploadProgress = document.getElementById('uploadProgress');
+    const PARALLEL_CHUNKS = 3;
+    const MAX_RETRIES = 5;
+    const CHUNKED_URL = uploadForm.action.replace(/\/$/, '') + '/chunked';
+    let pendingUpload = null;
+
+    function filesKey(files) {
+        return Array.from(files).map(f => f.name + ':' + f.size + ':' + f.lastModified).join('|');
+    }
+
+    function requestJson(url, options) {
+        return fetch(url, options).then(r => r.json().catch(() => ({})).then(body => {
+            if (!r.ok) {
+                const error = new Error(body.error || ('HTTP ' + r.status));
+                error.status = r.status;
+                throw error;
+            }
+            return body;
+        }));
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function putChunk(sessionId, task) {
+        for (let attempt = 0; ; attempt++) {
+            try {
+                await requestJson(CHUNKED_URL + '/' + sessionId + '/' + task.index + '/' + task.chunk,
+                                  {method: 'PUT', body: task.body});
+                return;
+            } catch (err) {
+                // Client errors will not go away by retrying
+                if (attempt + 1 >= MAX_RETRIES || (err.status >= 400 && err.status < 500)) throw err;
+                await sleep(500 * Math.pow(2, attempt));
+            }
+        }
+    }
+
+    async function chunkedUpload(files) {
+        const key = filesKey(files);
+        let state = null;
+        if (pendingUpload && pendingUpload.key === key) {
+            state = await requestJson(CHUNKED_URL + '/' + pendingUpload.sessionId).catch(() => null);
+        }
+        if (!state) {
+            const form = new FormData(uploadForm);
+            state = await requestJson(CHUNKED_URL, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({
+                    files: Array.from(files).map(f => ({name: f.name, size: f.size})),
+                    target_slug: form.get('target_slug') || '',
+                    incremental: form.get('incremental') === '1'
+                })
+            });
+        }
+        pendingUpload = {key: key, sessionId: state.session_id};
+
+        // Only the files the server accepted are in state.files, in the same order
+        const accepted = Array.from(files).filter(f => state.files.some(s => s.name === f.name));
+        const tasks = [];
+        state.files.forEach((entry, i) => {
+            entry.missing.forEach(chunk => tasks.push({
+                index: entry.index,
+                chunk: chunk,
+                body: accepted[i].slice(chunk * state.chunk_size, (chunk + 1) * state.chunk_size)
+            }));
+        });
+        const total = accepted.reduce((sum, f) => sum + f.size, 0);
+        let sent = total - tasks.reduce((sum, t) => sum + t.body.size, 0);
+        const showProgress = () => {
+            uploadProgress.textContent = 'Subiendo ' + (total ? Math.floor(100 * sent / total) : 100) + '%';
+        };
+        showProgress();
+
+        async function worker() {
+            while (tasks.length) {
+                const task = tasks.shift();
+                await putChunk(state.session_id, task);
+                sent += task.body.size;
+                showProgress();
+            }
+        }
+        await Promise.all(Array.from({length: PARALLEL_CHUNKS}, worker));
+
+        uploadProgress.textContent = 'Procesando archivos...';
+        const result = await requestJson(CHUNKED_URL + '/' + state.session_id + '/finalize', {method: 'POST'});
+        pendingUpload = null;
+        window.location = result.redirect;
+    }
+
+    uploadForm.addEventListener('submit', function(e) {
         spinner.style.display = 'flex';
+        if (!window.fetch || !window.Blob || !Blob.prototype.slice || !fileInput.files.length) {
+            return;
+        }
+        e.preventDefault();
+        chunkedUpload(fileInput.files).catch(err => {
+            spinner.style.display = 'none';
+            uploadProgress.textContent = '';
+            alert('Error al subir los archivos: ' + err.message +
+                  '. Presione el boton nuevamente para reanudar la carga.');
+        });
     });
 });
@@ -0,0 +1,156 @@
+"""Upload session manifests and the janitor that expires them.
+
+Every upload session directory (instance/uploads/<id>) has an UploadSession
+row listing its files with their sizes and SHA-256, and caching the
+campaign scan. Requests take everything from the row, so they never list
+or stat the uploads directory; last_used_at is refreshed whenever a
+session is processed.
+
+The janitor removes sessions unused for UPLOAD_SESSION_MAX_AGE_HOURS (row
+and directory), directories left without a row (sessions from before the
+manifest, or a crashed upload) and stale processed-file cache entries. It
+runs every UPLOAD_JANITOR_INTERVAL_MINUTES in a background thread of each
+serving worker, started by the worker's first request (so CLI commands and
+scripts that only create the app never start it), and on demand:
+
+    flask --app run upload-janitor [--max-age-hours 24]
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+_janitor_started = threading.Event()
+
+
+def load_session(session_id):
+    """UploadSession for session_id, or None (unknown, expired or not a session id)."""
+    from app import db
+    from app.models import UploadSession
+
+    try:
+        uuid.UUID(session_id)
+    except ValueError:
+        return None
+    return db.session.get(UploadSession, session_id)
+
+
+def record_session(session_id, files):
+    """Create or replace the manifest of a session. files: [{name, size, sha256}]."""
+    from app import db
+    from app.models import UploadSession
+
+    session = db.session.get(UploadSession, session_id) or UploadSession(id=session_id)
+    session.files_json = json.dumps(files)
+    session.campaigns_json = ''
+    session.last_used_at = datetime.utcnow()
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def touch_session(session):
+    """Mark a session as used now, postponing its expiry."""
+    from app import db
+
+    session.last_used_at = datetime.utcnow()
+    db.session.commit()
+
+
+def expire_sessions(uploads_dir, max_age_hours):
+    """Remove sessions unused for max_age_hours and orphan directories.
+
+    Returns {'sessions', 'orphans'} with the counts removed.
+    """
+    from app import db
+    from app.models import UploadSession
+
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    expired = [session_id for (session_id,) in db.session.query(UploadSession.id)
+               .filter(UploadSession.last_used_at < cutoff)]
+    for session_id in expired:
+        shutil.rmtree(os.path.join(uploads_dir, session_id), ignore_errors=True)
+    if expired:
+        UploadSession.query.filter(UploadSession.id.in_(expired)).delete(synchronize_session=False)
+        db.session.commit()
+
+    # Directories without a manifest row, once they are old enough not to be an
+    # upload still being saved
+    orphans = 0
+    orphan_cutoff = time.time() - max_age_hours * 3600
+    if os.path.isdir(uploads_dir):
+        known = {session_id for (session_id,) in db.session.query(UploadSession.id)}
+        for name in os.listdir(uploads_dir):
+            path = os.path.join(uploads_dir, name)
+            try:
+                if name not in known and os.path.isdir(path) and os.path.getmtime(path) < orphan_cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    orphans += 1
+            except OSError:
+                continue
+    return {'sessions': len(expired), 'orphans': orphans}
+
+
+def run_janitor(max_age_hours=None):
+    """One janitor pass (see module docstring). Needs an app context."""
+    from app.routes.upload import get_uploads_dir, prune_parse_cache
+
+    config = current_app.config
+    max_age_hours = max_age_hours if max_age_hours is not None else config['UPLOAD_SESSION_MAX_AGE_HOURS']
+    result = expire_sessions(get_uploads_dir(), max_age_hours)
+    result['cache_entries'] = prune_parse_cache()
+    return result
+
+
+def _janitor_loop(app, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                result = run_janitor()
+            if any(result.values()):
+                logger.info("Upload janitor: %s", result)
+        except Exception as e:
+            logger.warning("Upload janitor failed: %s", e)
+
+
+def start_janitor(app):
+    """Start the background janitor thread of this process (once; not when disabled)."""
+    interval = app.config['UPLOAD_JANITOR_INTERVAL_MINUTES'] * 60
+    if interval <= 0 or _janitor_started.is_set():
+        return
+    _janitor_started.set()
+    threading.Thread(target=_janitor_loop, args=(app, interval), name='upload-janitor', daemon=True).start()
+
+
+def init_app(app):
+    """Start the janitor with the first request this process serves."""
+    if app.config['UPLOAD_JANITOR_INTERVAL_MINUTES'] <= 0:
+        return
+
+    @app.before_request
+    def _start_janitor():
+        if not _janitor_started.is_set():
+            start_janitor(app)
+
+
+@click.command('upload-janitor')
+@click.option('--max-age-hours', type=int, default=None,
+              help='Sessions unused for this many hours are removed (UPLOAD_SESSION_MAX_AGE_HOURS).')
+@with_appcontext
+def upload_janitor_command(max_age_hours):
+    """Remove expired upload sessions and stale processed-file cache entries."""
+    result = run_janitor(max_age_hours)
+    click.echo(f"{result['sessions']} sesiones expiradas, {result['orphans']} directorios huerfanos y "
+               f"{result['cache_entries']} entradas de cache eliminadas")
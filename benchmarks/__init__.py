@@ -0,0 +1,12 @@
+import time
+
+
+def best_time(fn, repeat=1):
+    """Best wall time of repeat calls to fn. Returns (seconds, result of the last call)."""
+    best = result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
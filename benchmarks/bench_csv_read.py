@@ -0,0 +1,72 @@
+"""CSV read time and memory on wide exports, full read against column pushdown.
+
+Writes a synthetic upload (see sample_data.py) whose Meta and TikTok exports
+carry --extra-columns unmapped metric columns, then reads each CSV export:
+
+    completo  every column, C parser (the reader before column pushdown)
+    c         only the columns the pipeline uses, C parser
+    pyarrow   only the columns the pipeline uses, pyarrow engine (if installed;
+              European number formats fall back to the C parser)
+
+    python -m benchmarks.bench_csv_read [--rows 50000] [--extra-columns 60] [--repeat 3]
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import pandas as pd
+
+from app.processing.engine import _csv_read_params, column_pushdown, pyarrow_available
+from app.processing.registry import resolve_header
+from benchmarks import best_time
+from benchmarks.sample_data import write_sample_upload
+
+
+def _read_params(file_bytes):
+    raw_lines = file_bytes.decode('utf-8').split('\n')[:15]
+    csv_params = _csv_read_params(raw_lines, 'utf-8')
+    columns = pd.read_csv(io.BytesIO(file_bytes), nrows=0, **csv_params).columns
+    params, _ = column_pushdown(columns, resolve_header(columns))
+    return csv_params, columns, params
+
+
+def _read(file_bytes, mode):
+    csv_params, columns, params = _read_params(file_bytes)
+    if mode == 'completo':
+        return pd.read_csv(io.BytesIO(file_bytes), **csv_params)
+    if mode == 'pyarrow' and 'thousands' not in csv_params:
+        return pd.read_csv(io.BytesIO(file_bytes), **csv_params, engine='pyarrow',
+                           usecols=[columns[i] for i in params['usecols']], dtype=params['dtype'])
+    return pd.read_csv(io.BytesIO(file_bytes), **csv_params, **params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=50000, help='rows per platform file')
+    parser.add_argument('--extra-columns', type=int, default=60,
+                        help='unmapped columns added to the Meta and TikTok exports')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    modes = ['completo', 'c'] + (['pyarrow'] if pyarrow_available() else [])
+    if len(modes) == 2:
+        print('pyarrow no instalado: solo se compara el parser C')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_sample_upload(tmp, rows_per_platform=args.rows,
+                                    extra_columns=args.extra_columns)
+
+        print(f"{'archivo':<12} {'modo':<9} {'columnas':>8} {'segundos':>9} {'MB':>7}")
+        for path in paths:
+            with open(path, 'rb') as f:
+                file_bytes = f.read()
+            for mode in modes:
+                seconds, df = best_time(lambda: _read(file_bytes, mode), args.repeat)
+                mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+                print(f"{os.path.basename(path):<12} {mode:<9} {len(df.columns):>8} "
+                      f"{seconds:>9.3f} {mb:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Engine benchmark suite, with JSON results for comparison across commits.
+
+For each size (rows per platform file) writes a synthetic upload (see
+sample_data.py; --excel writes TikTok as XLSX) and times:
+
+    process_file_from_memory   each export, read and standardized
+    scan_campaigns_from_files  campaign detection over the upload
+    calcular_alcance_deduplicado  on all processed rows
+    process_uploaded_files     full run persisted to a temporary SQLite DB
+    historial                  history rules (missing platforms and formats,
+                               date range, metric drops) against the run above
+
+Results go to benchmarks/results/bench_engine-<commit>.json (or --output);
+--compare prints them against an earlier results file.
+
+    python -m benchmarks.bench_engine [--rows 10000,100000] [--excel] [--repeat 1]
+                                      [--output PATH] [--compare OLD.json]
+
+1M-row sizes take tens of minutes (and XLSX writing alone several minutes).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+import pandas as pd
+
+from benchmarks import best_time
+from benchmarks.sample_data import write_sample_upload
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _open_files(paths):
+    return [(open(path, 'rb'), os.path.basename(path)) for path in paths]
+
+
+def _close_files(file_storages):
+    for f, _ in file_storages:
+        f.close()
+
+
+def _bench_size(app, rows, tmp, excel, repeat):
+    from app.processing.engine import process_file_from_memory, scan_campaigns_from_files, process_uploaded_files
+    from app.processing.metrics import calcular_alcance_deduplicado
+    from app.processing.history import verificar_historial
+    from app.routes.upload import _create_run_records
+
+    out_dir = os.path.join(tmp, str(rows))
+    paths = write_sample_upload(out_dir, rows_per_platform=rows, excel=excel)
+    results = []
+
+    def record(name, seconds, rows_in):
+        results.append({'benchmark': name, 'rows': rows, 'rows_in': rows_in, 'seconds': round(seconds, 4),
+                        'rows_per_second': round(rows_in / seconds) if seconds else None})
+        print(f"{name:<48} {rows:>9} {seconds:>9.3f}s", flush=True)
+
+    frames = []
+    for path in paths:
+        def process():
+            with open(path, 'rb') as f:
+                return process_file_from_memory(f, os.path.basename(path))[0]
+        seconds, df = best_time(process, repeat)
+        frames.append(df)
+        record(f'process_file_from_memory[{os.path.basename(path)}]', seconds, len(df))
+    df_all = pd.concat(frames, ignore_index=True)
+
+    seconds, _ = best_time(lambda: scan_campaigns_from_files(paths), repeat)
+    record('scan_campaigns_from_files', seconds, len(df_all))
+
+    seconds, _ = best_time(lambda: calcular_alcance_deduplicado(df_all, overlap_pct=72), repeat)
+    record('calcular_alcance_deduplicado', seconds, len(df_all))
+
+    with app.app_context():
+        filenames = [os.path.basename(path) for path in paths]
+
+        def persist():
+            run_id, campaign_id = _create_run_records(f'Benchmark {rows}', filenames)
+            file_storages = _open_files(paths)
+            try:
+                result = process_uploaded_files(file_storages, run_id, campaign_id)
+            finally:
+                _close_files(file_storages)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+            return campaign_id
+        seconds, campaign_id = best_time(persist, repeat)
+        record('process_uploaded_files[sqlite]', seconds, len(df_all))
+
+        def history():
+            return verificar_historial(df_all, campaign_id, plataformas=sorted(df_all['PLATAFORMA'].unique()))
+        seconds, _ = best_time(history, repeat)
+        record('historial', seconds, len(df_all))
+
+    return results
+
+
+def _compare(results, old_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    previous = {(r['benchmark'], r['rows']): r['seconds'] for r in old['results']}
+    print(f"\n{'benchmark':<48} {'filas':>9} {old['commit']:>10} {'actual':>10} {'cambio':>8}")
+    for r in results:
+        before = previous.get((r['benchmark'], r['rows']))
+        if before is None:
+            continue
+        change = f"{r['seconds'] / before - 1:+.0%}" if before else '-'
+        print(f"{r['benchmark']:<48} {r['rows']:>9} {before:>10.3f} {r['seconds']:>10.3f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', default='10000',
+                        help='comma-separated rows per platform file, e.g. 10000,100000,1000000')
+    parser.add_argument('--excel', action='store_true', help='write the TikTok export as XLSX')
+    parser.add_argument('--repeat', type=int, default=1, help='best of N runs per benchmark')
+    parser.add_argument('--output', help='results JSON path')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.rows.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Throwaway database; set before the app reads its configuration
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        os.environ['METRICS_ENABLED'] = '0'
+        from app import create_app
+        app = create_app('development')
+
+        results = []
+        for rows in sizes:
+            results.extend(_bench_size(app, rows, tmp, args.excel, args.repeat))
+
+        with app.app_context():
+            from app import db
+            db.engine.dispose()
+
+    commit = _git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f'bench_engine-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'excel': args.excel,
+            'repeat': args.repeat,
+            'results': results,
+        }, f, indent=2)
+    print(f'\nresultados: {output}')
+
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
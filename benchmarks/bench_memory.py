@@ -0,0 +1,63 @@
+"""Memory of the processed frames, with and without compact dtypes.
+
+Processes a synthetic multi-platform upload (see sample_data.py) and reports
+memory_usage(deep=True) of each file's output frame as produced by the
+engine (category dimensions, integer counts) against the same frame with
+plain object/float64 columns.
+
+    python -m benchmarks.bench_memory [--rows 20000] [--campaigns 8]
+"""
+
+import argparse
+import os
+import tempfile
+import pandas as pd
+
+from app.processing.engine import process_file_from_memory, DIMENSION_COLUMNS, COUNT_COLUMNS
+from benchmarks.sample_data import write_sample_upload
+
+
+def plain_dtypes(df):
+    """The frame as the pipeline built it before compact dtypes."""
+    plain = {}
+    for col in df.columns:
+        series = df[col]
+        if col in DIMENSION_COLUMNS:
+            series = series.astype(object)
+        elif col in COUNT_COLUMNS and pd.api.types.is_integer_dtype(series):
+            series = series.astype('int64' if col == 'REGISTROS' else 'float64')
+        plain[col] = series
+    return pd.DataFrame(plain, index=df.index)
+
+
+def _mb(num_bytes):
+    return num_bytes / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000, help='rows per platform file')
+    parser.add_argument('--campaigns', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_sample_upload(tmp, rows_per_platform=args.rows, campaigns=args.campaigns)
+
+        print(f"{'archivo':<12} {'filas':>8} {'antes MB':>10} {'despues MB':>11} {'ahorro':>7}")
+        total_before = total_after = 0
+        for path in paths:
+            with open(path, 'rb') as f:
+                df, _, _ = process_file_from_memory(f, os.path.basename(path))
+            after = df.memory_usage(deep=True).sum()
+            before = plain_dtypes(df).memory_usage(deep=True).sum()
+            total_before += before
+            total_after += after
+            print(f"{os.path.basename(path):<12} {len(df):>8} {_mb(before):>10.1f} {_mb(after):>11.1f} "
+                  f"{1 - after / before:>7.0%}")
+
+        print(f"{'total':<12} {'':>8} {_mb(total_before):>10.1f} {_mb(total_after):>11.1f} "
+              f"{1 - total_after / total_before:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
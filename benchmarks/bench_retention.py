@@ -0,0 +1,92 @@
+"""Delete throughput of the retention command (app/retention.py).
+
+Seeds a throwaway SQLite database with --runs runs of --rows report rows for
+one campaign (plus alerts and uploaded files), all older than the retention
+window, then archives every run but the latest with each --batch-rows size,
+re-seeding in between, and reports rows deleted per second.
+
+    python -m benchmarks.bench_retention [--runs 20] [--rows 20000] [--batch-rows 1000,5000,20000]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from benchmarks import best_time
+
+
+def _rows_frame(rows, seed):
+    from app.processing.engine import OUTPUT_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: '' for col in OUTPUT_COLUMNS}, index=range(rows))
+    df['MARCA'] = 'DC'
+    df['PLATAFORMA'] = rng.choice(['META', 'GOOGLE', 'TIKTOK'], rows)
+    df['CAMPANA'] = 'MARCA:DC_CAMPANA:Retencion'
+    df['AD GROUP'] = [f'grupo {i % 200}' for i in range(rows)]
+    df['DIA'] = [f'{1 + i % 28:02d}/03/24' for i in range(rows)]
+    for col in ('GASTO', 'ALCANCE', 'CLICS', 'VIEWS', 'IMPRESIONES', 'FRECUENCIA', 'CTR', 'VTR'):
+        df[col] = rng.random(rows) * 1000
+    df['REGISTROS'] = rng.integers(0, 10, rows)
+    return df
+
+
+def seed(app, runs, rows):
+    from app import db
+    from app.models import Alert, Campaign, ProcessingRun, UploadedFile
+    from app.processing.engine import _insert_report_rows
+
+    with app.app_context():
+        campaign = Campaign(name='Retencion', slug='retencion')
+        db.session.add(campaign)
+        db.session.flush()
+        created = datetime.utcnow() - timedelta(days=365)
+        for i in range(runs):
+            run = ProcessingRun(campaign_id=campaign.id, status='completed', total_rows=rows,
+                                created_at=created + timedelta(days=i))
+            db.session.add(run)
+            db.session.flush()
+            for n in range(3):
+                db.session.add(UploadedFile(run_id=run.id, filename=f'archivo{n}.csv', status='processed'))
+                db.session.add(Alert(run_id=run.id, tipo='ADVERTENCIA', archivo=f'archivo{n}.csv', mensaje='-'))
+            _insert_report_rows(_rows_frame(rows, i), run.id)
+        db.session.commit()
+        db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=20000, help='report rows per run')
+    parser.add_argument('--batch-rows', default='1000,5000,20000', help='comma-separated batch sizes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = os.path.join(tmp, 'seeded.db')
+        work = os.path.join(tmp, 'work.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + work
+        os.environ['METRICS_ENABLED'] = '0'
+        from app import create_app, db
+        from app.retention import apply_retention
+
+        app = create_app('development')
+        seed(app, args.runs, args.rows)
+        shutil.copy(work, seeded)
+
+        print(f"{args.runs} runs x {args.rows} filas")
+        print(f"{'lote':>8} {'runs':>6} {'filas':>10} {'segundos':>9} {'filas/s':>10}")
+        for batch_rows in [int(size) for size in args.batch_rows.split(',')]:
+            shutil.copy(seeded, work)
+            with app.app_context():
+                seconds, result = best_time(lambda: apply_retention(1, 30, batch_rows=batch_rows))
+                db.engine.dispose()
+            print(f"{batch_rows:>8} {len(result['runs']):>6} {result['report_rows']:>10} "
+                  f"{seconds:>9.2f} {result['report_rows'] / seconds:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Application startup time: import, create_app and first request.
+
+Each boot runs in a fresh interpreter against a throwaway SQLite database
+and measures:
+
+    import     import app (the blueprints and what they import at module level)
+    create_app configuration, database init and migrations, blueprints
+    primera    first GET /campaigns
+    pandas     whether pandas was imported by the time the first response was sent
+
+The first boot creates the database; the warm figure is the median of --boots
+further boots against it, which is what a restarted or newly forked worker pays.
+
+    python -m benchmarks.bench_startup [--boots 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app('development')
+created = time.perf_counter()
+status = app.test_client().get('/campaigns').status_code
+answered = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                  'primera': answered - created, 'status': status,
+                  'pandas': 'pandas' in sys.modules}))
+"""
+
+
+def boot(env):
+    """Boot the app once in a new interpreter. Returns the timings dict."""
+    result = subprocess.run([sys.executable, '-c', BOOT_SCRIPT], cwd=ROOT_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _row(name, timings):
+    total = timings['import'] + timings['create_app'] + timings['primera']
+    print(f"{name:<12} {timings['import']:>8.3f} {timings['create_app']:>10.3f} "
+          f"{timings['primera']:>8.3f} {total:>8.3f} {'si' if timings['pandas'] else 'no':>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--boots', type=int, default=5, help='warm boots to take the median of')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'startup.db'),
+                   FLASK_ENV='development', METRICS_DIR=os.path.join(tmp, 'metrics'))
+        first = boot(env)
+        warm = [boot(env) for _ in range(args.boots)]
+
+    median = {key: statistics.median(t[key] for t in warm) for key in ('import', 'create_app', 'primera')}
+    median['pandas'] = any(t['pandas'] for t in warm)
+
+    print(f"{'arranque':<12} {'import':>8} {'create_app':>10} {'primera':>8} {'total':>8} {'pandas':>7}")
+    _row('inicial', first)
+    _row(f'warm (x{args.boots})', median)
+
+
+if __name__ == '__main__':
+    main()
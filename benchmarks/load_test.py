@@ -0,0 +1,230 @@
+"""HTTP load test for the read endpoints.
+
+Seeds a throwaway SQLite database with one run per campaign of a synthetic
+upload (see sample_data.py), then drives /dashboard/<id>, /api/run/<id>/data,
+/api/run/<id>/summary, /download/excel/<id> and /campaigns from --concurrency
+threads for --duration seconds, and reports throughput and p50/p95/p99
+latency per endpoint.
+
+    --server testclient   Flask test client in this process (default): measures
+                          the request handling code, without a network stack
+    --server gunicorn     local gunicorn (run:app) on the seeded database, with
+                          --workers sync workers: measures what a worker sustains
+
+    python -m benchmarks.load_test [--server gunicorn] [--workers 1] [--concurrency 8]
+                                   [--duration 20] [--rows 5000] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.sample_data import write_sample_upload
+
+ENDPOINTS = [
+    ('dashboard', '/dashboard/{run_id}'),
+    ('api_data', '/api/run/{run_id}/data'),
+    ('api_summary', '/api/run/{run_id}/summary'),
+    ('download_excel', '/download/excel/{run_id}'),
+    ('campaigns', '/campaigns'),
+]
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_database(tmp, rows, campaigns):
+    """Create the database in tmp and process a synthetic upload into it. Returns the run ids."""
+    from app import create_app, db
+    from app.processing.engine import process_all_campaigns
+    from app.routes.upload import _create_run_records
+
+    paths = write_sample_upload(os.path.join(tmp, 'upload'), rows_per_platform=rows, campaigns=campaigns)
+    app = create_app('development')
+    with app.app_context():
+        file_storages = [(open(path, 'rb'), os.path.basename(path)) for path in paths]
+        filenames = [filename for _, filename in file_storages]
+        try:
+            results = process_all_campaigns(file_storages,
+                                            lambda name: _create_run_records(name, filenames))
+        finally:
+            for f, _ in file_storages:
+                f.close()
+        db.engine.dispose()
+    return app, [r['run_id'] for r in results if 'error' not in r]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class TestClientTarget:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def get(self, path):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.get(path)
+        response.get_data()
+        return response.status_code
+
+
+class HttpTarget:
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.base_url + path, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workers, env):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'run:app', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--timeout', '120', '--log-level', 'warning'],
+        cwd=ROOT_DIR, env=env)
+    target = HttpTarget(f'http://127.0.0.1:{port}')
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if target.get('/campaigns') == 200:
+                return process, target
+        except OSError:
+            pass
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 60s')
+
+
+def run_load(target, run_ids, concurrency, duration):
+    """Hit the endpoints round-robin from concurrency threads. Returns {endpoint: [(seconds, status)]}."""
+    samples = {name: [] for name, _ in ENDPOINTS}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(offset):
+        i = offset
+        local = {name: [] for name, _ in ENDPOINTS}
+        while time.monotonic() < stop_at:
+            name, pattern = ENDPOINTS[i % len(ENDPOINTS)]
+            path = pattern.format(run_id=run_ids[(i // len(ENDPOINTS)) % len(run_ids)])
+            start = time.perf_counter()
+            try:
+                status = target.get(path)
+            except OSError:
+                status = 0
+            local[name].append((time.perf_counter() - start, status))
+            i += 1
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples, duration):
+    report = []
+    everything = []
+    for name, values in list(samples.items()) + [('total', None)]:
+        values = everything if values is None else values
+        if name != 'total':
+            everything.extend(values)
+        latencies = sorted(seconds for seconds, _ in values)
+        report.append({
+            'endpoint': name,
+            'requests': len(values),
+            'errors': sum(1 for _, status in values if status != 200),
+            'rps': round(len(values) / duration, 2),
+            'p50_ms': _ms(percentile(latencies, 50)),
+            'p95_ms': _ms(percentile(latencies, 95)),
+            'p99_ms': _ms(percentile(latencies, 99)),
+        })
+    return report
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server', choices=['testclient', 'gunicorn'], default='testclient')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load')
+    parser.add_argument('--rows', type=int, default=5000, help='rows per platform file in the seed upload')
+    parser.add_argument('--campaigns', type=int, default=8)
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'load.db'),
+                   FLASK_ENV='development', METRICS_DIR=os.path.join(tmp, 'metrics'))
+        os.environ.update(env)
+        app, run_ids = seed_database(tmp, args.rows, args.campaigns)
+        if not run_ids:
+            sys.exit('seeding produced no runs')
+        print(f'{len(run_ids)} runs sembrados ({args.rows} filas por plataforma)', flush=True)
+
+        process = None
+        if args.server == 'gunicorn':
+            process, target = start_gunicorn(args.workers, env)
+        else:
+            target = TestClientTarget(app)
+        try:
+            started = time.monotonic()
+            samples = run_load(target, run_ids, args.concurrency, args.duration)
+            elapsed = time.monotonic() - started
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    report = summarize(samples, elapsed)
+    print(f"\n{args.server}, {args.concurrency} clientes, {elapsed:.1f}s"
+          + (f', {args.workers} workers' if args.server == 'gunicorn' else ''))
+    print(f"{'endpoint':<16} {'req':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in report:
+        print(f"{r['endpoint']:<16} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8} "
+              f"{r['p50_ms'] or '-':>8} {r['p95_ms'] or '-':>8} {r['p99_ms'] or '-':>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'server': args.server, 'workers': args.workers, 'concurrency': args.concurrency,
+                       'duration': round(elapsed, 2), 'rows': args.rows, 'endpoints': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
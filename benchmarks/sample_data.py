@@ -0,0 +1,126 @@
+"""Synthetic multi-platform upload for benchmarks.
+
+Writes Meta, Google Ads and TikTok exports shaped like the real ones: Spanish
+and English headers, a Google report preamble with European number format,
+FIELD:VALUE nomenclature in campaign and ad group names, and a few legacy
+campaign names without nomenclature. extra_columns pads the Meta and TikTok
+exports with unmapped metric columns, as in full-width platform exports;
+excel writes the TikTok export as XLSX with report title rows above the
+header.
+
+    python -m benchmarks.sample_data OUT_DIR [--rows 100000] [--excel] [--extra-columns 0]
+"""
+
+import argparse
+import os
+import random
+import pandas as pd
+
+BRANDS = ['DC', 'VISA', 'MASTERCARD']
+ETAPAS = ['Awareness', 'Consideracion', 'Conversion']
+COMPRAS = ['CPM', 'CPC', 'CPV']
+FORMATOS = ['Video', 'Carrusel', 'Imagen', 'Stories']
+AUDIENCIAS = ['Jovenes', 'Adultos', 'Lookalike', 'Remarketing']
+COMS = ['Promo', 'Marca', 'Beneficios']
+CIUDADES = ['Quito', 'Guayaquil', 'Cuenca', 'Manta']
+
+
+def _campaign_names(platform, campaigns):
+    names = [f'MARCA:{BRANDS[i % len(BRANDS)]}_CAMPANA:Campana{i + 1:02d}_PLATAFORMA:{platform}'
+             for i in range(campaigns)]
+    return names + ['Legacy campaign name']
+
+
+def _ad_group_names(rng, count=24):
+    return [f'ETAPA:{rng.choice(ETAPAS)}_COMPRA:{rng.choice(COMPRAS)}_FORMATO:{rng.choice(FORMATOS)}'
+            f'_AUDIENCIA:{rng.choice(AUDIENCIAS)}_COM:{rng.choice(COMS)}_CIUDAD:{rng.choice(CIUDADES)}'
+            for _ in range(count)]
+
+
+def _rows(rng, platform, rows, campaigns, days):
+    names = _campaign_names(platform, campaigns)
+    ad_groups = _ad_group_names(rng)
+    dates = pd.date_range('2024-01-01', periods=days).strftime('%Y-%m-%d')
+    out = []
+    for _ in range(rows):
+        imp = rng.randint(100, 20000)
+        out.append((rng.choice(names), rng.choice(ad_groups), rng.choice(dates),
+                    round(rng.uniform(1, 500), 2), imp, rng.randint(50, imp),
+                    round(rng.uniform(1, 3), 2), rng.randint(0, 400), rng.randint(0, 2000),
+                    rng.randint(0, 10)))
+    return out
+
+
+def _european(value):
+    text = f'{value:,.2f}'
+    return '"' + text.replace(',', 'X').replace('.', ',').replace('X', '.') + '"'
+
+
+def _pad_columns(rng, df, extra_columns):
+    """Add extra_columns unmapped metric columns (video quartiles, likes, shares...)."""
+    for i in range(extra_columns):
+        df[f'Metrica adicional {i + 1}'] = [rng.randint(0, 5000) for _ in range(len(df))]
+    return df
+
+
+def write_sample_upload(out_dir, rows_per_platform=20000, campaigns=8, days=90, seed=7,
+                        extra_columns=0, excel=False):
+    """Write meta.csv, google.csv and tiktok.csv (tiktok.xlsx with excel) to out_dir.
+
+    Returns the file paths.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+
+    meta = pd.DataFrame(_rows(rng, 'META', rows_per_platform, campaigns, days), columns=[
+        'Nombre de la campaña', 'Nombre del conjunto de anuncios', 'Día', 'Importe gastado (USD)',
+        'Impresiones', 'Alcance', 'Frecuencia', 'Clics en el enlace', 'ThruPlays',
+        'Registros completados'])
+    meta = _pad_columns(rng, meta, extra_columns)
+    paths.append(os.path.join(out_dir, 'meta.csv'))
+    meta.to_csv(paths[-1], index=False)
+
+    lines = ['Informe de campañas', 'Todo el periodo',
+             'Campaña,Grupo de anuncios,Día,Coste,Impr.,Clics,Vistas de TrueView,Conversiones']
+    for name, ad_group, day, gasto, imp, _, _, clics, views, reg in _rows(
+            rng, 'GOOGLE', rows_per_platform, campaigns, days):
+        lines.append(f'{name},{ad_group},{day},{_european(gasto)},{imp},{clics},{views},{_european(reg)}')
+    paths.append(os.path.join(out_dir, 'google.csv'))
+    with open(paths[-1], 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    tiktok = pd.DataFrame(_rows(rng, 'TIKTOK', rows_per_platform, campaigns, days), columns=[
+        'Campaign name', 'Ad group name', 'By Day', 'Cost', 'Impressions', 'Reach', 'Frequency',
+        'Clicks (destination)', '15-second focused views', 'Registrations'])
+    tiktok = _pad_columns(rng, tiktok, extra_columns)
+    if excel:
+        paths.append(os.path.join(out_dir, 'tiktok.xlsx'))
+        with pd.ExcelWriter(paths[-1], engine='openpyxl') as writer:
+            pd.DataFrame([['Custom report'], ['Date range: 2024-01-01 ~ 2024-03-31']]).to_excel(
+                writer, index=False, header=False)
+            tiktok.to_excel(writer, index=False, startrow=3)
+    else:
+        paths.append(os.path.join(out_dir, 'tiktok.csv'))
+        tiktok.to_csv(paths[-1], index=False)
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic Meta/Google/TikTok upload.')
+    parser.add_argument('out_dir')
+    parser.add_argument('--rows', type=int, default=20000, help='rows per platform file')
+    parser.add_argument('--campaigns', type=int, default=8)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--extra-columns', type=int, default=0)
+    parser.add_argument('--excel', action='store_true', help='write the TikTok export as XLSX')
+    args = parser.parse_args()
+
+    for path in write_sample_upload(args.out_dir, rows_per_platform=args.rows, campaigns=args.campaigns,
+                                    days=args.days, extra_columns=args.extra_columns, excel=args.excel):
+        print(path, os.path.getsize(path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import os
+import time
+
+import pandas as pd
+
+from app.processing import cache
+from app.processing import engine
+from app.processing.engine import _parse_files, standardize_rows
+
+META_COLUMNS = ['Nombre de la campaña', 'Nombre del conjunto de anuncios', 'Día', 'Importe gastado (USD)',
+                'Impresiones']
+
+
+def write_entry(cache_dir, name, size, age_seconds):
+    path = os.path.join(cache_dir, name)
+    os.makedirs(path)
+    with open(os.path.join(path, 'chunk-00000.pkl'), 'wb') as f:
+        f.write(b'0' * size)
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_cache_evicts_least_recently_used_over_the_size_limit(tmp_path):
+    oldest = write_entry(tmp_path, 'a', 400, 300)
+    middle = write_entry(tmp_path, 'b', 400, 200)
+    newest = write_entry(tmp_path, 'c', 400, 100)
+    stale = write_entry(tmp_path, 'd', 10, 3 * 3600)
+
+    assert cache.prune_cache(str(tmp_path), max_age_hours=2, max_bytes=900) == 2
+    assert [os.path.exists(p) for p in (oldest, middle, newest, stale)] == [False, True, True, False]
+
+
+def write_export(tmp_path):
+    path = tmp_path / 'meta.csv'
+    pd.DataFrame([
+        ['MARCA:DC_CAMPANA:UNO', 'AG', '2024-01-01', 10.0, 100],
+        ['MARCA:DC_CAMPANA:DOS', 'AG', '2024-01-01', 20.0, 200],
+        ['MARCA:DC_CAMPANA:DOS', 'AG', '2024-01-02', 30.0, 300],
+    ], columns=META_COLUMNS).to_csv(path, index=False)
+    return path
+
+
+def parse(path, cache_dir, campaign=None):
+    with open(path, 'rb') as f:
+        parsed, = _parse_files([(f, 'meta.csv')], campaign_filter=campaign, cache_dir=cache_dir)
+    return parsed
+
+
+def test_campaign_runs_are_filtered_from_the_whole_file_entry(tmp_path):
+    path = write_export(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+
+    parse(path, cache_dir)
+    uno, dos = parse(path, cache_dir, 'UNO'), parse(path, cache_dir, 'DOS')
+    assert (uno['cached'], dos['cached']) == (True, True)
+    assert len(os.listdir(cache_dir)) == 1
+    assert uno['df']['GASTO'].tolist() == [10.0]
+    assert dos['df']['GASTO'].tolist() == [20.0, 30.0]
+
+
+def test_filtered_cache_miss_standardizes_only_the_campaign_rows(tmp_path, monkeypatch):
+    path = write_export(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    standardized = []
+
+    def counting(df, *args, **kwargs):
+        standardized.append(len(df))
+        return standardize_rows(df, *args, **kwargs)
+    monkeypatch.setattr(engine, 'standardize_rows', counting)
+
+    first, again = parse(path, cache_dir, 'DOS'), parse(path, cache_dir, 'DOS')
+    assert standardized == [2]
+    assert (first['cached'], again['cached']) == (False, True)
+    assert again['df']['GASTO'].tolist() == [20.0, 30.0]
@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.models import Campaign, ProcessingRun
+from app.routes.main import CAMPAIGNS_PER_PAGE
+
+
+def seed_campaigns(count, runs_per_campaign=3, brand='DC', start=0):
+    base = datetime(2024, 1, 1)
+    for i in range(start, start + count):
+        campaign = Campaign(name=f'Campana {i:03d}', slug=f'campana-{i:03d}', brand=brand,
+                            brand_display=brand, updated_at=base + timedelta(minutes=i))
+        db.session.add(campaign)
+        db.session.flush()
+        for n in range(runs_per_campaign):
+            db.session.add(ProcessingRun(campaign_id=campaign.id, status='completed', total_rows=10 * n,
+                                         platforms='META', created_at=base + timedelta(days=n)))
+    db.session.commit()
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _statements_for_page(client, app, url):
+    with app.app_context(), count_statements() as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_campaign_list_query_count_does_not_grow_with_campaigns(app, client):
+    with app.app_context():
+        seed_campaigns(5)
+    few = _statements_for_page(client, app, '/campaigns')
+
+    with app.app_context():
+        seed_campaigns(3 * CAMPAIGNS_PER_PAGE, start=5)
+    many = _statements_for_page(client, app, '/campaigns')
+    later_page = _statements_for_page(client, app, '/campaigns?page=2')
+
+    assert few == many == later_page
+    assert many <= 2  # page rows with their latest runs, and the total count
+
+
+def test_campaign_list_shows_latest_run(app, client):
+    with app.app_context():
+        seed_campaigns(1, runs_per_campaign=3)
+        latest = ProcessingRun.query.order_by(ProcessingRun.created_at.desc()).first()
+
+    html = client.get('/campaigns').get_data(as_text=True)
+    assert f'/dashboard/{latest.id}' in html
+    assert '20' in html  # total_rows of the latest run
+
+
+def test_campaign_list_paginates(app, client):
+    with app.app_context():
+        seed_campaigns(CAMPAIGNS_PER_PAGE + 5)
+
+    first = client.get('/campaigns').get_data(as_text=True)
+    second = client.get('/campaigns?page=2').get_data(as_text=True)
+
+    # Newest (most recently updated) campaigns first
+    assert first.count('class="campaign-card"') == CAMPAIGNS_PER_PAGE
+    assert second.count('class="campaign-card"') == 5
+    assert f'Campana {CAMPAIGNS_PER_PAGE + 4:03d}' in first
+    assert 'Campana 000' in second and 'Campana 000' not in first
+    assert 'Pagina 1 de 2' in first
+
+
+def test_campaign_list_prefix_search(app, client):
+    with app.app_context():
+        seed_campaigns(3, brand='VISA')
+        db.session.add(Campaign(name='Promo Verano', slug='promo-verano', brand='MASTERCARD'))
+        db.session.commit()
+
+    by_name = client.get('/campaigns?q=promo').get_data(as_text=True)
+    assert 'Promo Verano' in by_name and 'Campana 000' not in by_name
+
+    by_brand = client.get('/campaigns?q=vis').get_data(as_text=True)
+    assert by_brand.count('class="campaign-card"') == 3 and 'Promo Verano' not in by_brand
+
+    # Prefix, not substring, match
+    assert 'Sin resultados' in client.get('/campaigns?q=verano').get_data(as_text=True)
@@ -0,0 +1,14 @@
+import pandas as pd
+
+from app.processing.dates import DateParser
+
+
+def test_values_outside_the_inferred_format_fall_back_to_inference():
+    parser = DateParser()
+    first = parser.parse(pd.Series(['2024-01-05', '2024-01-06']))
+    assert parser.date_format == '%Y-%m-%d'
+    assert first.tolist() == [pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-06')]
+
+    later = parser.parse(pd.Series(['2024-01-07', 'Jan 8, 2024', 'Total']))
+    assert later.iloc[:2].tolist() == [pd.Timestamp('2024-01-07'), pd.Timestamp('2024-01-08')]
+    assert pd.isna(later.iloc[2])
@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from app import db
+from app.models import ProcessingRun, ReportRow
+from app.processing.engine import process_uploaded_files
+from app.routes.upload import _create_run_records
+
+META_COLUMNS = ['Nombre de la campaña', 'Nombre del conjunto de anuncios', 'Día', 'Importe gastado (USD)',
+                'Impresiones', 'Alcance', 'Frecuencia', 'Clics en el enlace', 'ThruPlays',
+                'Registros completados']
+
+
+def meta_rows(days, ad_groups=('AG1', 'AG2'), gasto=10.0):
+    return [['MARCA:DC_ETAPA:AWARENESS_CAMP', f'FORMATO:VIDEO_{ad_group}', day, gasto, 1000, 500, 2, 10, 100, 1]
+            for day in days for ad_group in ad_groups]
+
+
+@pytest.fixture
+def upload(app, tmp_path):
+    def upload(rows, base_run=None):
+        path = tmp_path / f'meta-{len(list(tmp_path.iterdir()))}.csv'
+        pd.DataFrame(rows, columns=META_COLUMNS).to_csv(path, index=False)
+        run_id, campaign_id = _create_run_records('Campana Delta', ['meta.csv'])
+        with open(path, 'rb') as f:
+            result = process_uploaded_files([(f, 'meta.csv')], run_id, campaign_id,
+                                            base_run_id=base_run.id if base_run else None)
+        assert 'error' not in result
+        return db.session.get(ProcessingRun, run_id)
+
+    with app.app_context():
+        yield upload
+
+
+def stored(run):
+    return ReportRow.query.filter_by(run_id=run.id).count()
+
+
+def test_delta_stores_new_days_and_inherits_the_rest(upload):
+    base = upload(meta_rows(['2024-01-01', '2024-01-02', '2024-01-03']))
+    run = upload(meta_rows(['2024-01-03', '2024-01-04']), base_run=base)
+
+    assert run.base_run_id == base.id
+    assert stored(run) == 2  # only 2024-01-04 is new
+    assert len(run.report_rows()) == 8
+
+
+def test_delta_replaces_changed_groups(upload):
+    base = upload(meta_rows(['2024-01-01', '2024-01-02']))
+    rows = meta_rows(['2024-01-02'])
+    rows[0][3] = 99.0
+    run = upload(rows, base_run=base)
+
+    assert stored(run) == 1
+    visible = run.report_rows()
+    assert len(visible) == 4
+    assert sum(row.gasto for row in visible) == pytest.approx(3 * 10.0 + 99.0)
+
+
+def test_delta_falls_back_to_full_run_when_groups_are_removed(upload):
+    base = upload(meta_rows(['2024-01-01', '2024-01-02']))
+    # AG2 disappears on a day the update covers: it must not be inherited
+    run = upload(meta_rows(['2024-01-02'], ad_groups=('AG1',)) + meta_rows(['2024-01-03']), base_run=base)
+
+    assert run.base_run_id is None
+    assert stored(run) == len(run.report_rows()) == 3
+
+
+def test_report_rows_follow_the_whole_chain(upload):
+    first = upload(meta_rows(['2024-01-01']))
+    second = upload(meta_rows(['2024-01-01', '2024-01-02']), base_run=first)
+    third = upload(meta_rows(['2024-01-02', '2024-01-03']), base_run=second)
+
+    assert third.chain_ids() == [third.id, second.id, first.id]
+    assert [stored(run) for run in (first, second, third)] == [2, 2, 2]
+    visible = third.report_rows()
+    assert len(visible) == 6
+    assert len({(row.dia, row.ad_group) for row in visible}) == 6
+
+
+def test_groups_with_a_blank_ad_group_are_inherited(upload):
+    rows = meta_rows(['2024-01-01', '2024-01-02'])
+    rows[0][1] = None
+    base = upload(rows)
+    assert ReportRow.query.filter_by(run_id=base.id, ad_group='').count() == 1
+
+    run = upload(rows, base_run=base)
+    assert run.base_run_id == base.id
+    assert stored(run) == 0
+    assert len(run.report_rows()) == 4
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from app.processing.engine import process_uploaded_files
+from app.routes.upload import _create_run_records
+
+META_COLUMNS = ['Nombre de la campaña', 'Nombre del conjunto de anuncios', 'Día', 'Importe gastado (USD)',
+                'Impresiones']
+
+
+def process(app, tmp_path, campaign, rows):
+    path = tmp_path / f'meta-{len(list(tmp_path.iterdir()))}.csv'
+    pd.DataFrame(rows, columns=META_COLUMNS).to_csv(path, index=False)
+    with app.app_context():
+        run_id, campaign_id = _create_run_records(campaign, ['meta.csv'])
+        with open(path, 'rb') as f:
+            assert 'error' not in process_uploaded_files([(f, 'meta.csv')], run_id, campaign_id)
+    return run_id
+
+
+def test_diff_reports_added_removed_and_changed_groups(app, client, tmp_path):
+    run_a = process(app, tmp_path, 'Campana Diff', [
+        ['MARCA:DC_CAMP', 'AG1', '2024-01-01', 10.0, 100],
+        ['MARCA:DC_CAMP', 'AG2', '2024-01-01', 20.0, 200],
+        ['MARCA:DC_CAMP', 'AG3', '2024-01-01', 5.0, 50],
+    ])
+    run_b = process(app, tmp_path, 'Campana Diff', [
+        ['MARCA:DC_CAMP', 'AG1', '2024-01-01', 10.0, 100],
+        ['MARCA:DC_CAMP', 'AG2', '2024-01-01', 25.0, 200],
+        ['MARCA:DC_CAMP', 'AG4', '2024-01-01', 7.0, 70],
+    ])
+
+    response = client.get(f'/api/run/{run_a}/diff/{run_b}?by=ad_group')
+    assert response.status_code == 200
+    diff = response.get_json()
+    assert [group['group']['AD GROUP'] for group in diff['added']] == ['AG4']
+    assert [group['group']['AD GROUP'] for group in diff['removed']] == ['AG3']
+    assert [group['group']['AD GROUP'] for group in diff['changed']] == ['AG2']
+    assert diff['changed'][0]['delta']['GASTO'] == 5.0
+    assert diff['unchanged'] == 1
+    assert diff['totals']['delta']['GASTO'] == 7.0
+
+    assert client.get(f'/api/run/{run_a}/diff/{run_b}?by=semana').status_code == 400
+
+
+def test_diff_of_runs_from_different_campaigns_is_not_found(app, client, tmp_path):
+    run_a = process(app, tmp_path, 'Campana Uno', [['MARCA:DC_CAMP', 'AG1', '2024-01-01', 10.0, 100]])
+    run_b = process(app, tmp_path, 'Campana Dos', [['MARCA:DC_CAMP', 'AG1', '2024-01-01', 10.0, 100]])
+
+    assert client.get(f'/api/run/{run_a}/diff/{run_b}').status_code == 404
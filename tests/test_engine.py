@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from app import db
+from app.models import Alert, ProcessingRun, ReportRow
+from app.processing.delta import VALUE_FIELDS
+from app.processing.engine import process_all_campaigns, process_uploaded_files
+from app.routes.upload import _create_run_records
+from benchmarks.sample_data import write_sample_upload
+
+FILES = ('meta.csv', 'google.csv', 'tiktok.csv')
+
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    write_sample_upload(str(tmp_path), rows_per_platform=1500, campaigns=3, days=20)
+    return tmp_path
+
+
+def process(upload_dir, campaign, campaign_filter, **kwargs):
+    run_id, campaign_id = _create_run_records(campaign, list(FILES))
+    handles = [open(upload_dir / name, 'rb') for name in FILES]
+    try:
+        result = process_uploaded_files(list(zip(handles, FILES)), run_id, campaign_id,
+                                        campaign_filter=campaign_filter, **kwargs)
+    finally:
+        for handle in handles:
+            handle.close()
+    assert 'error' not in result
+    return db.session.get(ProcessingRun, run_id)
+
+
+def stored_rows(run):
+    columns = [getattr(ReportRow, field) for field in VALUE_FIELDS]
+    return sorted(tuple(row) for row in db.session.query(*columns).filter(ReportRow.run_id == run.id))
+
+
+def run_alerts(run):
+    return sorted((alert.tipo, alert.archivo, alert.mensaje) for alert in Alert.query.filter_by(run_id=run.id))
+
+
+def assert_close(a, b):
+    """Equal structures; numbers may differ by float summation order (and a cent once rounded)."""
+    if isinstance(a, dict):
+        assert list(a) == list(b)
+        for key in a:
+            assert_close(a[key], b[key])
+    elif isinstance(a, list):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_close(x, y)
+    elif isinstance(a, float) or isinstance(b, float):
+        assert a == pytest.approx(b, abs=0.011)
+    else:
+        assert a == b
+
+
+def test_streamed_files_match_files_read_whole(app, upload_dir):
+    with app.app_context():
+        whole = process(upload_dir, 'Campana01 Whole', 'Campana01')
+        # 1500 rows per file in chunks of 200, so every file spans several chunks
+        streamed = process(upload_dir, 'Campana01 Streamed', 'Campana01', stream_min_bytes=0, chunksize=200)
+
+        assert streamed.total_rows == whole.total_rows > 200
+        assert stored_rows(streamed) == stored_rows(whole)
+        assert run_alerts(streamed) == run_alerts(whole)
+        assert_close(json.loads(streamed.summary_json), json.loads(whole.summary_json))
+        assert_close(json.loads(streamed.history.totals_json), json.loads(whole.history.totals_json))
+
+
+def test_processing_all_campaigns_matches_one_run_per_campaign(app, upload_dir):
+    with app.app_context():
+        handles = [open(upload_dir / name, 'rb') for name in FILES]
+        try:
+            results = process_all_campaigns(list(zip(handles, FILES)),
+                                            lambda name: _create_run_records(name, list(FILES)))
+        finally:
+            for handle in handles:
+                handle.close()
+
+        # Legacy names without nomenclature are not campaigns
+        assert [result['campaign'] for result in results] == ['Campana01', 'Campana02', 'Campana03']
+        for result in results:
+            together = db.session.get(ProcessingRun, result['run_id'])
+            alone = process(upload_dir, f"{result['campaign']} Alone", result['campaign'])
+            assert together.total_rows == alone.total_rows > 0
+            assert stored_rows(together) == stored_rows(alone)
+            assert run_alerts(together) == run_alerts(alone)
+            assert_close(json.loads(together.summary_json), json.loads(alone.summary_json))
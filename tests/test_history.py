@@ -0,0 +1,76 @@
+import pandas as pd
+
+from app import db
+from app.models import Campaign
+from app.processing.history import collect_platform_stats, save_history, verificar_historial
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['PLATAFORMA', 'FORMATO', 'DIA', 'GASTO', 'IMPRESIONES', 'VIEWS'])
+
+
+PREVIOUS = frame([
+    ['META', 'Video', '01/01/24', 100.0, 1000, 50],
+    ['META', 'Carrusel', '02/01/24', 100.0, 1000, 50],
+    ['GOOGLE', 'Display', '01/01/24', 80.0, 900, 0],
+    ['TIKTOK', 'Video', '01/01/24', 60.0, 700, 30],
+])
+
+
+def snapshot(app, df):
+    campaign = Campaign(name='Historial', slug='historial')
+    db.session.add(campaign)
+    db.session.commit()
+    save_history(1, campaign.id, sorted(df['PLATAFORMA'].unique()), df)
+    return campaign.id
+
+
+def test_history_rules(app):
+    with app.app_context():
+        campaign_id = snapshot(app, PREVIOUS)
+        current = frame([
+            ['META', 'Video', '10/01/24', 40.0, 1000, 0],
+            ['GOOGLE', 'Display', '01/01/24', 80.0, 900, 0],
+        ])
+        segundos = {}
+        alerts = verificar_historial(current, campaign_id, segundos=segundos)
+
+    mensajes = [(alert['tipo'], alert['mensaje']) for alert in alerts]
+    assert mensajes == [
+        ('CRITICO', 'PLATAFORMA FALTANTE: TIKTOK estaba en la ejecucion anterior pero no hay datos de ella hoy'),
+        ('CRITICO', 'FORMATO FALTANTE: Carrusel de META estaba en ejecucion anterior pero no aparece hoy'),
+        ('CRITICO', 'FORMATO FALTANTE: Video de TIKTOK estaba en ejecucion anterior pero no aparece hoy'),
+        ('CRITICO', 'RANGO DE FECHAS REDUCIDO en META: Datos inician 10/01/2024, pero antes iniciaban '
+                    '01/01/2024 (faltan 9 dias)'),
+        ('ADVERTENCIA', 'CAIDA DRASTICA EN META: Gasto cayo 80% ($200.00 -> $40.00)'),
+        ('CRITICO', 'VIEWS DESAPARECIERON EN META: La ejecucion anterior tenia 100 views pero ahora es 0. '
+                    'Verifique que la columna de views este presente en el archivo.'),
+    ]
+    assert set(segundos) == {'plataforma_faltante', 'formato_faltante', 'rango_fechas_reducido',
+                             'caida_gasto', 'views_desaparecen'}
+
+
+def test_history_rules_quiet_for_the_same_data(app):
+    with app.app_context():
+        campaign_id = snapshot(app, PREVIOUS)
+        assert verificar_historial(None, campaign_id, stats=collect_platform_stats(PREVIOUS)) == []
+
+
+def test_campaign_trend_follows_the_runs(app, client):
+    with app.app_context():
+        campaign_id = snapshot(app, PREVIOUS)
+        current = frame([
+            ['META', 'Video', '01/01/24', 150.0, 1000, 50],
+            ['GOOGLE', 'Display', '03/01/24', 90.0, 900, 0],
+        ])
+        save_history(2, campaign_id, ['GOOGLE', 'META'], current)
+
+    response = client.get('/api/campaign/historial/trend?metric=gasto&platform=META,GOOGLE')
+    assert response.status_code == 200
+    series = {(s['platform'], s['metric']): s['points'] for s in response.get_json()['series']}
+    assert set(series) == {('GOOGLE', 'GASTO'), ('META', 'GASTO')}
+    assert [(p['run_id'], p['value']) for p in series[('META', 'GASTO')]] == [(1, 200.0), (2, 150.0)]
+    assert [(p['fecha_min'], p['fecha_max']) for p in series[('GOOGLE', 'GASTO')]] == \
+        [('2024-01-01', '2024-01-01'), ('2024-01-03', '2024-01-03')]
+
+    assert client.get('/api/campaign/desconocida/trend').status_code == 404
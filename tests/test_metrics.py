@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+from app import create_app, db
+from app.config import TestingConfig, config
+
+
+@pytest.fixture
+def metrics_app(tmp_path, monkeypatch):
+    # A file left by a worker that is gone (pids above pid_max are never alive)
+    (tmp_path / 'worker-999999999.json').write_text(json.dumps([['reportes_rows_processed_total', [], 5]]))
+    monkeypatch.setitem(config, 'metrics', type('MetricsConfig', (TestingConfig,), {
+        'METRICS_ENABLED': True, 'METRICS_TOKEN': 's3cret', 'METRICS_DIR': str(tmp_path)}))
+    app = create_app('metrics')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_metrics_are_off_by_default(client):
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_require_the_token(metrics_app, tmp_path):
+    client = metrics_app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert b'reportes_http_request_duration_seconds' in response.data
+    assert 'reportes_rows_processed_total 5' not in response.get_data(as_text=True)
+    assert os.listdir(tmp_path) == [f'worker-{os.getpid()}.json']
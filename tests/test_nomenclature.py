@@ -0,0 +1,24 @@
+import pandas as pd
+
+from app.processing.engine import _parse_files
+
+META_COLUMNS = ['Nombre de la campaña', 'Nombre del conjunto de anuncios', 'Día', 'Importe gastado (USD)',
+                'Impresiones']
+
+
+def test_ad_group_names_fill_fields_missing_from_the_campaign_name(tmp_path):
+    path = tmp_path / 'meta.csv'
+    pd.DataFrame([
+        ['MARCA:DC_CAMPANA:UNO_FORMATO:VIDEO', 'AUDIENCIA:JOVENES_FORMATO:IMAGEN', '2024-01-01', 10.0, 100],
+        ['MARCA:DC_CAMPANA:UNO_FORMATO:VIDEO', 'AUDIENCIA:ADULTOS', '2024-01-02', 20.0, 200],
+        [None, 'MARCA:OTRA', '2024-01-02', 30.0, 300],
+    ], columns=META_COLUMNS).to_csv(path, index=False)
+
+    with open(path, 'rb') as f:
+        parsed, = _parse_files([(f, 'meta.csv')])
+    df = parsed['df']
+
+    assert df['MARCA'].astype(str).tolist() == ['DC', 'DC', 'OTRA']
+    assert df['FORMATO'].astype(str).tolist() == ['VIDEO', 'VIDEO', '']
+    assert df['AUDIENCIA'].astype(str).tolist() == ['JOVENES', 'ADULTOS', '']
+    assert df['PLATAFORMA'].astype(str).tolist() == ['META'] * 3
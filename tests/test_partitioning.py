@@ -0,0 +1,29 @@
+from app import db
+from app.models import Campaign, ProcessingRun, ReportRow
+from app.partitioning import drop_archived_partition, ensure_run_partition, partition_bounds
+
+
+def test_partition_bounds():
+    assert partition_bounds(1, width=100) == (1, 101)
+    assert partition_bounds(100, width=100) == (1, 101)
+    assert partition_bounds(101, width=100) == (101, 201)
+    assert partition_bounds(7, width=1) == (7, 8)
+
+
+def test_partitioning_is_a_no_op_on_sqlite(app):
+    app.config['REPORT_ROWS_PARTITIONING'] = True
+    with app.app_context():
+        campaign = Campaign(name='Campana', slug='campana')
+        db.session.add(campaign)
+        db.session.flush()
+        run = ProcessingRun(campaign_id=campaign.id, status='archived')
+        db.session.add(run)
+        db.session.flush()
+        db.session.add(ReportRow(run_id=run.id, plataforma='META', dia='01/01/24'))
+        db.session.commit()
+        run_id = run.id
+
+        assert partition_bounds(run_id) == (1, 201)  # REPORT_ROWS_PARTITION_RUNS default
+        ensure_run_partition(run_id)
+        assert drop_archived_partition(run_id) is None  # rows are then deleted normally
+        assert ReportRow.query.filter_by(run_id=run_id).count() == 1
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Alert, Campaign, ProcessingRun, ReportRow
+from app.retention import apply_retention
+
+NOW = datetime(2024, 6, 1)
+
+
+@pytest.fixture
+def add_run(app):
+    with app.app_context():
+        campaign = Campaign(name='Campana', slug='campana')
+        db.session.add(campaign)
+        db.session.commit()
+        campaign_id = campaign.id
+
+        def add_run(days_ago, status='completed', rows=2, base_run=None):
+            run = ProcessingRun(campaign_id=campaign_id, status=status, base_run_id=base_run,
+                                created_at=NOW - timedelta(days=days_ago))
+            db.session.add(run)
+            db.session.flush()
+            db.session.add_all([ReportRow(run_id=run.id, plataforma='META', dia=f'0{n + 1}/01/24')
+                                for n in range(rows)])
+            db.session.add(Alert(run_id=run.id, tipo='ADVERTENCIA'))
+            db.session.commit()
+            return run.id
+
+        yield add_run
+
+
+def statuses(run_ids):
+    return [db.session.get(ProcessingRun, run_id).status for run_id in run_ids]
+
+
+def test_retention_archives_old_runs_beyond_keep_last(add_run):
+    old, older_base = add_run(90), add_run(80)
+    delta = add_run(70, base_run=older_base)
+    latest = add_run(1)
+
+    result = apply_retention(keep_last=2, keep_days=30, now=NOW)
+
+    # delta and latest are the two kept completed runs; delta inherits from older_base
+    assert result['runs'] == [old]
+    assert result['report_rows'] == 2 and result['alerts'] == 1
+    db.session.expire_all()
+    assert statuses([old, older_base, delta, latest]) == ['archived', 'completed', 'completed', 'completed']
+    assert ReportRow.query.filter_by(run_id=old).count() == 0
+    assert apply_retention(keep_last=2, keep_days=30, now=NOW)['runs'] == []
+
+
+def test_retention_expires_old_runs_that_did_not_complete(add_run):
+    completed = add_run(90)
+    failed = add_run(60, status='error', rows=0)
+    stuck = add_run(40, status='processing')  # latest run of the campaign, never finished
+
+    assert apply_retention(keep_last=1, keep_days=30, now=NOW, dry_run=True)['runs'] == [failed, stuck]
+    apply_retention(keep_last=1, keep_days=30, now=NOW)
+    db.session.expire_all()
+    assert statuses([completed, failed, stuck]) == ['completed', 'archived', 'archived']
+
+    recent_failure = add_run(5, status='error', rows=0)
+    assert apply_retention(keep_last=1, keep_days=30, now=NOW)['runs'] == []
+    assert statuses([recent_failure]) == ['error']
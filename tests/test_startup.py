@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cold_boot_does_not_import_pandas():
+    # The testing database is in memory, so every boot creates and migrates the schema
+    script = ("import sys\nfrom app import create_app\napp = create_app('testing')\n"
+              "app.test_client().get('/campaigns')\nprint('pandas' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT_DIR, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+
+from app import db
+from app.models import ProcessingRun
+from app.processing.engine import process_uploaded_files
+from app.processing.summary import build_run_summary, collect_summary, summary_from_totals
+from app.routes.upload import _create_run_records
+
+ROWS = pd.DataFrame({
+    'PLATAFORMA': ['META', 'GOOGLE', 'META', 'META'],
+    'FORMATO': ['Video', 'Display', 'Video', ''],
+    'COMPRA': ['CPM', 'CPC', 'CPV', 'CPM'],
+    'DIA': ['02/01/24', '01/01/24', '01/01/24', '02/01/24'],
+    'GASTO': [10.0, 5.0, 2.5, 1.0],
+    'IMPRESIONES': [1000, 400, 300, 100],
+    'CLICS': [10, 8, 0, 1],
+    'VIEWS': [0, 0, 0, 0],
+    'REGISTROS': [2, 0, 1, 0],
+    'CTR': [1.0, 2.0, 0.0, 1.0],
+})
+
+
+def test_summary_holds_the_unfiltered_chart_series():
+    summary = build_run_summary(ROWS, alcance_dedup={})
+
+    assert list(summary['groups']['PLATAFORMA']) == ['META', 'GOOGLE']
+    assert summary['groups']['PLATAFORMA']['META']['GASTO'] == 13.5
+    assert summary['groups']['PLATAFORMA']['META']['CTR'] == 0.67
+    assert list(summary['groups']['FORMATO']) == ['Video', 'Display']  # rows without a format are not charted
+    assert summary['compra_formato'] == {'Video': 'CPM / CPV', 'Display': 'CPC'}
+
+    meta = summary['daily_groups']['PLATAFORMA']
+    assert meta['labels'] == ['01/01', '02/01']
+    assert meta['values'] == ['GOOGLE', 'META']
+    assert [point['gasto'] for point in meta['series']['META']] == [2.5, 11.0]
+    assert [point['gasto'] for point in meta['series']['GOOGLE']] == [5.0, 0]
+    assert len(summary['table']) == 4
+
+
+def test_summary_adds_up_chunks():
+    acc = collect_summary(ROWS.iloc[:2])
+    acc = collect_summary(ROWS.iloc[2:], acc)
+
+    assert summary_from_totals(acc, {}) == build_run_summary(ROWS, alcance_dedup={})
+
+
+def test_dashboard_rebuilds_summaries_stored_without_chart_series(app, client, tmp_path):
+    path = tmp_path / 'meta.csv'
+    pd.DataFrame([['MARCA:DC_CAMPANA:UNO', 'AG', '2024-01-01', 10.0, 100]],
+                 columns=['Nombre de la campaña', 'Nombre del conjunto de anuncios', 'Día',
+                          'Importe gastado (USD)', 'Impresiones']).to_csv(path, index=False)
+    with app.app_context():
+        run_id, campaign_id = _create_run_records('Campana Uno', ['meta.csv'])
+        with open(path, 'rb') as f:
+            process_uploaded_files([(f, 'meta.csv')], run_id, campaign_id)
+        run = db.session.get(ProcessingRun, run_id)
+        summary = json.loads(run.summary_json)
+        del summary['groups']
+        run.summary_json = json.dumps(summary)
+        db.session.commit()
+
+    assert client.get(f'/dashboard/{run_id}').status_code == 200
+    with app.app_context():
+        assert 'groups' in json.loads(db.session.get(ProcessingRun, run_id).summary_json)
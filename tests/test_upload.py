@@ -0,0 +1,124 @@
+import gzip
+import io
+import zipfile
+
+import pytest
+
+from app.routes.upload import save_upload
+
+
+def test_zip_members_with_the_same_name_are_all_saved(tmp_path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('meta/reporte.csv', 'a\n1\n')
+        archive.writestr('tiktok/reporte.csv', 'b\n2\n')
+        archive.writestr('notas.txt', 'x')
+    buffer.seek(0)
+
+    saved = save_upload(buffer, 'exports.zip', str(tmp_path), [None])
+
+    assert sorted(saved) == ['reporte (2).csv', 'reporte.csv']
+    assert (tmp_path / 'reporte.csv').read_text() == 'a\n1\n'
+    assert (tmp_path / 'reporte (2).csv').read_text() == 'b\n2\n'
+
+
+def test_gz_and_zip_files_with_the_same_name_are_all_saved(tmp_path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('meta.csv', 'a\n1\n')
+    buffer.seek(0)
+
+    saved = save_upload(buffer, 'exports.zip', str(tmp_path), [None])
+    saved.update(save_upload(io.BytesIO(gzip.compress(b'b\n2\n')), 'meta.csv.gz', str(tmp_path), [None]))
+    saved.update(save_upload(io.BytesIO(b'c\n3\n'), 'meta.csv', str(tmp_path), [None]))
+
+    assert sorted(saved) == ['meta (2).csv', 'meta (3).csv', 'meta.csv']
+    assert [(tmp_path / name).read_text() for name in ('meta.csv', 'meta (2).csv', 'meta (3).csv')] == \
+        ['a\n1\n', 'b\n2\n', 'c\n3\n']
+
+
+@pytest.fixture
+def uploads(app, tmp_path):
+    app.instance_path = str(tmp_path)
+    app.config['UPLOAD_CHUNK_MB'] = 1
+    return tmp_path / 'uploads'
+
+
+def export_bytes(rows):
+    header = 'Nombre de la campaña,Nombre del conjunto de anuncios,Día,Importe gastado (USD),Impresiones\n'
+    return (header + 'MARCA:DC_CAMPANA:UNO,AG,2024-01-01,10.0,100\n' * rows).encode('utf-8')
+
+
+def init_upload(client, data, name='meta.csv'):
+    response = client.post('/upload/chunked', json={'files': [{'name': name, 'size': len(data)}]})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def put_chunk(client, session_id, data, chunk_size, index):
+    return client.put(f'/upload/chunked/{session_id}/0/{index}',
+                      data=data[index * chunk_size:(index + 1) * chunk_size])
+
+
+def test_chunked_upload_accepts_chunks_in_any_order_and_repeated(client, uploads):
+    data = export_bytes(60000)
+    upload = init_upload(client, data)
+    session_id, chunk_size = upload['session_id'], upload['chunk_size']
+    chunks = len(upload['files'][0]['missing'])
+    assert chunks == 3
+
+    for index in (2, 0, 1, 0):
+        assert put_chunk(client, session_id, data, chunk_size, index).status_code == 200
+
+    response = client.post(f'/upload/chunked/{session_id}/finalize')
+    assert response.status_code == 200
+    assert session_id in response.get_json()['redirect']
+    assert (uploads / session_id / 'meta.csv').read_bytes() == data
+    assert not (uploads / session_id / '.chunks').exists()
+
+
+def test_chunked_upload_resumes_the_missing_chunks(client, uploads):
+    data = export_bytes(60000)
+    upload = init_upload(client, data)
+    session_id, chunk_size = upload['session_id'], upload['chunk_size']
+    put_chunk(client, session_id, data, chunk_size, 0)
+
+    response = client.post(f'/upload/chunked/{session_id}/finalize')
+    assert response.status_code == 409
+    assert response.get_json()['files'][0]['missing'] == [1, 2]
+
+    # An interrupted client asks what is left and sends only that
+    status = client.get(f'/upload/chunked/{session_id}').get_json()
+    for index in status['files'][0]['missing']:
+        put_chunk(client, session_id, data, chunk_size, index)
+    assert client.post(f'/upload/chunked/{session_id}/finalize').status_code == 200
+    assert (uploads / session_id / 'meta.csv').read_bytes() == data
+
+
+def test_chunked_upload_rejects_bad_chunks_and_oversized_uploads(app, client, uploads):
+    data = export_bytes(60000)
+    upload = init_upload(client, data)
+    session_id, chunk_size = upload['session_id'], upload['chunk_size']
+
+    assert client.put(f'/upload/chunked/{session_id}/0/0', data=data[:100]).status_code == 400
+    assert client.put(f'/upload/chunked/{session_id}/0/3', data=b'x').status_code == 400
+    assert client.put(f'/upload/chunked/{session_id}/1/0', data=b'x').status_code == 400
+    assert client.get(f'/upload/chunked/{session_id}').get_json()['files'][0]['missing'] == [0, 1, 2]
+
+    app.config['MAX_UNCOMPRESSED_MB'] = 1
+    response = client.post('/upload/chunked', json={'files': [{'name': 'meta.csv', 'size': len(data)}]})
+    assert response.status_code == 400
+    assert client.get('/upload/chunked/not-a-session').status_code == 404
+
+
+def test_chunked_upload_enforces_the_decompressed_budget(app, client, uploads):
+    app.config['MAX_UNCOMPRESSED_MB'] = 1
+    data = gzip.compress(export_bytes(60000))
+    upload = init_upload(client, data, name='meta.csv.gz')
+    session_id = upload['session_id']
+    put_chunk(client, session_id, data, upload['chunk_size'], 0)
+
+    response = client.post(f'/upload/chunked/{session_id}/finalize')
+    assert response.status_code == 400
+    assert 'limite' in response.get_json()['error']
+    assert not (uploads / session_id).exists()
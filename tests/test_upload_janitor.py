@@ -0,0 +1,40 @@
+import os
+import time
+
+from app import create_app, upload_sessions
+from app.config import TestingConfig, config
+
+
+def test_janitor_starts_with_the_first_request_only(monkeypatch):
+    started = []
+    monkeypatch.setattr(upload_sessions, 'start_janitor', started.append)
+    monkeypatch.setitem(config, 'janitor', type('JanitorConfig', (TestingConfig,),
+                                                {'UPLOAD_JANITOR_INTERVAL_MINUTES': 30}))
+    app = create_app('janitor')
+    assert started == []  # creating the app (CLI commands, scripts) does not start it
+
+    app.test_client().get('/static/css/style.css')
+    assert started == [app]
+
+
+def test_janitor_disabled(monkeypatch):
+    started = []
+    monkeypatch.setattr(upload_sessions, 'start_janitor', started.append)
+    app = create_app('testing')
+    app.test_client().get('/static/css/style.css')
+    assert started == []
+
+
+def test_janitor_applies_the_parse_cache_limits(monkeypatch, tmp_path):
+    monkeypatch.setitem(config, 'cache', type('CacheConfig', (TestingConfig,), {
+        'PARSE_CACHE_ENABLED': True, 'PARSE_CACHE_DIR': str(tmp_path / 'cache'),
+        'PARSE_CACHE_MAX_AGE_HOURS': 1}))
+    app = create_app('cache')
+    stale = tmp_path / 'cache' / 'stale'
+    stale.mkdir(parents=True)
+    os.utime(stale, (time.time() - 2 * 3600,) * 2)
+
+    with app.app_context():
+        result = upload_sessions.run_janitor()
+    assert result['cache_entries'] == 1
+    assert not stale.exists()